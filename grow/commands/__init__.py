@@ -7,6 +7,7 @@ from . import import_translations
 from . import init
 from . import install
 from . import machine_translate
+from . import merge_shards
 from . import preprocess
 from . import routes
 from . import run
@@ -24,6 +25,7 @@ def add(group):
     group.add_command(import_translations.import_translations)
     group.add_command(init.init)
     group.add_command(machine_translate.machine_translate)
+    group.add_command(merge_shards.merge_shards)
     group.add_command(preprocess.preprocess)
     group.add_command(routes.routes)
     group.add_command(run.run)
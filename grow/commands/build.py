@@ -1,7 +1,10 @@
+from . import options
 from grow.common import utils
 from grow.deployments import stats
+from grow.deployments.destinations import base
 from grow.deployments.destinations import local as local_destination
 from grow.pods import pods
+from grow.pods import profiler
 from grow.pods import storage
 import click
 import os
@@ -12,7 +15,28 @@ import os
 @click.option('--out_dir', help='Where to output built files.')
 @click.option('--preprocess/--no-preprocess', default=True, is_flag=True,
               help='Whether to run preprocessors.')
-def build(pod_path, out_dir, preprocess):
+@click.option('--workers', type=int, default=None,
+              help='Number of processes used to render the pod. By default,'
+                   ' the pod is rendered in a single process.')
+@click.option('--incremental/--no-incremental', default=False, is_flag=True,
+              help='Whether to only render paths whose source files changed'
+                   ' since the last incremental build.')
+@click.option('--profile/--no-profile', default=False, is_flag=True,
+              help='Whether to report the time and memory spent rendering'
+                   ' each view, collection and locale. The report is also'
+                   ' saved as JSON to .grow/profile.json in the output'
+                   ' directory.')
+@click.option('--shard', callback=options.parse_shard,
+              help='Only build one of several disjoint shards of the pod,'
+                   ' specified as <index>/<count> (e.g. 2/4). Paths are'
+                   ' assigned to shards using a stable hash. Requires a'
+                   ' fixed fingerprint shared by every shard.')
+@click.option('--fingerprint',
+              help='Fingerprint used in fingerprinted paths (see'
+                   ' {env.fingerprint}), instead of the fingerprint configured'
+                   ' for the environment or the current time.')
+def build(pod_path, out_dir, preprocess, workers, incremental, profile,
+          shard, fingerprint):
     """Generates static files and dumps them to a local destination."""
     root = os.path.abspath(os.path.join(os.getcwd(), pod_path))
     out_dir = out_dir or os.path.join(root, 'build')
@@ -22,10 +46,22 @@ def build(pod_path, out_dir, preprocess):
     try:
         config = local_destination.Config(out_dir=out_dir)
         destination = local_destination.LocalDestination(config)
-        paths_to_contents = destination.dump(pod)
+        profile_obj = profiler.Profile() if profile else None
+        paths_to_contents = destination.iter_dump(
+            pod, workers=workers, incremental=incremental, profile=profile_obj,
+            shard=shard, fingerprint=fingerprint)
         repo = utils.get_git_repo(pod.root)
-        stats_obj = stats.Stats(pod, paths_to_contents=paths_to_contents)
+        stats_obj = stats.Stats(pod, full=False)
         destination.deploy(paths_to_contents, stats=stats_obj, repo=repo, confirm=False,
-                           test=False)
+                           test=False, shard=shard)
+        pod.save_caches()
+        if profile_obj is not None:
+            tables = profile_obj.to_tables()
+            tables.append(profiler.create_memoize_table())
+            click.echo('\n\n'.join(tables))
+            destination.write_control_file(
+                profiler.Profile.BASENAME, profile_obj.to_json())
+    except base.Error as e:
+        raise click.ClickException(str(e))
     except pods.Error as e:
         raise click.ClickException(str(e))
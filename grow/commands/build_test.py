@@ -0,0 +1,39 @@
+from . import build
+from click import testing as click_testing
+from grow.testing import testing
+import os
+import unittest
+
+
+class BuildTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_pod_dir = testing.create_test_pod_dir()
+        self.runner = click_testing.CliRunner()
+
+    def test_shard(self):
+        out_dir = os.path.join(self.test_pod_dir, 'build')
+        args = [self.test_pod_dir, '--no-preprocess', '--shard=1/2',
+                '--out_dir={}'.format(out_dir)]
+        # Shards must share a fingerprint.
+        result = self.runner.invoke(build.build, args)
+        self.assertNotEqual(0, result.exit_code)
+        self.assertIn('fixed fingerprint', result.output)
+        args.append('--fingerprint=abc')
+        result = self.runner.invoke(build.build, args, catch_exceptions=False)
+        self.assertEqual(0, result.exit_code)
+        result = self.runner.invoke(build.build, args + ['--shard=a'])
+        self.assertNotEqual(0, result.exit_code)
+
+    def test_save_caches(self):
+        out_dir = os.path.join(self.test_pod_dir, 'build')
+        args = [self.test_pod_dir, '--no-preprocess',
+                '--out_dir={}'.format(out_dir)]
+        result = self.runner.invoke(build.build, args, catch_exceptions=False)
+        self.assertEqual(0, result.exit_code)
+        path = os.path.join(self.test_pod_dir, '.grow', 'cache', 'markdown')
+        self.assertTrue(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+from . import options
 from grow.common import utils
 from grow.deployments import stats
 from grow.deployments.destinations import base
@@ -21,9 +22,18 @@ import os
 @click.option('--auth',
               help='(deprecated) --auth must now be specified'
                    ' before deploy. Usage: grow --auth=user@example.com deploy')
+@click.option('--shard', callback=options.parse_shard,
+              help='Only deploy one of several disjoint shards of the pod,'
+                   ' specified as <index>/<count> (e.g. 2/4). Paths are'
+                   ' assigned to shards using a stable hash. Requires a'
+                   ' fixed fingerprint shared by every shard.')
+@click.option('--fingerprint',
+              help='Fingerprint used in fingerprinted paths (see'
+                   ' {env.fingerprint}), instead of the fingerprint configured'
+                   ' for the environment or the current time.')
 @click.pass_context
 def deploy(context, deployment_name, pod_path, preprocess, confirm, test,
-           test_only, auth):
+           test_only, auth, shard, fingerprint):
     """Deploys a pod to a destination."""
     if auth:
         text = ('--auth must now be specified before deploy. Usage:'
@@ -41,11 +51,13 @@ def deploy(context, deployment_name, pod_path, preprocess, confirm, test,
         if test_only:
             deployment.test()
             return
-        paths_to_contents = deployment.dump(pod)
+        paths_to_contents = deployment.iter_dump(
+            pod, shard=shard, fingerprint=fingerprint)
         repo = utils.get_git_repo(pod.root)
-        stats_obj = stats.Stats(pod, paths_to_contents=paths_to_contents)
+        stats_obj = stats.Stats(pod, full=False)
         deployment.deploy(paths_to_contents, stats=stats_obj, repo=repo,
-                          confirm=confirm, test=test)
+                          confirm=confirm, test=test, shard=shard)
+        pod.save_caches()
     except base.Error as e:
         raise click.ClickException(str(e))
     except pods.Error as e:
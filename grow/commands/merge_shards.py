@@ -0,0 +1,43 @@
+from grow.deployments import indexes
+from grow.deployments.destinations import local as local_destination
+import click
+import os
+
+
+@click.command()
+@click.argument('out_dir')
+@click.argument('shard_dirs', nargs=-1, required=True)
+def merge_shards(out_dir, shard_dirs):
+    """Merges the builds of a pod's shards into one build.
+
+    Copies the files of each shard's build (see `grow build --shard`) to
+    OUT_DIR and merges the shards' indexes into a single index, so the merged
+    build can be diffed against and deployed like an unsharded build.
+    """
+    out_dir = os.path.abspath(os.path.join(os.getcwd(), out_dir))
+    config = local_destination.Config(out_dir=out_dir)
+    destination = local_destination.LocalDestination(config)
+    shard_indexes = []
+    for shard_dir in shard_dirs:
+        shard_dir = os.path.abspath(os.path.join(os.getcwd(), shard_dir))
+        config = local_destination.Config(out_dir=shard_dir)
+        shard_destination = local_destination.LocalDestination(config)
+        try:
+            content = shard_destination.read_control_file(
+                shard_destination.index_basename)
+        except IOError:
+            text = 'No build index found in: {}'.format(shard_dir)
+            raise click.ClickException(text)
+        shard_index = indexes.Index.from_string(content)
+        for file_message in shard_index.files:
+            content = shard_destination.read_file(file_message.path)
+            destination.write_file(file_message.path, content)
+        shard_indexes.append(shard_index)
+    try:
+        index = indexes.Index.merge(shard_indexes)
+    except indexes.ConflictingFilesError as e:
+        raise click.ClickException(str(e))
+    destination.write_control_file(
+        destination.index_basename, indexes.Index.to_string(index))
+    text = 'Merged {} files from {} shards -> {}'
+    click.echo(text.format(len(index.files), len(shard_dirs), out_dir))
@@ -0,0 +1,13 @@
+"""Parsers for options shared by several commands."""
+
+from grow.pods import shards
+import click
+
+
+def parse_shard(context, param, value):
+    if value is None:
+        return None
+    try:
+        return shards.Shard.parse(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
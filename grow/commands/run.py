@@ -22,7 +22,9 @@ import threading
               help='Whether to check for updates to Grow.')
 @click.option('--preprocess/--no-preprocess', default=True, is_flag=True,
               help='Whether to run preprocessors on server start.')
-def run(host, port, https, debug, browser, update_check, preprocess,
+@click.option('--warm-up/--no-warm-up', default=True, is_flag=True,
+              help='Whether to compile templates on server start.')
+def run(host, port, https, debug, browser, update_check, preprocess, warm_up,
         pod_path):
     """Starts a development server for a single pod."""
     root = os.path.abspath(os.path.join(os.getcwd(), pod_path))
@@ -34,6 +36,6 @@ def run(host, port, https, debug, browser, update_check, preprocess,
     try:
         manager.start(pod, host=host, port=port, open_browser=browser,
                       debug=debug, preprocess=preprocess,
-                      update_check=update_check)
+                      update_check=update_check, warm_up=warm_up)
     except pods.Error as e:
         raise click.ClickException(str(e))
@@ -31,10 +31,11 @@ def stage(context, pod_path, remote, preprocess, subdomain):
         if preprocess:
             pod.preprocess()
         repo = utils.get_git_repo(pod.root)
-        paths_to_contents = deployment.dump(pod)
-        stats_obj = stats.Stats(pod, paths_to_contents=paths_to_contents)
+        paths_to_contents = deployment.iter_dump(pod)
+        stats_obj = stats.Stats(pod, full=False)
         deployment.deploy(paths_to_contents, stats=stats_obj, repo=repo,
                           confirm=False, test=False)
+        pod.save_caches()
     except base.Error as e:
         raise click.ClickException(str(e))
     except pods.Error as e:
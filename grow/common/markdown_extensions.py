@@ -4,11 +4,6 @@ from markdown import preprocessors
 from markdown.extensions import toc
 from protorpc import messages
 from protorpc import protojson
-from pygments import highlight
-from pygments import lexers
-from pygments.formatters import html
-from pygments.lexers import TextLexer
-from pygments.lexers import get_lexer_by_name
 import json
 import re
 
@@ -140,11 +135,6 @@ class CodeBlockPreprocessor(preprocessors.Preprocessor):
         self.pod = pod
         self.markdown = markdown_instance
 
-    @property
-    @utils.memoize
-    def formatter(self):
-        return html.HtmlFormatter(noclasses=(not self.config.classes))
-
     @property
     @utils.memoize
     def config(self):
@@ -158,11 +148,8 @@ class CodeBlockPreprocessor(preprocessors.Preprocessor):
             language = m.group(1)
             content = m.group(2)
             if self.config.highlighter == 'pygments':
-                try:
-                    lexer = lexers.get_lexer_by_name(language)
-                except ValueError:
-                    lexer = lexers.TextLexer()
-                code = highlight(content, lexer, self.formatter)
+                code = self.pod.highlight_cache.highlight(
+                    language, content, noclasses=(not self.config.classes))
                 return '\n\n<div class="%s">%s</div>\n\n' % (class_name, code)
             elif self.config.highlighter == 'plain':
                 return '\n\n<pre><code class="%s">%s</code></pre>\n\n' \
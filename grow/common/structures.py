@@ -1,5 +1,48 @@
 from bisect import bisect_left
 from bisect import bisect_right
+import collections
+
+_MISSING = object()
+
+
+class LazyList(collections.MutableSequence):
+    '''List of func(item) for each item of a source list, with each item
+    created when first accessed.'''
+
+    def __init__(self, source, func):
+        self._source = list(source)
+        self._func = func
+        self._items = [_MISSING] * len(self._source)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        item = self._items[i]
+        if item is _MISSING:
+            item = self._items[i] = self._func(self._source[i])
+        return item
+
+    def __setitem__(self, i, item):
+        if isinstance(i, slice):
+            raise TypeError('Slice assignment is not supported.')
+        self._items[i] = item
+
+    def __delitem__(self, i):
+        del self._items[i]
+        del self._source[i]
+
+    def __len__(self):
+        return len(self._items)
+
+    def insert(self, i, item):
+        self._items.insert(i, item)
+        self._source.insert(i, _MISSING)
+
+    def copy(self):
+        result = self.__class__((), self._func)
+        result._source = list(self._source)
+        result._items = list(self._items)
+        return result
 
 
 class SortedCollection(object):
@@ -78,6 +121,8 @@ class SortedCollection(object):
         self._keys = [k for k, item in decorated]
         self._items = [item for k, item in decorated]
         self._key = key
+        self._indexes = {}
+        self.source = None
 
     def _getkey(self):
         return self._key
@@ -95,7 +140,43 @@ class SortedCollection(object):
         self.__init__([], self._key)
 
     def copy(self):
-        return self.__class__(self, self._key)
+        result = self.__class__(key=self._given_key)
+        result._keys = list(self._keys)
+        if isinstance(self._items, LazyList):
+            result._items = self._items.copy()
+        else:
+            result._items = list(self._items)
+        # Indexes are shared until either collection is modified.
+        result._indexes = self._indexes
+        result.source = self.source
+        return result
+
+    def map(self, func):
+        'Return a copy with func(item) in place of each item, in the same order'
+        result = self.__class__(key=self._given_key)
+        result._keys = list(self._keys)
+        result._items = [func(item) for item in self._items]
+        return result
+
+    def lazy_map(self, func):
+        '''Return a copy with func(item) in place of each item, in the same
+        order, calling func when each item is first accessed. The copy's
+        source is this collection, until the copy is modified'''
+        result = self.__class__(key=self._given_key)
+        result._keys = list(self._keys)
+        result._items = LazyList(self._items, func)
+        result.source = self
+        return result
+
+    def get_index(self, key):
+        'Return a dict mapping key(item) to the position of its first item'
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            for i, item in enumerate(self._items):
+                index.setdefault(key(item), i)
+            self._indexes[key] = index
+        return index
 
     def __len__(self):
         return len(self._items)
@@ -145,6 +226,21 @@ class SortedCollection(object):
         i = bisect_left(self._keys, k)
         self._keys.insert(i, k)
         self._items.insert(i, item)
+        self._indexes = {}
+        self.source = None
+
+    def insert_all(self, items):
+        'Insert new items in bulk, ordered as if inserted one at a time'
+        # A stable sort of the new items (latest first, as equal keys are
+        # added to the left) followed by the existing items.
+        decorated = [(self._key(item), item) for item in items]
+        decorated.reverse()
+        decorated.extend(zip(self._keys, self._items))
+        decorated.sort(key=lambda pair: pair[0])
+        self._keys = [k for k, item in decorated]
+        self._items = [item for k, item in decorated]
+        self._indexes = {}
+        self.source = None
 
     def insert_right(self, item):
         'Insert a new item.  If equal keys are found, add to the right'
@@ -152,12 +248,16 @@ class SortedCollection(object):
         i = bisect_right(self._keys, k)
         self._keys.insert(i, k)
         self._items.insert(i, item)
+        self._indexes = {}
+        self.source = None
 
     def remove(self, item):
         'Remove first occurence of item.  Raise ValueError if not found'
         i = self.index(item)
         del self._keys[i]
         del self._items[i]
+        self._indexes = {}
+        self.source = None
 
     def find(self, k):
         'Return first item with a key == k.  Raise ValueError if not found.'
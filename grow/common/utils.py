@@ -8,6 +8,7 @@ except ImportError:
         from io import StringIO
 from boltons import iterutils
 import bs4
+import collections
 import csv as csv_lib
 import functools
 import gettext
@@ -128,22 +129,66 @@ def validate_name(name):
             'backslashes, and dashes. Found: "{}"'.format(name))
 
 
+# Memoized functions, for reporting the effectiveness of their caches.
+_memoized = []
+
+
 class memoize(object):
+    """Caches the results of a function keyed by its arguments.
+
+    Results are kept in least recently used order. Once a cache holds
+    `max_size` results, the least recently used result is evicted, and results
+    older than `ttl` seconds (if set) are computed again. Calls with
+    unhashable arguments are not cached. Use `memoize.bounded(max_size, ttl)`
+    to create a decorator with other limits, e.g. for methods of objects that
+    are created often, whose results are cached per instance.
+    """
 
-    def __init__(self, func):
+    max_size = 1024
+    ttl = None
+
+    def __init__(self, func, max_size=SENTINEL, ttl=None):
         self.func = func
-        self.cache = {}
+        if max_size is not SENTINEL:
+            self.max_size = max_size
+        if ttl is not None:
+            self.ttl = ttl
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        _memoized.append(self)
+
+    @classmethod
+    def bounded(cls, max_size, ttl=None):
+        return lambda func: cls(func, max_size=max_size, ttl=ttl)
+
+    @property
+    def name(self):
+        return '{}.{}'.format(self.func.__module__, self.func.__name__)
 
     def __call__(self, *args, **kwargs):
         key = (args, frozenset(kwargs.items()))
         try:
-            return self.cache[key]
+            with self._lock:
+                value, created = self.cache.pop(key)
+                if self.ttl is None or time.time() - created < self.ttl:
+                    self.cache[key] = (value, created)
+                    self.hits += 1
+                    return value
         except KeyError:
-            value = self.func(*args, **kwargs)
-            self.cache[key] = value
-            return value
+            pass
         except TypeError:
             return self.func(*args, **kwargs)
+        value = self.func(*args, **kwargs)
+        with self._lock:
+            self.misses += 1
+            self.cache[key] = (value, time.time())
+            while self.max_size is not None and len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
+        return value
 
     def __repr__(self):
         return self.func.__doc__
@@ -154,7 +199,25 @@ class memoize(object):
         return fn
 
     def _reset(self):
-        self.cache = {}
+        with self._lock:
+            self.cache = collections.OrderedDict()
+
+    def get_stats(self):
+        return {
+            'evictions': self.evictions,
+            'hits': self.hits,
+            'misses': self.misses,
+            'name': self.name,
+            'size': len(self.cache),
+        }
+
+
+def get_memoize_stats():
+    """Returns the stats of each memoized function that was called, sorted by
+    name."""
+    stats = [func.get_stats() for func in _memoized
+             if func.hits or func.misses]
+    return sorted(stats, key=lambda item: item['name'])
 
 
 class cached_property(property):
@@ -195,6 +258,7 @@ class cached_property(property):
 
 
 class memoize_tag(memoize):
+    max_size = 4096
 
     def __call__(self, *args, **kwargs):
         use_cache = kwargs.pop('use_cache', False)
@@ -207,6 +271,21 @@ def every_two(l):
     return zip(l[::2], l[1::2])
 
 
+def _get_yaml_tag_funcs(pod, doc=None):
+    """Returns a mapping of custom YAML tags to the functions constructing
+    their values from scalars."""
+    get_locale = lambda: doc.locale if doc else None
+    return {
+        u'!_': gettext.gettext,
+        u'!g.csv': lambda path: pod.read_csv(path),
+        u'!g.doc': lambda path: pod.get_doc(path, locale=get_locale()),
+        u'!g.json': lambda path: pod.read_json(path),
+        u'!g.static': lambda path: pod.get_static(path, locale=get_locale()),
+        u'!g.url': lambda path: pod.get_url(path, locale=get_locale()),
+        u'!g.yaml': lambda path: pod.read_yaml(path),
+    }
+
+
 def make_yaml_loader(pod, doc=None):
     class YamlLoader(yaml_Loader):
 
@@ -218,51 +297,96 @@ def make_yaml_loader(pod, doc=None):
                 return items
             return func(node.value)
 
-        def construct_csv(self, node):
-            return self._construct_func(node, pod.read_csv)
+    for tag, func in _get_yaml_tag_funcs(pod, doc=doc).iteritems():
+        YamlLoader.add_constructor(
+            tag, lambda loader, node, func=func: loader._construct_func(node, func))
+    return YamlLoader
 
-        def construct_doc(self, node):
-            locale = doc.locale if doc else None
-            func = lambda path: pod.get_doc(path, locale=locale)
-            return self._construct_func(node, func)
 
-        def construct_gettext(self, node):
-            return self._construct_func(node, gettext.gettext)
+class YamlReference(object):
+    """An unresolved custom YAML tag, allowing parsed YAML to be cached
+    independently of the files and documents that tags refer to."""
 
-        def construct_json(self, node):
-            return self._construct_func(node, pod.read_json)
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
 
-        def construct_static(self, node):
-            locale = doc.locale if doc else None
-            func = lambda path: pod.get_static(path, locale=locale)
-            return self._construct_func(node, func)
+    def __eq__(self, other):
+        return (isinstance(other, YamlReference)
+                and (self.tag, self.value) == (other.tag, other.value))
 
-        def construct_url(self, node):
-            locale = doc.locale if doc else None
-            func = lambda path: pod.get_url(path, locale=locale)
-            return self._construct_func(node, func)
+    def __ne__(self, other):
+        return not self.__eq__(other)
 
-        def construct_yaml(self, node):
-            return self._construct_func(node, pod.read_yaml)
+    def __hash__(self):
+        value = self.value
+        return hash((self.tag, tuple(value) if isinstance(value, list) else value))
+
+    def __repr__(self):
+        return '<YamlReference({} {!r})>'.format(self.tag, self.value)
+
+
+class UnreferenceableYamlError(Error, ValueError):
+    """Raised when a custom YAML tag cannot be stored as a reference."""
+
+
+class YamlReferenceLoader(yaml_Loader):
+    """Loads YAML leaving custom tags as YamlReference objects."""
+
+    def construct_reference(self, node):
+        if isinstance(node, yaml.SequenceNode):
+            value = [each.value for each in node.value]
+        elif isinstance(node, yaml.ScalarNode):
+            value = node.value
+        else:
+            raise UnreferenceableYamlError(
+                'Unsupported node for {}: {}'.format(node.tag, node.id))
+        return YamlReference(node.tag, value)
 
-    YamlLoader.add_constructor(u'!_', YamlLoader.construct_gettext)
-    YamlLoader.add_constructor(u'!g.csv', YamlLoader.construct_csv)
-    YamlLoader.add_constructor(u'!g.doc', YamlLoader.construct_doc)
-    YamlLoader.add_constructor(u'!g.json', YamlLoader.construct_json)
-    YamlLoader.add_constructor(u'!g.static', YamlLoader.construct_static)
-    YamlLoader.add_constructor(u'!g.url', YamlLoader.construct_url)
-    YamlLoader.add_constructor(u'!g.yaml', YamlLoader.construct_yaml)
-    return YamlLoader
+
+for _tag in _get_yaml_tag_funcs(None):
+    YamlReferenceLoader.add_constructor(
+        _tag, YamlReferenceLoader.construct_reference)
+
+
+def load_yaml_references(content):
+    """Parses YAML, leaving custom tags unresolved (see `resolve_yaml`)."""
+    return yaml.load(content, Loader=YamlReferenceLoader)
+
+
+def resolve_yaml(data, pod=None, doc=None):
+    """Returns a copy of YAML parsed by `load_yaml_references`, with custom
+    tags resolved as `load_yaml` would."""
+    tag_funcs = _get_yaml_tag_funcs(pod, doc=doc)
+
+    def resolve(value):
+        if isinstance(value, YamlReference):
+            func = tag_funcs[value.tag]
+            if isinstance(value.value, list):
+                return [func(item) for item in value.value]
+            return func(value.value)
+        if isinstance(value, dict):
+            return dict((resolve(key), resolve(item))
+                        for key, item in value.iteritems())
+        if isinstance(value, list):
+            return [resolve(item) for item in value]
+        return value
+
+    return resolve(data)
 
 
 def load_yaml(*args, **kwargs):
     pod = kwargs.pop('pod', None)
     doc = kwargs.pop('doc', None)
+    yaml_cache = getattr(pod, 'yaml_cache', None)
+    if (yaml_cache is not None and len(args) == 1 and not kwargs
+            and isinstance(args[0], basestring)):
+        return yaml_cache.load(args[0], doc=doc) or {}
     loader = make_yaml_loader(pod, doc=doc)
     return yaml.load(*args, Loader=loader, **kwargs) or {}
 
 
-@memoize
+@memoize.bounded(1024)
 def parse_yaml(content, pod=None):
     return load_yaml(content, pod=pod)
 
@@ -297,47 +421,171 @@ class JsonEncoder(json.JSONEncoder):
         raise TypeError(repr(obj) + ' is not JSON serializable.')
 
 
-@memoize
-def untag_fields(fields, locale=None):
-    """Untags fields, handling translation priority."""
+_UNTAG_ENTER, _UNTAG_EXIT, _UNTAG_VALUE, _UNTAG_REF = range(4)
+_UNTAG_KEEP, _UNTAG_DROP, _UNTAG_LOCALIZED = range(3)
+_UNTAG_SCALAR_TYPES = frozenset(
+    [bool, float, int, long, str, unicode, type(None)])
 
-    updated_localized_paths = set()
-    paths_to_keep_tagged = set()
 
-    def visit(path, key, value):
-        if (path, key) in updated_localized_paths:
-            return False
+def _get_untag_items(value):
+    """Returns the items of a container traversed when untagging, or None if
+    the value is not traversed."""
+    value_type = type(value)
+    if value_type is dict:
+        return value.items()
+    if value_type is list:
+        return list(enumerate(value))
+    if value_type in _UNTAG_SCALAR_TYPES:
+        return None
+    try:
+        iter(value)
+    except TypeError:
+        return None
+    if isinstance(value, basestring):
+        return None
+    if isinstance(value, collections.Mapping):
+        return [(key, value[key]) for key in value]
+    if isinstance(value, (collections.Sequence, collections.Set)):
+        return list(enumerate(value))
+    return None
+
+
+class UntagPlan(object):
+    """A plan to untag fields, compiled once and run for any locale.
+
+    Compiling walks the fields and resolves everything that does not depend
+    on the locale: the order in which keys are visited, which keys are
+    localized (and for which locale), and which are comments or tagged. Running
+    the plan for a locale is then a single pass that builds the untagged
+    fields, with the same results as untagging the fields directly.
+
+    The plan holds the values of the fields when compiled, so it must be
+    compiled again if the fields are modified.
+    """
+
+    def __init__(self, fields):
+        self.locales = set()
+        self._instructions = []
+        self._num_containers = 0
+        self._slots = {}
+        self._compile(fields)
+
+    def _get_slot(self, path, key):
+        return self._slots.setdefault((path, key), len(self._slots))
+
+    def _compile_visit(self, path, key, value):
         if not isinstance(key, basestring):
-            return key, value
-        if (path, key.rstrip('@')) in updated_localized_paths:
-            return False
+            return (self._get_slot(path, key), None, _UNTAG_KEEP, key, None,
+                    None, False)
+        raw_slot = self._get_slot(path, key)
+        if '@' not in key:
+            return (raw_slot, None, _UNTAG_KEEP, key, None, None, False)
+        stripped_slot = self._get_slot(path, key.rstrip('@'))
         if key.endswith('@#'):
-            return False
+            return (raw_slot, stripped_slot, _UNTAG_DROP, None, None, None,
+                    False)
+        keep_tagged = False
         if key.endswith('@'):
-            if isinstance(value, list):
-                paths_to_keep_tagged.add((path, key))
+            keep_tagged = isinstance(value, list)
             key = key[:-1]
         match = LOCALIZED_KEY_REGEX.match(key)
         if not match:
-            return key, value
+            return (raw_slot, stripped_slot, _UNTAG_KEEP, key, None, None,
+                    keep_tagged)
         untagged_key, locale_from_key = match.groups()
-        if locale_from_key != locale:
-            return False
-        updated_localized_paths.add((path, untagged_key.rstrip('@')))
-        return untagged_key, value
-
-    # Backwards compatibility for https://github.com/grow/grow/issues/95
-    def exit(path, key, old_parent, new_parent, new_items):
-        resp = iterutils.default_exit(path, key, old_parent,
-                                      new_parent, new_items)
-        if paths_to_keep_tagged and isinstance(resp, dict):
-            for key, value in resp.items():
-                new_key = '{}@'.format(key)
-                resp[new_key] = value
-            paths_to_keep_tagged.clear()
-        return resp
-
-    return iterutils.remap(fields, visit=visit, exit=exit)
+        self.locales.add(locale_from_key)
+        return (raw_slot, stripped_slot, _UNTAG_LOCALIZED, untagged_key,
+                locale_from_key, self._get_slot(path, untagged_key.rstrip('@')),
+                keep_tagged)
+
+    def _compile(self, root):
+        ids_to_indexes = {}
+        instructions = self._instructions
+
+        def compile_value(path, key, value, is_root=False):
+            # Containers that occur more than once are untagged once.
+            index = ids_to_indexes.get(id(value))
+            if index is not None:
+                instructions.append(
+                    (_UNTAG_REF, index, self._compile_visit(path, key, value)))
+                return
+            items = _get_untag_items(value)
+            if items is None:
+                if is_root:
+                    raise TypeError(
+                        'expected remappable root, not: %r' % value)
+                instructions.append(
+                    (_UNTAG_VALUE, value, self._compile_visit(path, key, value)))
+                return
+            index = self._num_containers
+            self._num_containers += 1
+            ids_to_indexes[id(value)] = index
+            instructions.append((_UNTAG_ENTER, index, value.__class__))
+            child_path = path if is_root else path + (key,)
+            for child_key, child_value in items:
+                compile_value(child_path, child_key, child_value)
+            visit = None if is_root else self._compile_visit(path, key, value)
+            instructions.append((_UNTAG_EXIT, index, visit))
+
+        compile_value((), None, root, is_root=True)
+
+    def untag(self, locale=None):
+        """Returns the fields untagged for a locale."""
+        updated_slots = set()
+        keep_tagged = False
+        results = [None] * self._num_containers
+        stack = []
+        items = None
+        for op, arg, visit in self._instructions:
+            if op == _UNTAG_ENTER:
+                # Entering a container, `visit` is the container's class.
+                new_parent = visit()
+                results[arg] = new_parent
+                stack.append((new_parent, items))
+                items = []
+                continue
+            if op == _UNTAG_EXIT:
+                new_parent, parent_items = stack.pop()
+                if type(new_parent) is dict:
+                    new_parent.update(items)
+                    value = new_parent
+                elif type(new_parent) is list:
+                    new_parent.extend([item for _, item in items])
+                    value = new_parent
+                else:
+                    value = iterutils.default_exit(
+                        None, None, None, new_parent, items)
+                # Backwards compatibility for
+                # https://github.com/grow/grow/issues/95
+                if keep_tagged and isinstance(value, dict):
+                    for key, item in value.items():
+                        value['{}@'.format(key)] = item
+                    keep_tagged = False
+                results[arg] = value
+                items = parent_items
+                if visit is None:
+                    return value
+            elif op == _UNTAG_VALUE:
+                value = arg
+            else:
+                value = results[arg]
+            (raw_slot, stripped_slot, kind, key, locale_from_key, slot,
+             keep) = visit
+            if (raw_slot in updated_slots or stripped_slot in updated_slots
+                    or kind == _UNTAG_DROP):
+                continue
+            if keep:
+                keep_tagged = True
+            if kind == _UNTAG_LOCALIZED:
+                if locale_from_key != locale:
+                    continue
+                updated_slots.add(slot)
+            items.append((key, value))
+
+
+def untag_fields(fields, locale=None):
+    """Untags fields, handling translation priority."""
+    return UntagPlan(fields).untag(locale)
 
 
 def LocaleIterator(iterator, locale):
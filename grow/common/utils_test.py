@@ -38,6 +38,58 @@ class UtilsTestCase(unittest.TestCase):
         ]
         self.assertEqual(expected_docs, result['docs'])
 
+    def test_memoize(self):
+        calls = []
+
+        @utils.memoize.bounded(2)
+        def double(value):
+            calls.append(value)
+            return value * 2
+
+        self.assertEqual(2, double(1))
+        self.assertEqual(2, double(1))
+        self.assertEqual(4, double(2))
+        self.assertEqual(2, double(1))
+        # Evicts the least recently used result.
+        self.assertEqual(6, double(3))
+        self.assertEqual(2, double(1))
+        self.assertEqual(4, double(2))
+        self.assertEqual([1, 2, 3, 2], calls)
+        self.assertEqual(['a', 'a'], double(['a']))
+        self.assertEqual({
+            'evictions': 2,
+            'hits': 3,
+            'misses': 4,
+            'name': 'grow.common.utils_test.double',
+            'size': 2,
+        }, double.get_stats())
+        self.assertIn(double.get_stats(), utils.get_memoize_stats())
+
+        # Caches are bounded by default.
+        @utils.memoize
+        def identity(value):
+            return value
+
+        for i in range(utils.memoize.max_size + 1):
+            identity(i)
+        self.assertEqual(utils.memoize.max_size, identity.get_stats()['size'])
+        self.assertEqual(1, identity.get_stats()['evictions'])
+
+        # Results expire after their time to live.
+        @utils.memoize.bounded(None, ttl=60)
+        def expiring(value):
+            calls.append(value)
+            return value
+
+        with mock.patch('time.time', return_value=0):
+            expiring(1)
+        with mock.patch('time.time', return_value=59):
+            expiring(1)
+        with mock.patch('time.time', return_value=60):
+            expiring(1)
+        self.assertEqual([1, 1], calls[-2:])
+        self.assertEqual(1, expiring.get_stats()['hits'])
+
     def test_version_enforcement(self):
         with mock.patch('grow.pods.pods.Pod.grow_version',
                         new_callable=mock.PropertyMock) as mock_version:
@@ -344,6 +396,38 @@ class UtilsTestCase(unittest.TestCase):
             },
         }, utils.untag_fields(fields, locale='fr'))
 
+    def test_untag_plan(self):
+        shared = {'title': 'value-none', 'title@fr': 'value-fr'}
+        fields = {
+            'a': shared,
+            'b': [shared],
+            'comment@#': 'comment',
+            'list@': ['item'],
+            'title@de': 'value-de',
+            'title@fr': 'value-fr',
+        }
+        plan = utils.UntagPlan(fields)
+        self.assertEqual(set(['de', 'fr']), plan.locales)
+        for locale in (None, 'de', 'fr', 'ja'):
+            expected = utils.untag_fields(copy.deepcopy(fields), locale=locale)
+            result = plan.untag(locale)
+            self.assertEqual(expected, result)
+            # Containers that occur more than once are untagged once.
+            self.assertIs(result['a'], result['b'][0])
+            # Each run returns new fields.
+            self.assertIsNot(result, plan.untag(locale))
+        self.assertEqual({
+            'a': {'title': 'value-fr'},
+            'a@': {'title': 'value-fr'},
+            'b': [{'title': 'value-fr'}],
+            'b@': [{'title': 'value-fr'}],
+            'list': ['item'],
+            'list@': ['item'],
+            'title': 'value-fr',
+            'title@': 'value-fr',
+        }, plan.untag('fr'))
+        self.assertRaises(TypeError, utils.UntagPlan, None)
+
 
 if __name__ == '__main__':
     unittest.main()
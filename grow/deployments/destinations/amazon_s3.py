@@ -44,11 +44,14 @@ class AmazonS3Destination(base.BaseDestination):
                 return boto_connection.create_bucket(self.config.bucket)
             raise
 
-    def dump(self, pod):
-        pod.env = self.get_env()
-        return pod.dump(
+    def iter_dump(self, pod, workers=None, incremental=False, profile=None,
+                  shard=None, fingerprint=None):
+        self._set_env(pod, shard=shard, fingerprint=fingerprint)
+        return pod.iter_dump(
             suffix=self.config.index_document,
-            append_slashes=self.config.redirect_trailing_slashes)
+            append_slashes=self.config.redirect_trailing_slashes,
+            workers=workers, incremental=incremental, profile=profile,
+            shard=shard)
 
     def prelaunch(self, dry_run=False):
         if dry_run:
@@ -11,7 +11,8 @@ Grow implements features such as "password protection" and geolocation.
 
 The deployment process generally works like this:
 
-  (1) A pod is exported, creating a dictionary mapping file paths to content.
+  (1) A pod is exported, creating a dictionary mapping file paths to content
+      (or a stream of file paths and content, see `iter_dump`).
   (2) A connection is made between Grow and the destination.
   (3) Control files are retrieved from the destination, if they exist. All
       control files are serialized ProtoRPC messages. The most important
@@ -138,12 +139,15 @@ class BaseDestination(object):
             return self.config.control_dir
         return self._control_dir
 
-    def _get_remote_index(self):
+    def _get_remote_index(self, shard=None):
         try:
             content = self.read_control_file(self.index_basename)
-            return indexes.Index.from_string(content)
+            index = indexes.Index.from_string(content)
         except IOError:
             return indexes.Index.create()
+        if shard is not None:
+            return indexes.Index.filter(index, shard.contains)
+        return index
 
     def get_env(self):
         """Returns an environment object based on the config."""
@@ -214,18 +218,73 @@ class BaseDestination(object):
     def login(self, account, reauth=False):
         pass
 
-    def dump(self, pod):
+    def dump(self, pod, workers=None, incremental=False, profile=None,
+             shard=None, fingerprint=None):
+        return dict(self.iter_dump(pod, workers=workers,
+                                   incremental=incremental, profile=profile,
+                                   shard=shard, fingerprint=fingerprint))
+
+    def iter_dump(self, pod, workers=None, incremental=False, profile=None,
+                  shard=None, fingerprint=None):
+        """Returns an iterator of (path, content) tuples for the build."""
+        self._set_env(pod, shard=shard, fingerprint=fingerprint)
+        return pod.iter_dump(workers=workers, incremental=incremental,
+                             profile=profile, shard=shard)
+
+    def _set_env(self, pod, shard=None, fingerprint=None):
+        """Sets the environment that the pod is built in.
+
+        Fingerprinted paths depend on the environment's fingerprint, which
+        defaults to the current time, so a sharded build requires a fixed
+        fingerprint for every shard to assign paths to the same shards.
+        """
         pod.env = self.get_env()
-        return pod.dump()
+        if fingerprint:
+            pod.env.config.fingerprint = fingerprint
+            pod.env.fingerprint = fingerprint
+        elif shard is not None and not pod.env.config.fingerprint:
+            text = ('Sharded builds require a fixed fingerprint. Specify the'
+                    ' same --fingerprint for every shard, or set "fingerprint"'
+                    ' in the env of deployment: {}')
+            raise Error(text.format(self))
 
     def deploy(self, paths_to_contents, stats=None,
-               repo=None, dry_run=False, confirm=False, test=True):
+               repo=None, dry_run=False, confirm=False, test=True,
+               shard=None):
+        """Deploys a build to the destination.
+
+        `paths_to_contents` is either a dict mapping paths to content, or an
+        iterable of (path, content) tuples (see `iter_dump`). Iterables are
+        indexed, diffed and written as they are consumed, unless the
+        deployment requires the full diff upfront (confirmation, dry runs and
+        destinations using batch writes).
+
+        Streamed files are written while the build is rendered, so a build
+        that fails part way leaves the files written so far at the
+        destination. The deployed index is then updated to list the files
+        actually at the destination before the error is raised, and files
+        are only deleted once the whole build was written.
+
+        When deploying a shard of a build (see `shards.Shard`), the build is
+        only diffed against the deployed files belonging to the shard, and
+        only the shard's files are replaced in the deployed index. Shards of
+        the same build should be deployed one after another.
+        """
+        if not isinstance(paths_to_contents, dict):
+            if confirm or dry_run or self.batch_writes:
+                paths_to_contents = dict(paths_to_contents)
+                if stats is not None and stats.paths is None:
+                    stats.paths = paths_to_contents.keys()
+            else:
+                return self._deploy_stream(
+                    paths_to_contents, stats=stats, repo=repo, test=test,
+                    shard=shard)
         self._confirm = confirm
         self.prelaunch(dry_run=dry_run)
         if test:
             self.test()
         try:
-            deployed_index = self._get_remote_index()
+            deployed_index = self._get_remote_index(shard=shard)
             new_index = indexes.Index.create(paths_to_contents)
             if repo:
                 indexes.Index.add_repo(new_index, repo)
@@ -246,18 +305,64 @@ class BaseDestination(object):
                 diff, paths_to_contents, write_func=self.write_file,
                 delete_func=self.delete_file, threaded=self.threaded,
                 batch_writes=self.batch_writes)
-            self.write_control_file(self.index_basename, indexes.Index.to_string(new_index))
-            if stats is not None:
-                self.write_control_file(self.stats_basename, stats.to_string())
-            else:
-                self.delete_control_file(self.stats_basename)
-            if diff:
-                self.write_control_file(self.diff_basename, indexes.Diff.to_string(diff))
+            self._write_control_files(new_index, diff, stats, shard=shard)
             self.success = True
         finally:
             self.postlaunch()
         return diff
 
+    def _deploy_stream(self, paths_to_contents, stats=None, repo=None,
+                       test=True, shard=None):
+        self._confirm = False
+        self.prelaunch()
+        if test:
+            self.test()
+        try:
+            deployed_index = self._get_remote_index(shard=shard)
+            try:
+                new_index, diff = indexes.Diff.stream(
+                    paths_to_contents, deployed_index,
+                    write_func=self.write_file, delete_func=self.delete_file,
+                    repo=repo, threaded=self.threaded)
+            except indexes.PartialDeployError as e:
+                # Keeps the deployed index in sync with the files written
+                # before the failure, so the next deployment rewrites the rest.
+                logging.error(str(e))
+                self._write_index(e.index, shard=shard)
+                raise e.exc_info[0], e.exc_info[1], e.exc_info[2]
+            self._diff = diff
+            if stats is not None and stats.paths is None:
+                stats.paths = [file_message.path
+                               for file_message in new_index.files]
+            if indexes.Diff.is_empty(diff):
+                logging.info('Finished with no diffs since the last build.')
+                return
+            indexes.Diff.pretty_print(diff)
+            self._write_control_files(new_index, diff, stats, shard=shard)
+            self.success = True
+        finally:
+            self.postlaunch()
+        return diff
+
+    def _write_index(self, index, shard=None):
+        if shard is not None:
+            # Keeps the files of other shards in the deployed index.
+            other_shards_index = indexes.Index.filter(
+                self._get_remote_index(), lambda path: not shard.contains(path))
+            index = indexes.Index.merge([index, other_shards_index])
+        self.write_control_file(self.index_basename, indexes.Index.to_string(index))
+
+    def _write_control_files(self, index, diff, stats, shard=None):
+        self._write_index(index, shard=shard)
+        # Stats only describe a shard, so the deployed stats are left as-is.
+        if shard is None:
+            if stats is not None:
+                self.write_control_file(self.stats_basename, stats.to_string())
+            else:
+                self.delete_control_file(self.stats_basename)
+        if diff:
+            self.write_control_file(self.diff_basename, indexes.Diff.to_string(diff))
+
     def command(self, command):
         with io.BytesIO() as fp:
             proc = subprocess.Popen(command, stdout=subprocess.PIPE,
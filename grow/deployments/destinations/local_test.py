@@ -1,4 +1,6 @@
 from . import local
+from .. import indexes
+import tempfile
 import unittest
 
 
@@ -10,6 +12,23 @@ class LocalDestinationTestCase(unittest.TestCase):
         # Weakly verify out_dir is expanded.
         self.assertNotIn('~', destination.out_dir)
 
+    def test_deploy_error(self):
+        config = local.Config(out_dir=tempfile.mkdtemp())
+        destination = local.LocalDestination(config)
+
+        def iter_paths_to_contents():
+            yield '/file.txt', 'test'
+            raise ValueError('Render failed.')
+
+        self.assertRaises(ValueError, destination.deploy,
+                          iter_paths_to_contents(), test=False)
+        # The deployed index lists the files written before the error.
+        content = destination.read_control_file(destination.index_basename)
+        index = indexes.Index.from_string(content)
+        self.assertEqual(
+            ['/file.txt'], [file_message.path for file_message in index.files])
+        self.assertEqual('test', destination.read_file('/file.txt'))
+
 
 if __name__ == '__main__':
     unittest.main()
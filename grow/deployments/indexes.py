@@ -11,7 +11,9 @@ import datetime
 import hashlib
 import logging
 import progressbar
+import sys
 import texttable
+import threading
 
 
 class Error(Exception):
@@ -22,6 +24,24 @@ class CorruptIndexError(Error):
     pass
 
 
+class ConflictingFilesError(Error):
+    pass
+
+
+class PartialDeployError(Error):
+    """Raised when deploying a stream of files fails after some of the files
+    were written or deleted.
+
+    `index` lists the files at the destination as a result of the failed
+    deployment, and `exc_info` is the exception that caused it.
+    """
+
+    def __init__(self, message, index, exc_info):
+        super(PartialDeployError, self).__init__(message)
+        self.index = index
+        self.exc_info = exc_info
+
+
 class Diff(object):
     POOL_SIZE = 100  # Thread pool size for applying a diff.
 
@@ -86,47 +106,58 @@ class Diff(object):
 
     @classmethod
     def create(cls, index, theirs, repo=None):
-        git = common_utils.get_git()
         diff = messages.DiffMessage()
         diff.indexes = []
         diff.indexes.append(theirs or messages.IndexMessage())
         diff.indexes.append(index or messages.IndexMessage())
 
-        index_paths_to_shas = {}
-        their_paths_to_shas = {}
+        their_paths_to_shas = cls._get_paths_to_shas(theirs)
+        for file_message in index.files:
+            cls._add_file(diff, file_message, theirs, their_paths_to_shas)
+        cls._add_deletes(diff, theirs, their_paths_to_shas)
+        cls._add_what_changed(diff, index, theirs, repo)
+        return diff
 
+    @classmethod
+    def _get_paths_to_shas(cls, index):
+        paths_to_shas = {}
         for file_message in index.files:
-            index_paths_to_shas[file_message.path] = file_message.sha
-        for file_message in theirs.files:
-            their_paths_to_shas[file_message.path] = file_message.sha
-
-        for path, sha in index_paths_to_shas.iteritems():
-            if path in their_paths_to_shas:
-                if index_paths_to_shas[path] == their_paths_to_shas[path]:
-                    file_message = messages.FileMessage()
-                    file_message.path = path
-                    file_message.deployed = theirs.deployed
-                    file_message.deployed_by = theirs.deployed_by
-                    diff.nochanges.append(file_message)
-                else:
-                    file_message = messages.FileMessage()
-                    file_message.path = path
-                    file_message.deployed = theirs.deployed
-                    file_message.deployed_by = theirs.deployed_by
-                    diff.edits.append(file_message)
-                del their_paths_to_shas[path]
-            else:
-                file_message = messages.FileMessage()
-                file_message.path = path
-                diff.adds.append(file_message)
+            paths_to_shas[file_message.path] = file_message.sha
+        return paths_to_shas
 
-        for path, sha in their_paths_to_shas.iteritems():
+    @classmethod
+    def _add_file(cls, diff, index_file_message, theirs, their_paths_to_shas):
+        """Adds a file from the local index to the diff, consuming its entry
+        from `their_paths_to_shas`. Returns the diff's file message if the
+        file must be written to the destination, otherwise None."""
+        path = index_file_message.path
+        file_message = messages.FileMessage()
+        file_message.path = path
+        if path not in their_paths_to_shas:
+            diff.adds.append(file_message)
+            return file_message
+        file_message.deployed = theirs.deployed
+        file_message.deployed_by = theirs.deployed_by
+        their_sha = their_paths_to_shas.pop(path)
+        if index_file_message.sha == their_sha:
+            diff.nochanges.append(file_message)
+            return None
+        diff.edits.append(file_message)
+        return file_message
+
+    @classmethod
+    def _add_deletes(cls, diff, theirs, their_paths_to_shas):
+        for path in their_paths_to_shas:
             file_message = messages.FileMessage()
             file_message.path = path
             file_message.deployed = theirs.deployed
             file_message.deployed_by = theirs.deployed_by
             diff.deletes.append(file_message)
 
+    @classmethod
+    def _add_what_changed(cls, diff, index, theirs, repo):
+        git = common_utils.get_git()
+
         # What changed in the pod between deploy commits.
         if (repo is not None
             and index.commit and index.commit.sha
@@ -152,7 +183,113 @@ class Diff(object):
               what_changed = what_changed.encode('utf-8')
             diff.what_changed = what_changed.decode('utf-8')
 
-        return diff
+    @classmethod
+    def stream(cls, paths_to_contents, theirs, write_func, delete_func,
+               repo=None, threaded=True):
+        """Indexes, diffs and applies files as they are produced, so that only
+        the files waiting to be written are held in memory.
+
+        Files are written while `paths_to_contents` is consumed, and deleted
+        once all files are written. If producing or writing a file fails, the
+        files written so far remain at the destination and PartialDeployError
+        is raised with an index of the destination's files.
+
+        Args:
+          paths_to_contents: Iterable of (path, content) tuples.
+          theirs: The index at the destination.
+          write_func: Function used to write a file to the destination.
+          delete_func: Function used to delete a file from the destination.
+          repo: Git repository of the pod, if any.
+          threaded: Whether to write files using a thread pool.
+        Returns:
+          Tuple of (index, diff) messages.
+        """
+        if pool is None:
+            text = 'Deployment is unavailable in this environment.'
+            raise common_utils.UnavailableError(text)
+        index = Index.create()
+        if repo:
+            Index.add_repo(index, repo)
+        diff = messages.DiffMessage()
+        diff.indexes = [theirs, index]
+        their_paths_to_shas = cls._get_paths_to_shas(theirs)
+
+        # Bounds the number of rendered files waiting to be written.
+        num_pending = cls.POOL_SIZE * 2
+        pending = threading.BoundedSemaphore(num_pending)
+        lock = threading.Lock()
+        written_paths = set()
+        deleted_paths = set()
+        failures = []
+
+        def run(func, done_paths, path, *args):
+            try:
+                func(path, *args)
+                with lock:
+                    done_paths.add(path)
+            except Exception:
+                with lock:
+                    failures.append(sys.exc_info())
+            finally:
+                pending.release()
+
+        def submit(func, done_paths, path, *args):
+            pending.acquire()
+            if threaded:
+                thread_pool.apply_async(
+                    run, args=(func, done_paths, path) + args)
+            else:
+                run(func, done_paths, path, *args)
+
+        def wait():
+            # Waits for the submitted functions, raising their first error.
+            for _ in range(num_pending):
+                pending.acquire()
+            for _ in range(num_pending):
+                pending.release()
+            if failures:
+                exc_type, exc_value, exc_traceback = failures[0]
+                raise exc_type, exc_value, exc_traceback
+
+        thread_pool = pool.ThreadPool(cls.POOL_SIZE) if threaded else None
+        try:
+            try:
+                for path, content in paths_to_contents:
+                    index_file_message = Index.add_file(
+                        index, path, content).files[-1]
+                    file_message = cls._add_file(
+                        diff, index_file_message, theirs, their_paths_to_shas)
+                    if file_message is not None:
+                        submit(write_func, written_paths, file_message.path,
+                               content)
+                    if failures:
+                        wait()
+                wait()
+                cls._add_deletes(diff, theirs, their_paths_to_shas)
+                for file_message in diff.deletes:
+                    submit(delete_func, deleted_paths, file_message.path)
+                wait()
+            finally:
+                if thread_pool is not None:
+                    thread_pool.close()
+                    thread_pool.join()
+        except:
+            exc_info = sys.exc_info()
+            if not written_paths and not deleted_paths:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            changed_paths = written_paths | deleted_paths
+            partial_index = Index.filter(
+                theirs, lambda path: path not in changed_paths)
+            partial_index.files.extend(
+                [file_message for file_message in index.files
+                 if file_message.path in written_paths])
+            text = 'Deployment failed after writing {} and deleting {} files: {}'
+            raise PartialDeployError(
+                text.format(len(written_paths), len(deleted_paths),
+                            exc_info[1]),
+                partial_index, exc_info)
+        cls._add_what_changed(diff, index, theirs, repo)
+        return index, diff
 
     @classmethod
     def to_string(cls, message):
@@ -227,7 +364,9 @@ class Index(object):
         message.files = []
         if paths_to_contents is None:
             return message
-        for pod_path, contents in paths_to_contents.iteritems():
+        if isinstance(paths_to_contents, dict):
+            paths_to_contents = paths_to_contents.iteritems()
+        for pod_path, contents in paths_to_contents:
             cls.add_file(message, pod_path, contents)
         return message
 
@@ -242,6 +381,41 @@ class Index(object):
         message.files.append(messages.FileMessage(path=pod_path, sha=sha))
         return message
 
+    @classmethod
+    def filter(cls, message, func):
+        """Returns a copy of an index containing only the files whose paths
+        satisfy a function (e.g. the files belonging to a shard)."""
+        index = cls.from_string(cls.to_string(message))
+        index.files = [file_message for file_message in index.files
+                       if func(file_message.path)]
+        return index
+
+    @classmethod
+    def merge(cls, messages_to_merge):
+        """Merges indexes of disjoint sets of files, such as the indexes of
+        the shards of a build, into a single index.
+
+        Raises:
+          ConflictingFilesError: When indexes contain different versions of
+              the same file.
+        """
+        message = cls.create()
+        paths_to_shas = {}
+        for index in messages_to_merge:
+            if message.commit is None and index.commit is not None:
+                message.commit = index.commit
+            if message.deployed_by is None and index.deployed_by is not None:
+                message.deployed_by = index.deployed_by
+            for file_message in index.files:
+                sha = paths_to_shas.get(file_message.path)
+                if sha is None:
+                    paths_to_shas[file_message.path] = file_message.sha
+                    message.files.append(file_message)
+                elif sha != file_message.sha:
+                    text = 'Indexes contain different versions of: {}'
+                    raise ConflictingFilesError(text.format(file_message.path))
+        return message
+
     @classmethod
     def add_repo(cls, message, repo):
         config = repo.config_reader()
@@ -43,6 +43,112 @@ class IndexTest(unittest.TestCase):
             diff = indexes.Diff.create(my_index, their_index)
             self.assertFilePathsEqual(expected.adds, diff.adds)
 
+    def test_stream(self):
+        their_index = indexes.Index.create({
+          '/file2.txt': 'change',
+          '/foo/file.txt': 'test',
+          '/bar/new.txt': 'test',
+        })
+        paths_to_contents = iter([
+          ('/file.txt', 'test'),
+          ('/file2.txt', 'test'),
+          ('/foo/file.txt', 'test'),
+        ])
+        written = {}
+        deleted = []
+        if utils.is_appengine():
+            return
+        index, diff = indexes.Diff.stream(
+            paths_to_contents, their_index,
+            write_func=written.__setitem__, delete_func=deleted.append)
+        self.assertEqual({'/file.txt': 'test', '/file2.txt': 'test'}, written)
+        self.assertEqual(['/bar/new.txt'], deleted)
+        self.assertEqual(
+            ['/file.txt', '/file2.txt', '/foo/file.txt'],
+            [file_message.path for file_message in index.files])
+        self.assertFilePathsEqual(
+            [messages.FileMessage(path='/foo/file.txt')], diff.nochanges)
+        expected_index = indexes.Index.create({
+          '/file.txt': 'test',
+          '/file2.txt': 'test',
+          '/foo/file.txt': 'test',
+        })
+        expected_diff = indexes.Diff.create(expected_index, their_index)
+        self.assertEqual(
+            [file_message.path for file_message in expected_diff.edits],
+            [file_message.path for file_message in diff.edits])
+
+    def test_stream_error(self):
+        if utils.is_appengine():
+            return
+        their_index = indexes.Index.create({
+          '/file.txt': 'old',
+          '/old.txt': 'test',
+        })
+
+        def iter_paths_to_contents():
+            yield '/file.txt', 'new'
+            raise ValueError('Render failed.')
+
+        for threaded in (True, False):
+            written = {}
+            deleted = []
+            with self.assertRaises(indexes.PartialDeployError) as context:
+                indexes.Diff.stream(
+                    iter_paths_to_contents(), their_index,
+                    write_func=written.__setitem__,
+                    delete_func=deleted.append, threaded=threaded)
+            # Files are only deleted once the build succeeds.
+            self.assertEqual({'/file.txt': 'new'}, written)
+            self.assertEqual([], deleted)
+            self.assertIsInstance(context.exception.exc_info[1], ValueError)
+            expected = indexes.Index.create({
+              '/file.txt': 'new',
+              '/old.txt': 'test',
+            })
+            self.assertItemsEqual(
+                [(file_message.path, file_message.sha)
+                 for file_message in expected.files],
+                [(file_message.path, file_message.sha)
+                 for file_message in context.exception.index.files])
+
+        # Errors raised before any file is written are raised as-is.
+        def write_func(path, content):
+            raise IOError('Write failed.')
+
+        self.assertRaises(
+            IOError, indexes.Diff.stream, iter([('/file.txt', 'new')]),
+            their_index, write_func=write_func, delete_func=deleted.append)
+
+    def test_merge(self):
+        index_1 = indexes.Index.create({
+          '/file.txt': 'test',
+          '/foo/file.txt': 'test',
+        })
+        index_2 = indexes.Index.create({
+          '/bar/file.txt': 'test',
+          '/foo/file.txt': 'test',
+        })
+        index = indexes.Index.merge([index_1, index_2])
+        self.assertItemsEqual(
+            ['/bar/file.txt', '/file.txt', '/foo/file.txt'],
+            [file_message.path for file_message in index.files])
+        index_3 = indexes.Index.create({'/file.txt': 'change'})
+        self.assertRaises(indexes.ConflictingFilesError,
+                          indexes.Index.merge, [index_1, index_3])
+
+    def test_filter(self):
+        index = indexes.Index.create({
+          '/file.txt': 'test',
+          '/foo/file.txt': 'test',
+        })
+        filtered_index = indexes.Index.filter(
+            index, lambda path: path.startswith('/foo/'))
+        self.assertEqual(
+            ['/foo/file.txt'],
+            [file_message.path for file_message in filtered_index.files])
+        self.assertEqual(2, len(index.files))
+
 
 if __name__ == '__main__':
     unittest.main()
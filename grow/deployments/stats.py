@@ -13,11 +13,14 @@ class Stats(object):
         self.pod = pod
         if paths_to_contents is None and full:
             paths_to_contents = pod.export()
-        self.paths_to_contents = paths_to_contents
+        # Only paths are retained. When streaming a build to a destination,
+        # paths are filled in by the destination once the build completes.
+        self.paths = (list(paths_to_contents)
+                      if paths_to_contents is not None else None)
 
     def get_num_files_per_type(self):
         file_counts = collections.defaultdict(int)
-        for path in self.paths_to_contents.keys():
+        for path in self.paths or []:
             ext = os.path.splitext(path)[-1]
             file_counts[ext] += 1
         ms = []
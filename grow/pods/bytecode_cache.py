@@ -0,0 +1,124 @@
+"""Jinja2 bytecode cache persisted under /.grow/cache/jinja/ between runs.
+
+Compiled templates are stored keyed by the template's name, the checksum of
+its source and the Jinja2 extensions of the environment, in a directory per
+Jinja2 version. Files are written to a temporary file that is renamed into
+place, so concurrent builds never read partially written bytecode, and
+entries are immutable once written. Bytecode is read from disk whenever an
+environment loads a template, rather than also being kept in memory.
+
+When a maximum size is set, the least recently used entries are removed once
+the cache outgrows it. Pods set it (in bytes) with the `jinja_cache_max_size`
+flag in podspec.yaml:
+
+    flags:
+      jinja_cache_max_size: 52428800
+"""
+
+import errno
+import hashlib
+import jinja2
+import os
+import tempfile
+import threading
+
+SUFFIX = '.cache'
+
+
+class FileSystemBytecodeCache(jinja2.BytecodeCache):
+    root = '/.grow/cache/jinja'
+
+    def __init__(self, pod, max_size=None):
+        self.pod = pod
+        self.max_size = max_size
+        self.directory = os.path.join(
+            pod.abs_path(self.root), jinja2.__version__)
+        self._size = None
+        self._lock = threading.Lock()
+
+    def get_bucket(self, environment, name, filename, source):
+        checksum = self.get_source_checksum(source)
+        sha = hashlib.sha1(self.get_cache_key(name, filename))
+        sha.update(checksum)
+        sha.update('|'.join(sorted(environment.extensions)))
+        bucket = jinja2.bccache.Bucket(environment, sha.hexdigest(), checksum)
+        self.load_bytecode(bucket)
+        return bucket
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load_bytecode(self, bucket):
+        path = self._get_path(bucket.key)
+        try:
+            with open(path, 'rb') as fp:
+                bytecode = fp.read()
+            if self.max_size is not None:
+                os.utime(path, None)  # Marks the entry as recently used.
+        except (IOError, OSError):
+            return
+        bucket.bytecode_from_string(bytecode)
+
+    def dump_bytecode(self, bucket):
+        bytecode = bucket.bytecode_to_string()
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        fd, temp_path = tempfile.mkstemp(
+            suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(bytecode)
+            os.rename(temp_path, self._get_path(bucket.key))
+        except OSError:
+            # Another process may have written the same entry (renaming onto
+            # existing files fails on Windows).
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        if self.max_size is not None:
+            with self._lock:
+                if self._size is None:
+                    self._size = sum(size for _, size, _ in self._list())
+                else:
+                    self._size += len(bytecode)
+                if self._size > self.max_size:
+                    self._evict()
+
+    def _list(self):
+        entries = []
+        for basename in os.listdir(self.directory):
+            if not basename.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, basename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Removed by another process.
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._list())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._size -= size
+
+    def clear(self):
+        with self._lock:
+            self._size = None
+            if not os.path.isdir(self.directory):
+                return
+            for _, _, path in self._list():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
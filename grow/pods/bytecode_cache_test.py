@@ -0,0 +1,75 @@
+from . import bytecode_cache
+from . import pods
+from . import storage
+from grow.testing import testing
+import jinja2
+import mock
+import os
+import unittest
+
+
+class FileSystemBytecodeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_path = testing.create_test_pod_dir()
+        self.pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+
+    def _list_entries(self, cache):
+        return [path for path in os.listdir(cache.directory)
+                if path.endswith(bytecode_cache.SUFFIX)]
+
+    def test_persisted(self):
+        self.pod.write_file('/views/test.html', '{{ 1 + 1 }}')
+        env = self.pod.get_jinja_env()
+        self.assertEqual('2', env.get_template('/views/test.html').render())
+        cache = env.bytecode_cache
+        self.assertTrue(cache.directory.startswith(
+            self.pod.abs_path('/.grow/cache/jinja/')))
+        self.assertEqual(1, len(self._list_entries(cache)))
+
+        # Templates are not compiled again on subsequent runs.
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        env = pod.get_jinja_env()
+        with mock.patch.object(jinja2.Environment, 'compile') as compile_func:
+            self.assertEqual('2', env.get_template('/views/test.html').render())
+            self.assertFalse(compile_func.called)
+
+        # Changed templates are compiled again.
+        pod.write_file('/views/test.html', '{{ 2 + 2 }}')
+        env = pods.Pod(
+            self.dir_path, storage=storage.FileStorage).get_jinja_env()
+        self.assertEqual('4', env.get_template('/views/test.html').render())
+        self.assertEqual(2, len(self._list_entries(cache)))
+
+        cache.clear()
+        self.assertEqual([], self._list_entries(cache))
+
+    def test_max_size(self):
+        env = self.pod.get_jinja_env()
+        cache = bytecode_cache.FileSystemBytecodeCache(self.pod, max_size=0)
+        env.bytecode_cache = cache
+        self.pod.write_file('/views/test.html', '{{ 1 + 1 }}')
+        env.get_template('/views/test.html')
+        self.assertEqual([], self._list_entries(cache))
+        # Evicted entries are not kept in memory either.
+        source, filename, _ = env.loader.get_source(env, '/views/test.html')
+        bucket = cache.get_bucket(env, '/views/test.html', filename, source)
+        self.assertIsNone(bucket.code)
+
+        cache.max_size = 10 ** 6
+        for i in range(3):
+            path = '/views/test-{}.html'.format(i)
+            self.pod.write_file(path, '{{ %d }}' % i)
+            env.get_template(path)
+        self.assertEqual(3, len(self._list_entries(cache)))
+        sizes = [os.path.getsize(os.path.join(cache.directory, path))
+                 for path in self._list_entries(cache)]
+        cache.max_size = sum(sizes) - 1
+        self.pod.write_file('/views/test-3.html', '{{ 3 }}')
+        env.get_template('/views/test-3.html')
+        self.assertLessEqual(len(self._list_entries(cache)), 3)
+        self.assertLessEqual(cache._size, cache.max_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -353,12 +353,16 @@ class Catalogs(object):
         template_file.close()
         return catalog
 
-    def find_mo_file(self, locale):
+    def get_mo_paths(self, locale):
+        """Returns the paths searched for a locale's compiled translations,
+        in order of precedence."""
         identifiers = gettext._expand_lang(str(locale))
-        for identifier in identifiers:
-            path = os.path.join(
-                '/translations', identifier, 'LC_MESSAGES',
-                'messages.mo')
+        return [os.path.join('/translations', identifier, 'LC_MESSAGES',
+                             'messages.mo')
+                for identifier in identifiers]
+
+    def find_mo_file(self, locale):
+        for path in self.get_mo_paths(locale):
             try:
                 return path, self.pod.open_file(path)
             except IOError:
@@ -6,6 +6,8 @@ from . import messages
 from grow.common import structures
 from grow.common import utils
 from grow.pods import locales
+import bisect
+import collections
 import copy
 import json
 import logging
@@ -13,6 +15,7 @@ import operator
 import os
 import re
 import sys
+import threading
 
 
 class Error(Exception):
@@ -97,26 +100,15 @@ class Collection(object):
 
     @classmethod
     def list(cls, pod):
-        items = []
-        for root, dirs, _ in pod.walk(cls.CONTENT_PATH + '/'):
-            for dir_name in dirs:
-                pod_path = os.path.join(root, dir_name)
-                pod_path = pod_path.replace(pod.root, '')
-                col_path = os.path.join(pod_path, '_blueprint.yaml')
-                if pod.file_exists(col_path):
-                    items.append(pod.get_collection(pod_path))
-        return items
+        return [pod.get_collection(pod_path)
+                for pod_path in pod.collection_index.list_collection_paths()]
 
     def collections(self):
         """Returns collections contained within this collection. Implemented
         as a function to allow future implementation of arguments."""
-        items = []
-        for root, dirs, _ in self.pod.walk(self.pod_path):
-            if root == self.pod.abs_path(self.pod_path):
-                for dir_name in dirs:
-                    pod_path = os.path.join(self.pod_path, dir_name)
-                    items.append(self.pod.get_collection(pod_path))
-        return items
+        index = self.pod.collection_index
+        return [self.pod.get_collection(os.path.join(self.pod_path, dir_name))
+                for dir_name in index.list_child_dirs(self.pod_path)]
 
     @property
     def exists(self):
@@ -143,7 +135,8 @@ class Collection(object):
         """Returns a document contained in this collection."""
         if locale is not None:
             localized_path = formats.Format.localize_path(pod_path, locale)
-            if self.pod.file_exists(localized_path):
+            if self.pod.collection_index.file_exists(
+                    self.pod_path, localized_path):
                 pod_path = localized_path
         return documents.Document(pod_path, locale=locale, _pod=self.pod,
                                   _collection=self)
@@ -156,11 +149,12 @@ class Collection(object):
         return doc
 
     @property
-    @utils.memoize
+    @utils.memoize.bounded(1024)
     def yaml(self):
         if not self.exists:
             return {}
-        result = utils.parse_yaml(self.pod.read_file(self._blueprint_path))
+        result = utils.parse_yaml(
+            self.pod.read_file(self._blueprint_path), pod=self.pod)
         if result is None:
             return {}
         return result
@@ -223,68 +217,185 @@ class Collection(object):
                 sorted_docs = injected_docs
                 self.pod.logger.info('Injected collection -> {}'.format(self.pod_path))
             return reversed(sorted_docs) if reverse else sorted_docs
-        for path in self.pod.list_dir(self.pod_path, recursive=recursive):
+        _, doc_keys = self._get_sorted_doc_keys(
+            order_by, locale, include_hidden, recursive)
+        # Documents are only created as they are accessed.
+        sorted_docs = doc_keys.lazy_map(self._create_listed_doc)
+        return reversed(sorted_docs) if reverse else sorted_docs
+
+    # Aliases `collection.docs` to `collection.list_docs`. `collection.docs`
+    # should be the public and supported way to retrieve documents from a
+    # collection.
+    docs = list_docs
+
+    def _get_sorted_doc_keys(self, order_by, locale, include_hidden,
+                             recursive):
+        """Returns the key of a sorted listing of documents, along with the
+        listing, which is shared and must not be modified.
+
+        Listings are cached as the pod paths and locales of their documents
+        (see `_create_listed_doc`), so that each listing is made of new
+        documents, which may be modified (e.g. injected) independently, and
+        which are created lazily by `list_docs`."""
+        # Locales equal to strings are distinguished from them, as documents
+        # keep the locale they are created with.
+        view_key = (order_by, type(locale), locale, include_hidden, recursive)
+        index = self.pod.collection_index
+        doc_keys = index.get_view(self.pod_path, view_key)
+        if doc_keys is not None:
+            return view_key, doc_keys
+        sorted_docs = structures.SortedCollection(
+            key=operator.attrgetter(order_by))
+        docs = []
+        for path in index.list_dir(self.pod_path, recursive=recursive):
             pod_path = os.path.join(self.pod_path, path.lstrip('/'))
-            slug, ext = os.path.splitext(os.path.basename(pod_path))
-            if (slug.startswith('_')
-                    or ext not in messages.extensions_to_formats
-                    or not pod_path):
+            if not Collection._is_doc_path(pod_path):
                 continue
             try:
-                _, locale_from_path = \
-                    formats.Format.parse_localized_path(pod_path)
-                if locale_from_path:
-                    if (locale is not None
-                            and locale in [utils.SENTINEL, locale_from_path]):
-                        new_doc = self.get_doc(pod_path, locale=locale_from_path)
-                        if not include_hidden and new_doc.hidden:
-                            continue
-                        sorted_docs.insert(new_doc)
-                    continue
-                doc = self.get_doc(pod_path)
-                if not include_hidden and doc.hidden:
-                    continue
-                if locale in [utils.SENTINEL, None]:
-                    sorted_docs.insert(doc)
-                if locale is None:
-                    continue
-                if locale == doc.default_locale:
-                    sorted_docs.insert(doc)
-                else:
-                    self._add_localized_docs(sorted_docs, pod_path, locale, doc)
+                docs.extend(self._list_docs_for_path(
+                    pod_path, locale, include_hidden))
             except Exception as e:
                 logging.error('Error loading doc: {}'.format(pod_path))
                 raise
-        return reversed(sorted_docs) if reverse else sorted_docs
+        sorted_docs.insert_all(docs)
+        doc_keys = sorted_docs.map(
+            lambda doc: (doc.pod_path, doc._locale_kwarg))
+        index.add_view(self.pod_path, view_key, doc_keys)
+        return view_key, doc_keys
+
+    def _create_listed_doc(self, doc_key):
+        pod_path, locale = doc_key
+        return documents.Document(pod_path, locale=locale, _pod=self.pod,
+                                  _collection=self)
 
-    # Aliases `collection.docs` to `collection.list_docs`. `collection.docs`
-    # should be the public and supported way to retrieve documents from a
-    # collection.
-    docs = list_docs
+    def query(self, where=None, order_by=None, locale=utils.SENTINEL,
+              reverse=None, include_hidden=False, recursive=True, limit=None,
+              offset=None):
+        """Returns the documents matching filters, ordered as by `list_docs`.
+
+        Args:
+          where: Dict mapping field names to the values to match. Fields
+              prefixed with `$` are builtins (e.g. `$category` or `$date`),
+              and nested fields are named with dots (e.g. `region.code`).
+              Names may be suffixed with an operator: `__lt`, `__lte`,
+              `__gt`, `__gte`, or `__in` (matching any value of a list).
+          order_by: Name of the attribute to order documents by.
+          locale: Locale of the documents to list.
+          reverse: Whether to reverse the order of the documents.
+          include_hidden: Whether to include hidden documents.
+          recursive: Whether to include documents from subdirectories.
+          limit: Maximum number of documents to return.
+          offset: Number of matching documents to skip.
+        Returns:
+          List of documents.
+        """
+        order_by = 'order' if order_by is None else order_by
+        view_key, doc_keys = self._get_sorted_doc_keys(
+            order_by, locale, include_hidden, recursive)
+        positions = None
+        for key, value in sorted((where or {}).iteritems()):
+            name, operator_name = FieldIndex.parse_filter(key)
+            matched = self._get_field_index(
+                view_key, doc_keys, name).match(operator_name, value)
+            positions = (matched if positions is None
+                         else positions.intersection(matched))
+        if positions is None:
+            positions = range(len(doc_keys))
+        else:
+            positions = sorted(positions)
+        if reverse:
+            positions = positions[::-1]
+        start = offset or 0
+        end = None if limit is None else start + limit
+        return [self._create_listed_doc(doc_keys[i])
+                for i in positions[start:end]]
+
+    def _get_field_index(self, view_key, doc_keys, name):
+        index = self.pod.collection_index
+        index_key = ('field', view_key, name)
+        field_index = index.get_view(self.pod_path, index_key)
+        if field_index is None:
+            docs = [self._create_listed_doc(doc_key) for doc_key in doc_keys]
+            field_index = FieldIndex(docs, name)
+            index.add_view(self.pod_path, index_key, field_index)
+        return field_index
+
+    @staticmethod
+    def _is_doc_path(pod_path):
+        slug, ext = os.path.splitext(os.path.basename(pod_path))
+        return bool(pod_path
+                    and not slug.startswith('_')
+                    and ext in messages.extensions_to_formats)
+
+    def _list_docs_for_path(self, pod_path, locale, include_hidden):
+        """Returns the documents listed for a single file."""
+        docs = []
+        _, locale_from_path = formats.Format.parse_localized_path(pod_path)
+        if locale_from_path:
+            if (locale is not None
+                    and locale in [utils.SENTINEL, locale_from_path]):
+                new_doc = self.get_doc(pod_path, locale=locale_from_path)
+                if include_hidden or not new_doc.hidden:
+                    docs.append(new_doc)
+            return docs
+        doc = self.get_doc(pod_path)
+        if not include_hidden and doc.hidden:
+            return docs
+        if locale in [utils.SENTINEL, None]:
+            docs.append(doc)
+        if locale is None:
+            return docs
+        if locale == doc.default_locale:
+            docs.append(doc)
+        else:
+            self._add_localized_docs(docs, pod_path, locale, doc)
+        return docs
 
-    def _add_localized_docs(self, sorted_docs, pod_path, locale, doc):
+    def _add_localized_docs(self, docs, pod_path, locale, doc):
+        localized_locales = self.pod.collection_index.list_localized_locales(
+            self.pod_path, pod_path)
         for each_locale in doc.locales:
             if each_locale == doc.default_locale and locale != each_locale:
                 continue
-            base, ext = os.path.splitext(pod_path)
-            localized_file_path = '{}@{}{}'.format(base, each_locale, ext)
             if (locale in [utils.SENTINEL, each_locale]
-                    and not self.pod.file_exists(localized_file_path)):
+                    and str(each_locale) not in localized_locales):
                 new_doc = doc.localize(each_locale)
-                sorted_docs.insert(new_doc)
+                docs.append(new_doc)
+
+    def _is_servable(self, doc, locales=None):
+        return not (self._get_builtin_field('draft')
+                    or not doc.has_serving_path()
+                    or not doc.view
+                    or (locales and doc.locale not in locales))
 
     def list_servable_documents(self, include_hidden=False, locales=None, inject=None):
         docs = []
         inject = False if inject is None else inject
         for doc in self.list_docs(include_hidden=include_hidden, inject=inject):
-            if (self._get_builtin_field('draft')
-                    or not doc.has_serving_path()
-                    or not doc.view
-                    or (locales and doc.locale not in locales)):
+            if not self._is_servable(doc, locales=locales):
                 continue
             docs.append(doc)
         return docs
 
+    def list_servable_documents_for_path(self, pod_path, include_hidden=False):
+        """Returns the servable documents of a file, including those of its
+        localized files (formatted <base>@<locale>.<ext>)."""
+        root_pod_path, _ = formats.Format.parse_localized_path(pod_path)
+        dir_path = os.path.dirname(root_pod_path)
+        docs = []
+        index = self.pod.collection_index
+        for path in sorted(index.list_dir(dir_path, recursive=False)):
+            path = os.path.join(dir_path, path.lstrip('/'))
+            if (not Collection._is_doc_path(path)
+                    or formats.Format.parse_localized_path(path)[0]
+                    != root_pod_path):
+                continue
+            for doc in self._list_docs_for_path(
+                    path, utils.SENTINEL, include_hidden):
+                if self._is_servable(doc):
+                    docs.append(doc)
+        return docs
+
     @utils.cached_property
     def locales(self):
         if self.localization and 'locales' in self.localization:
@@ -297,3 +408,304 @@ class Collection(object):
         message.title = self.title
         message.collection_path = self.collection_path
         return message
+
+
+class FieldIndex(object):
+    """Index of the values of a field within a sorted listing of documents.
+    Maps values to the positions of the documents in the listing.
+
+    Values are hashed for equality filters. Range filters only compare values
+    of the same kind (numbers, strings, or otherwise values of the same
+    type), which are sorted upon the first range filter of their kind."""
+    OPERATORS = ('in', 'gt', 'gte', 'lt', 'lte')
+    _COMPARATORS = {
+        'gt': operator.gt,
+        'gte': operator.ge,
+        'lt': operator.lt,
+        'lte': operator.le,
+    }
+
+    def __init__(self, docs, name):
+        self.name = name
+        self._values_to_positions = collections.defaultdict(list)
+        self._unhashable = []
+        # Maps each kind of value to (value, position) tuples, which are
+        # sorted by value when first filtered by a range.
+        self._kinds_to_pairs = collections.defaultdict(list)
+        self._kinds_to_sorted_pairs = {}
+        for i, doc in enumerate(docs):
+            value = FieldIndex.get_value(doc, name)
+            if value is not None:
+                # Documents without the field do not match ranges.
+                self._kinds_to_pairs[FieldIndex._get_kind(value)].append(
+                    (value, i))
+            try:
+                self._values_to_positions[value].append(i)
+            except TypeError:
+                self._unhashable.append((value, i))
+
+    @staticmethod
+    def parse_filter(key):
+        """Returns the field name and operator of a filter's key."""
+        name, _, operator_name = key.rpartition('__')
+        if name and operator_name in FieldIndex.OPERATORS:
+            return name, operator_name
+        return key, None
+
+    @staticmethod
+    def get_value(doc, name):
+        """Returns the value of a document's field, or None if the document
+        does not have the field."""
+        if (name.startswith('$')
+                and isinstance(getattr(type(doc), name[1:], None), property)):
+            return getattr(doc, name[1:])
+        value = doc.fields
+        for part in name.split('.'):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+
+    def _get_equal(self, value):
+        positions = set()
+        try:
+            positions.update(self._values_to_positions.get(value, ()))
+        except TypeError:
+            pass
+        positions.update(i for other, i in self._unhashable if other == value)
+        return positions
+
+    def match(self, operator_name, value):
+        """Returns the positions of the documents matching a filter."""
+        if operator_name is None:
+            return self._get_equal(value)
+        if operator_name == 'in':
+            positions = set()
+            for each_value in value:
+                positions.update(self._get_equal(each_value))
+            return positions
+        kind = FieldIndex._get_kind(value)
+        sorted_pairs = self._get_sorted_pairs(kind)
+        if sorted_pairs is None:
+            return self._match_unsorted(kind, operator_name, value)
+        values, positions = sorted_pairs
+        start, end = 0, len(values)
+        if operator_name == 'gt':
+            start = bisect.bisect_right(values, value)
+        elif operator_name == 'gte':
+            start = bisect.bisect_left(values, value)
+        elif operator_name == 'lt':
+            end = bisect.bisect_left(values, value)
+        else:
+            end = bisect.bisect_right(values, value)
+        return set(positions[start:end])
+
+    @staticmethod
+    def _get_kind(value):
+        if isinstance(value, (bool, int, long, float)):
+            return int
+        if isinstance(value, basestring):
+            return basestring
+        return type(value)
+
+    def _get_sorted_pairs(self, kind):
+        """Returns the values of a kind sorted, along with the positions of
+        their documents, or None if the values cannot be compared."""
+        if kind not in self._kinds_to_sorted_pairs:
+            pairs = self._kinds_to_pairs.get(kind, [])
+            try:
+                pairs = sorted(pairs, key=operator.itemgetter(0))
+                sorted_pairs = ([value for value, _ in pairs],
+                                [i for _, i in pairs])
+            except TypeError:
+                sorted_pairs = None
+            self._kinds_to_sorted_pairs[kind] = sorted_pairs
+        return self._kinds_to_sorted_pairs[kind]
+
+    def _match_unsorted(self, kind, operator_name, value):
+        compare = FieldIndex._COMPARATORS[operator_name]
+        positions = set()
+        for each_value, i in self._kinds_to_pairs.get(kind, []):
+            try:
+                if compare(each_value, value):
+                    positions.add(i)
+            except TypeError:
+                pass  # Incomparable values do not match ranges.
+        return positions
+
+
+class CollectionIndex(object):
+    """Index of the files within collections, built from a single listing of
+    each collection's directory. Maps documents to the locales of their
+    localized files (formatted <base>@<locale>.<ext>), so that the existence
+    of localized files is known without checking the storage for each
+    document and locale.
+
+    Also holds the pod's collections (along with their parsed blueprints)
+    and the subdirectories of each collection, so that collections are only
+    discovered by walking the content directory once, and the sorted
+    listings of documents, which are kept until either the collection's
+    files or any parsed document changes.
+
+    Directories are listed outside of the index's lock, and their listings
+    are only kept if the index was not invalidated in the meantime."""
+
+    def __init__(self, pod):
+        self.pod = pod
+        self._dirs_to_entries = {}
+        self._collection_paths = None
+        self._pod_paths_to_collections = {}
+        self._dirs_to_child_dirs = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._dirs_to_entries)
+
+    def _get_entry(self, dir_path):
+        dir_path = dir_path.rstrip('/')
+        entry = self._dirs_to_entries.get(dir_path)
+        if entry is not None:
+            return entry
+        generation = self._generation
+        paths = self.pod.storage.listdir(
+            self.pod._normalize_path(dir_path), recursive=True)
+        pod_paths = set()
+        root_pod_paths_to_locales = {}
+        for path in paths:
+            pod_path = os.path.join(dir_path, path.lstrip('/'))
+            pod_paths.add(pod_path)
+            root_pod_path, locale = \
+                formats.Format.parse_localized_path(pod_path)
+            if locale:
+                root_pod_paths_to_locales.setdefault(
+                    root_pod_path, set()).add(locale)
+        entry = {
+            'paths': paths,
+            'pod_paths': pod_paths,
+            'root_pod_paths_to_locales': root_pod_paths_to_locales,
+            'views': {},
+        }
+        with self._lock:
+            if generation == self._generation:
+                entry = self._dirs_to_entries.setdefault(dir_path, entry)
+        return entry
+
+    def list_dir(self, dir_path, recursive=True):
+        """Returns the paths of the files in a directory, relative to it."""
+        self.pod.dependencies.record_dir(dir_path)
+        paths = self._get_entry(dir_path)['paths']
+        if recursive:
+            return list(paths)
+        return [path for path in paths if '/' not in path.lstrip('/')]
+
+    def file_exists(self, dir_path, pod_path):
+        """Returns whether a file exists within an indexed directory."""
+        if not pod_path.startswith(dir_path.rstrip('/') + '/'):
+            return self.pod.file_exists(pod_path)
+        self.pod.dependencies.record(pod_path)
+        return pod_path in self._get_entry(dir_path)['pod_paths']
+
+    def list_localized_locales(self, dir_path, root_pod_path):
+        """Returns the locales of a document's localized files."""
+        self.pod.dependencies.record_dir(dir_path)
+        entry = self._get_entry(dir_path)
+        return entry['root_pod_paths_to_locales'].get(root_pod_path, set())
+
+    def list_collection_paths(self):
+        """Returns the pod paths of the directories containing blueprints."""
+        content_path = Collection.CONTENT_PATH + '/'
+        self.pod.dependencies.record_dir(content_path)
+        collection_paths = self._collection_paths
+        if collection_paths is None:
+            generation = self._generation
+            pod_paths = []
+            walk = self.pod.storage.walk(self.pod._normalize_path(content_path))
+            for root, dirs, _ in walk:
+                for dir_name in dirs:
+                    pod_path = os.path.join(root, dir_name)
+                    pod_path = pod_path.replace(self.pod.root, '')
+                    blueprint_path = os.path.join(
+                        pod_path, Collection.BLUEPRINT_PATH)
+                    if self.pod.storage.exists(
+                            self.pod._normalize_path(blueprint_path)):
+                        pod_paths.append(pod_path)
+            collection_paths = pod_paths
+            with self._lock:
+                if generation == self._generation:
+                    self._collection_paths = collection_paths
+        return list(collection_paths)
+
+    def get_collection(self, pod_path):
+        """Returns the collection at a pod path, created once until its
+        blueprint changes."""
+        col = self._pod_paths_to_collections.get(pod_path)
+        if col is None:
+            col = Collection.get(pod_path, _pod=self.pod)
+            with self._lock:
+                col = self._pod_paths_to_collections.setdefault(pod_path, col)
+        return col
+
+    def list_child_dirs(self, dir_path):
+        """Returns the names of the subdirectories of a directory."""
+        self.pod.dependencies.record_dir(dir_path)
+        dir_path = dir_path.rstrip('/')
+        child_dirs = self._dirs_to_child_dirs.get(dir_path)
+        if child_dirs is None:
+            generation = self._generation
+            child_dirs = []
+            walk = self.pod.storage.walk(self.pod._normalize_path(dir_path))
+            for _, dirs, _ in walk:
+                child_dirs = list(dirs)
+                break
+            with self._lock:
+                if generation == self._generation:
+                    self._dirs_to_child_dirs[dir_path] = child_dirs
+        return list(child_dirs)
+
+    def get_view(self, dir_path, key):
+        """Returns a sorted listing of the documents in a directory, or None
+        if the listing is not cached."""
+        version, value = self._get_entry(dir_path)['views'].get(
+            key, (None, None))
+        if version != self.pod.format_cache.version:
+            return None
+        # Documents are not listed, so record them for builds.
+        self.pod.dependencies.record_dir(dir_path)
+        return value
+
+    def add_view(self, dir_path, key, value):
+        entry = self._get_entry(dir_path)
+        with self._lock:
+            entry['views'][key] = (self.pod.format_cache.version, value)
+
+    def invalidate(self, pod_path):
+        """Discards the listings of directories containing, or contained in,
+        a changed path, and the collections affected by a changed blueprint
+        or podspec."""
+        pod_path = pod_path.rstrip('/')
+        with self._lock:
+            self._generation += 1
+            for dirs_to_values in (self._dirs_to_entries,
+                                   self._dirs_to_child_dirs):
+                for dir_path in dirs_to_values.keys():
+                    if (pod_path.startswith(dir_path + '/')
+                            or dir_path.startswith(pod_path + '/')
+                            or dir_path == pod_path):
+                        dirs_to_values.pop(dir_path, None)
+            if pod_path == '/podspec.yaml':
+                self._pod_paths_to_collections = {}
+            elif os.path.basename(pod_path) == Collection.BLUEPRINT_PATH:
+                self._collection_paths = None
+                dir_path = os.path.dirname(pod_path)
+                for col_path in self._pod_paths_to_collections.keys():
+                    if col_path.rstrip('/') == dir_path:
+                        self._pod_paths_to_collections.pop(col_path, None)
+
+    def reset(self):
+        with self._lock:
+            self._generation += 1
+            self._dirs_to_entries = {}
+            self._collection_paths = None
+            self._pod_paths_to_collections = {}
+            self._dirs_to_child_dirs = {}
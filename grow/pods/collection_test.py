@@ -2,7 +2,11 @@ from . import collection
 from . import locales
 from . import pods
 from . import storage
+from grow.common import structures
 from grow.testing import testing
+import datetime
+import mock
+import operator
 import unittest
 
 
@@ -249,6 +253,175 @@ class CollectionsTestCase(unittest.TestCase):
         self.assertEqual(3, len(collection.docs(locale='en')))
         self.assertEqual(3, len(collection.docs(locale='de')))
 
+    def test_list_cached(self):
+        expected = collection.Collection.list(self.pod)
+        with mock.patch.object(self.pod.storage, 'walk',
+                               wraps=self.pod.storage.walk) as walk:
+            self.assertEqual(expected, self.pod.list_collections())
+            self.assertEqual(expected, collection.Collection.list(self.pod))
+            self.assertEqual(0, walk.call_count)
+        col = self.pod.get_collection('pages')
+        self.assertIs(col, self.pod.get_collection('pages'))
+
+        # Changed blueprints update the collections.
+        self.pod.write_yaml('/content/new/_blueprint.yaml', {'$title': 'New'})
+        self.assertIn(self.pod.get_collection('new'),
+                      self.pod.list_collections())
+        self.assertEqual('New', self.pod.get_collection('new').title)
+        self.pod.write_yaml('/content/new/_blueprint.yaml', {'$title': 'Old'})
+        self.assertEqual('Old', self.pod.get_collection('new').title)
+        self.assertIs(col, self.pod.get_collection('pages'))
+
+    def test_list_docs_cached(self):
+        col = self.pod.get_collection('pages')
+        for order_by in ('order', 'pod_path', 'title'):
+            # Documents are ordered as if inserted one at a time.
+            expected = structures.SortedCollection(
+                key=operator.attrgetter(order_by))
+            for doc in col.docs(order_by=order_by, locale='de'):
+                expected.insert(doc)
+            self.pod.collection_index.reset()
+            self.assertEqual(list(expected),
+                             list(col.docs(order_by=order_by, locale='de')))
+        col.docs(locale='de')
+        with mock.patch.object(collection.Collection, '_list_docs_for_path',
+                               wraps=col._list_docs_for_path) as list_docs:
+            docs = col.docs(locale='de')
+            self.assertEqual(list(reversed(docs)),
+                             list(col.docs(locale='de', reverse=True)))
+            self.assertEqual(0, list_docs.call_count)
+            col.docs(locale='fr')
+            self.assertGreater(list_docs.call_count, 0)
+
+        # Listings are made of new documents, so modifying them does not
+        # affect other listings.
+        doc = col.docs(locale='de')[0]
+        self.assertIsNot(doc, col.docs(locale='de')[0])
+        doc.inject(fields={'$title': 'Injected'})
+        self.assertEqual('Injected', doc.title)
+        self.assertNotEqual('Injected', col.docs(locale='de')[0].title)
+        self.assertNotEqual('Injected', col.query(locale='de')[0].title)
+
+        # Documents are created as they are accessed, and positions within
+        # listings are found without creating documents.
+        with mock.patch.object(collection.Collection, '_create_listed_doc',
+                               wraps=col._create_listed_doc) as create_doc:
+            docs = col.docs(locale='de')
+            self.assertEqual(0, create_doc.call_count)
+            self.assertIs(docs[1], docs[1])
+            self.assertEqual(1, create_doc.call_count)
+            self.assertIs(docs[1], doc.next(docs))
+            self.assertEqual(1, create_doc.call_count)
+
+        # Changed documents are listed again.
+        self.pod.write_yaml('/content/pages/about.yaml', {'$order': -1})
+        self.assertEqual('/content/pages/about.yaml',
+                         col.docs(locale='de')[1].pod_path)
+
+    def test_query(self):
+        pod = testing.create_pod()
+        pod.write_yaml('/podspec.yaml', {})
+        pod.write_yaml('/content/products/_blueprint.yaml', {
+            '$path': '/{base}/',
+            '$view': '/views/base.html',
+        })
+        for i in range(10):
+            pod.write_yaml('/content/products/product-{}.yaml'.format(i), {
+                '$category': 'even' if i % 2 == 0 else 'odd',
+                '$date': datetime.date(2017, 1, i + 1),
+                '$order': i,
+                'region': {'code': 'emea' if i < 5 else 'apac'},
+                'tags': ['a', 'b'] if i == 3 else None,
+            })
+        col = pod.get_collection('products')
+
+        def query(**kwargs):
+            return [doc.base for doc in col.query(**kwargs)]
+
+        self.assertEqual(
+            ['product-{}'.format(i) for i in range(10)], query())
+        self.assertEqual(['product-0', 'product-2', 'product-4'],
+                         query(where={'$category': 'even', 'region.code': 'emea'}))
+        self.assertEqual(['product-7', 'product-9'],
+                         query(where={'$category': 'odd', '$order__gt': 5}))
+        self.assertEqual(['product-6', 'product-7'], query(where={
+            '$date__gte': datetime.date(2017, 1, 7),
+            '$date__lt': datetime.date(2017, 1, 9),
+        }))
+        self.assertEqual(['product-1', 'product-2'],
+                         query(where={'$order__in': [2, 1, 11]}))
+        self.assertEqual(['product-3'], query(where={'tags': ['a', 'b']}))
+        self.assertEqual(['product-5', 'product-3'],
+                         query(where={'$category': 'odd'}, reverse=True,
+                               offset=2, limit=2))
+        self.assertEqual([], query(where={'missing': 'value'}))
+        self.assertEqual(['product-0', 'product-1'],
+                         query(where={'$hidden': False}, limit=2))
+
+        # Values that cannot be compared only match equality filters, and
+        # ranges only match values of the same kind.
+        pod.write_yaml('/content/products/product-9.yaml', {
+            '$order': 9, 'region': {'code': datetime.date(2017, 1, 1)}})
+        pod.write_yaml('/content/products/product-8.yaml', {
+            '$order': 8, 'region': {'code': 1}})
+        self.assertEqual(['product-9'], query(where={
+            'region.code': datetime.date(2017, 1, 1)}))
+        self.assertEqual(['product-8'], query(where={'region.code__gte': 0}))
+        self.assertEqual(['product-5', 'product-6', 'product-7'],
+                         query(where={'region.code__lt': 'b'}))
+
+        # Changed documents are indexed again.
+        pod.write_yaml('/content/products/product-0.yaml', {
+            '$category': 'odd', '$order': 0})
+        self.assertEqual(['product-0', 'product-1'],
+                         query(where={'$category': 'odd'}, limit=2))
+
+    def test_collection_index(self):
+        col = self.pod.get_collection('pages')
+        expected = [(doc.pod_path, str(doc.locale)) for doc in col.docs()]
+        with mock.patch.object(self.pod.storage, 'exists',
+                               wraps=self.pod.storage.exists) as exists:
+            with mock.patch.object(self.pod.storage, 'listdir',
+                                   wraps=self.pod.storage.listdir) as listdir:
+                self.pod.collection_index.reset()
+                docs = col.docs()
+                col.docs()
+                col.get_doc('/content/pages/intro.md', locale='fr')
+            self.assertFalse([call for call in exists.call_args_list
+                              if '@' in call[0][0]])
+            self.assertEqual(1, listdir.call_count)
+        self.assertEqual(
+            expected, [(doc.pod_path, str(doc.locale)) for doc in docs])
+        self.assertEqual(
+            '/content/pages/intro@fr.md',
+            col.get_doc('/content/pages/intro.md', locale='fr').pod_path)
+
+        # Written and deleted files update the index.
+        self.pod.write_yaml('/content/pages/about@it.yaml', {})
+        self.assertEqual(
+            '/content/pages/about@it.yaml',
+            col.get_doc('/content/pages/about.yaml', locale='it').pod_path)
+        self.pod.delete_file('/content/pages/about@it.yaml')
+        self.assertEqual(
+            '/content/pages/about.yaml',
+            col.get_doc('/content/pages/about.yaml', locale='it').pod_path)
+
+        # Listings taken while the index is invalidated are not kept.
+        index = self.pod.collection_index
+        listdir = self.pod.storage.listdir
+
+        def listdir_while_invalidated(*args, **kwargs):
+            paths = listdir(*args, **kwargs)
+            index.invalidate('/content/pages/about@it.yaml')
+            return paths
+
+        index.reset()
+        with mock.patch.object(self.pod.storage, 'listdir',
+                               side_effect=listdir_while_invalidated) as mocked:
+            index.list_dir('/content/pages/')
+            index.list_dir('/content/pages/')
+            self.assertEqual(2, mocked.call_count)
+
 
 if __name__ == '__main__':
     unittest.main()
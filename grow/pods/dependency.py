@@ -0,0 +1,292 @@
+"""Dependency graph used for incremental builds.
+
+While a path is rendered, the files it reads are recorded against it. After
+a build, the graph is persisted to the pod (along with the content hash of
+each dependency and the rendered output) so that the next incremental build
+only re-renders paths whose dependencies changed.
+
+Dependencies are pod paths. Paths ending with a slash are directories, which
+change whenever any file beneath them is added, removed, or modified.
+"""
+
+from grow.common import config
+from jinja2 import meta
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+
+# Files referenced from YAML front matter and data files via constructors.
+_TAG_REFERENCE_REGEX = re.compile(
+    r'!g\.(?:csv|doc|json|static|url|yaml)\s+[\'"]?([^\s\'"\]\},#]+)')
+_TAG_REFERENCE_EXTS = ('.html', '.md', '.yaml', '.yml')
+
+
+class DependencyGraph(object):
+    VERSION = 1
+    root = '/.grow/build'
+    MISSING = 'missing'
+
+    def __init__(self, pod):
+        self.pod = pod
+        self.fingerprint = None
+        self._local = threading.local()
+        self._global_key = None
+        self._paths_to_entries = {}
+        self._reset_build_caches()
+
+    def __repr__(self):
+        return '<DependencyGraph: {}>'.format(self.pod.root)
+
+    @property
+    def _graph_path(self):
+        return os.path.join(DependencyGraph.root, 'dependencies.json')
+
+    @staticmethod
+    def _get_object_path(sha):
+        return os.path.join(DependencyGraph.root, 'objects', sha[:2], sha)
+
+    def _reset_build_caches(self):
+        self._hashes = {}
+        self._tag_references = {}
+        self._template_references = {}
+
+    def _get_stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @property
+    def capturing(self):
+        """Whether dependencies are being captured in the current thread."""
+        return bool(getattr(self._local, 'stack', None))
+
+    @contextlib.contextmanager
+    def capture(self):
+        """Captures the dependencies recorded in the current thread.
+
+        Yields:
+          Set of pod paths recorded while the context is active.
+        """
+        dependencies = set()
+        stack = self._get_stack()
+        stack.append(dependencies)
+        try:
+            yield dependencies
+        finally:
+            stack.pop()
+
+    def record(self, pod_path):
+        """Records a dependency on a file for any active captures."""
+        stack = getattr(self._local, 'stack', None)
+        if not stack or not pod_path:
+            return
+        pod_path = '/' + pod_path.lstrip('/')
+        if pod_path in stack[-1]:
+            return
+        for dependencies in stack:
+            dependencies.add(pod_path)
+        for reference in self._get_tag_references(pod_path):
+            self.record(reference)
+
+    def record_dir(self, pod_path):
+        """Records a dependency on a directory for any active captures."""
+        self.record(pod_path.rstrip('/') + '/')
+
+    def record_doc(self, doc):
+        """Records a dependency on a document, its localized parts, and its
+        collection's blueprint."""
+        if not self.capturing:
+            return
+        self.record(doc.pod_path)
+        self.record_doc_path(doc.root_pod_path, locale=doc.locale)
+
+    def record_doc_path(self, pod_path, locale=None):
+        """Records a dependency on a document given its pod path."""
+        if not self.capturing:
+            return
+        from . import formats
+        root_pod_path, locale_from_path = \
+            formats.Format.parse_localized_path(pod_path)
+        locale = locale_from_path or locale
+        self.record(root_pod_path)
+        if locale:
+            self.record(formats.Format.localize_path(
+                root_pod_path, str(locale)))
+        self.record(os.path.join(os.path.dirname(root_pod_path),
+                                 '_blueprint.yaml'))
+
+    def record_template(self, jinja_env, name):
+        """Records a dependency on a template and on the templates that it
+        includes, imports, or extends."""
+        if not self.capturing or not name:
+            return
+        for pod_path in self._get_template_references(jinja_env, name):
+            self.record(pod_path)
+
+    def record_catalog(self, locale):
+        """Records a dependency on the compiled translations for a locale."""
+        if not self.capturing:
+            return
+        for pod_path in self.pod.catalogs.get_mo_paths(locale):
+            self.record(pod_path)
+
+    def _read(self, pod_path):
+        return self.pod.storage.read(self.pod.abs_path(pod_path))
+
+    def _exists(self, pod_path):
+        return self.pod.storage.exists(self.pod.abs_path(pod_path))
+
+    def _list_dir(self, pod_path):
+        try:
+            return sorted(self.pod.storage.listdir(self.pod.abs_path(pod_path)))
+        except (IOError, OSError):
+            return []
+
+    def _get_tag_references(self, pod_path):
+        if pod_path in self._tag_references:
+            return self._tag_references[pod_path]
+        references = set()
+        self._tag_references[pod_path] = references
+        if pod_path.endswith('/'):
+            for path in self._list_dir(pod_path):
+                references.update(self._get_tag_references(
+                    pod_path.rstrip('/') + path))
+        elif (pod_path.endswith(_TAG_REFERENCE_EXTS)
+              and self._exists(pod_path)):
+            content = self._read(pod_path)
+            references.update(_TAG_REFERENCE_REGEX.findall(content))
+        return references
+
+    def _get_template_references(self, jinja_env, name):
+        if name in self._template_references:
+            return self._template_references[name]
+        pod_paths = set()
+        names_to_visit = [name.lstrip('/')]
+        visited = set()
+        while names_to_visit:
+            template_name = names_to_visit.pop()
+            if template_name in visited:
+                continue
+            visited.add(template_name)
+            pod_paths.add('/' + template_name)
+            try:
+                source, _, _ = jinja_env.loader.get_source(
+                    jinja_env, template_name)
+            except Exception:
+                continue  # Missing templates are reported at render time.
+            ast = jinja_env.parse(source)
+            for reference in meta.find_referenced_templates(ast):
+                if reference is None:
+                    # Templates resolved at runtime may be any view.
+                    pod_paths.add('/views/')
+                    continue
+                names_to_visit.append(reference.lstrip('/'))
+        self._template_references[name] = pod_paths
+        return pod_paths
+
+    def get_hash(self, pod_path):
+        """Returns the content hash of a dependency."""
+        if pod_path in self._hashes:
+            return self._hashes[pod_path]
+        if pod_path.endswith('/'):
+            sha = hashlib.sha1()
+            for path in self._list_dir(pod_path):
+                file_hash = self.get_hash(pod_path.rstrip('/') + path)
+                sha.update('{}:{}\n'.format(path, file_hash))
+            result = sha.hexdigest()
+        elif self._exists(pod_path):
+            result = hashlib.sha1(self._read(pod_path)).hexdigest()
+        else:
+            result = DependencyGraph.MISSING
+        self._hashes[pod_path] = result
+        return result
+
+    def _create_global_key(self):
+        env = self.pod.env
+        key = {
+            'dev': env.dev,
+            'extensions': self.get_hash('/extensions/'),
+            'fingerprint': env.fingerprint,
+            'host': env.host,
+            'name': env.name,
+            'podspec': self.get_hash('/podspec.yaml'),
+            'port': env.port,
+            'scheme': env.scheme,
+            'version': config.VERSION,
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True)).hexdigest()
+
+    def load(self):
+        """Loads the graph persisted by the previous build."""
+        self._reset_build_caches()
+        try:
+            data = json.loads(self.pod.read_file(self._graph_path))
+        except (IOError, OSError, ValueError):
+            data = {}
+        if data.get('version') != DependencyGraph.VERSION:
+            data = {}
+        self.fingerprint = data.get('fingerprint')
+        self._global_key = data.get('global')
+        self._paths_to_entries = data.get('paths', {})
+
+    def save(self):
+        """Persists the graph and removes outputs that are no longer used."""
+        data = {
+            'fingerprint': self.pod.env.fingerprint,
+            'global': self._create_global_key(),
+            'paths': self._paths_to_entries,
+            'version': DependencyGraph.VERSION,
+        }
+        self.pod.write_file(self._graph_path, json.dumps(data, sort_keys=True))
+        used_object_paths = set(
+            DependencyGraph._get_object_path(entry['sha'])
+            for entry in self._paths_to_entries.itervalues())
+        objects_dir = os.path.join(DependencyGraph.root, 'objects')
+        for path in self._list_dir(objects_dir):
+            object_path = objects_dir + path
+            if object_path not in used_object_paths:
+                self.pod.delete_file(object_path)
+
+    def retain(self, paths):
+        """Discards the entries of paths that are no longer built."""
+        paths = set(paths)
+        for path in self._paths_to_entries.keys():
+            if path not in paths:
+                del self._paths_to_entries[path]
+
+    def is_fresh(self, path):
+        """Returns whether a path's output from the previous build can be
+        reused, i.e. none of its dependencies have changed since."""
+        entry = self._paths_to_entries.get(path)
+        if entry is None or self._global_key != self._create_global_key():
+            return False
+        for pod_path, dependency_hash in entry['dependencies'].iteritems():
+            if self.get_hash(pod_path) != dependency_hash:
+                return False
+        return self._exists(DependencyGraph._get_object_path(entry['sha']))
+
+    def get_output(self, path):
+        """Returns the output of a path from the previous build."""
+        entry = self._paths_to_entries[path]
+        content = self._read(DependencyGraph._get_object_path(entry['sha']))
+        if entry.get('unicode'):
+            content = content.decode('utf-8')
+        return content
+
+    def add(self, path, content, dependencies):
+        """Adds the output and dependencies of a rendered path to the graph."""
+        is_unicode = isinstance(content, unicode)
+        raw_content = content.encode('utf-8') if is_unicode else content
+        sha = hashlib.sha1(raw_content).hexdigest()
+        object_path = DependencyGraph._get_object_path(sha)
+        if not self._exists(object_path):
+            self.pod.write_file(object_path, raw_content)
+        self._paths_to_entries[path] = {
+            'dependencies': dict((pod_path, self.get_hash(pod_path))
+                                 for pod_path in dependencies),
+            'sha': sha,
+            'unicode': is_unicode,
+        }
@@ -0,0 +1,64 @@
+from . import pods
+from . import storage
+from grow.testing import testing
+import mock
+import unittest
+
+
+class DependencyGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_path = testing.create_test_pod_dir()
+        self.pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+
+    def test_capture(self):
+        graph = self.pod.dependencies
+        self.pod.read_file('/podspec.yaml')
+        with graph.capture() as dependencies:
+            self.pod.read_file('/README.md')
+            self.pod.list_dir('/public/')
+            with graph.capture() as inner_dependencies:
+                self.pod.file_exists('/views/base.html')
+        self.assertEqual(set(['/views/base.html']), inner_dependencies)
+        self.assertEqual(
+            set(['/README.md', '/public/', '/views/base.html']), dependencies)
+        self.assertFalse(graph.capturing)
+
+    def test_render_dependencies(self):
+        controller, params = self.pod.match('/about/')
+        with self.pod.dependencies.capture() as dependencies:
+            controller.render(params)
+        self.assertIn('/content/pages/about.yaml', dependencies)
+        self.assertIn('/content/pages/_blueprint.yaml', dependencies)
+        self.assertIn('/views/base.html', dependencies)
+        self.assertIn('/translations/en/LC_MESSAGES/messages.mo', dependencies)
+
+    def test_incremental_export(self):
+        expected = self.pod.export()
+        self.assertEqual(expected, self.pod.export(incremental=True))
+
+        # Unchanged paths are reused from the previous build.
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(pods, '_render_for_export',
+                               wraps=pods._render_for_export) as render:
+            self.assertEqual(expected, pod.export(incremental=True))
+            self.assertEqual(0, render.call_count)
+
+        # Only paths depending on a changed file are rendered again.
+        content = pod.read_file('/content/pages/about.yaml')
+        pod.write_file('/content/pages/about.yaml',
+                       content.replace('AboutDE', 'Changed'))
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(pods, '_render_for_export',
+                               wraps=pods._render_for_export) as render:
+            result = pod.export(incremental=True)
+            num_rendered = render.call_count
+        self.assertGreater(num_rendered, 0)
+        self.assertLess(num_rendered, len(expected))
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        pod.env.fingerprint = self.pod.env.fingerprint
+        self.assertEqual(pod.export(), result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 from . import formats
 from . import messages
+from grow.common import structures
 from grow.common import utils
 from grow.pods import locales
 from grow.pods import urls
@@ -26,6 +27,19 @@ class DocumentExistsError(Error, ValueError):
     pass
 
 
+_NOT_A_DOCUMENT = object()
+
+
+def _get_listed_pod_path(doc):
+    # Documents within listings are compared by pod path (see `__eq__`).
+    return doc.pod_path if type(doc) == Document else _NOT_A_DOCUMENT
+
+
+def _get_doc_key_pod_path(doc_key):
+    # Keys of listed documents (see `Collection._create_listed_doc`).
+    return doc_key[0]
+
+
 class Document(object):
 
     def __init__(self, pod_path, _pod, locale=None, _collection=None):
@@ -96,8 +110,8 @@ class Document(object):
     @utils.cached_property
     def fields(self):
         identifier = self.locale or self.collection.default_locale
-        tagged_fields = self.get_tagged_fields()
-        fields = utils.untag_fields(tagged_fields, locale=str(identifier))
+        format = formats.Format.get(self)
+        fields = format.untag_fields(locale=str(identifier))
         return {} if not fields else fields
 
     def get_tagged_fields(self):
@@ -173,7 +187,7 @@ class Document(object):
         return self.collection.get_doc(self.root_pod_path, locale=locale)
 
     @property
-    @utils.memoize
+    @utils.memoize.bounded(4096)
     def path_format(self):
         val = None
         if (self.locale
@@ -188,18 +202,18 @@ class Document(object):
         return val
 
     @property
-    @utils.memoize
+    @utils.memoize.bounded(4096)
     def parent(self):
         if '$parent' not in self.fields:
             return None
         parent_pod_path = self.fields['$parent']
         return self.collection.get_doc(parent_pod_path, locale=self.locale)
 
-    @utils.memoize
+    @utils.memoize.bounded(4096)
     def has_serving_path(self):
         return bool(self.path_format)
 
-    @utils.memoize
+    @utils.memoize.bounded(4096)
     def get_serving_path(self):
         # Get root path.
         locale = str(self.locale)
@@ -289,7 +303,7 @@ class Document(object):
         return self.collection.locales
 
     @property
-    @utils.memoize
+    @utils.memoize.bounded(4096)
     def body(self):
         return self.format.body.decode('utf-8') if self.format.body else None
 
@@ -305,29 +319,51 @@ class Document(object):
     def hidden(self):
         return self.fields.get('$hidden', False)
 
-    def next(self, docs=None):
-        if docs is None:
-            docs = self.collection.list_docs()
+    def _find_position(self, docs, usage):
+        """Returns the listing of documents and the position of the first
+        document equal to this one within it (or None)."""
+        if (isinstance(docs, structures.SortedCollection)
+                and docs.source is not None):
+            # Collection listings are mapped from the keys of their documents
+            # (see `Collection.list_docs`), which are indexed instead, so
+            # that documents are not created to find a position.
+            positions = docs.source.get_index(_get_doc_key_pod_path)
+            return docs, positions.get(self.pod_path)
+        if isinstance(docs, structures.SortedCollection):
+            positions = docs.get_index(_get_listed_pod_path)
+            i = positions.get(self.pod_path)
+            invalid_i = positions.get(_NOT_A_DOCUMENT)
+            if invalid_i is not None and (i is None or invalid_i < i):
+                raise ValueError(usage)
+            return docs, i
         for i, doc in enumerate(docs):
             if type(doc) != self.__class__:
-                raise ValueError('Usage: {{doc.next(<docs>)}}.')
+                raise ValueError(usage)
             if doc == self:
-                n = i + 1
-                if n == len(docs):
-                    return None
-                return docs[i + 1]
+                return docs, i
+        return docs, None
 
-    def prev(self, docs=None):
+    def _find_neighbour(self, docs, offset, usage):
         if docs is None:
-            docs = self.collection.list_docs()
-        for i, doc in enumerate(docs):
-            if type(doc) != self.__class__:
-                raise ValueError('Usage: {{doc.prev(<docs>)}}.')
-            if doc == self:
-                n = i - 1
-                if n < 0:
-                    return None
-                return docs[i - 1]
+            # Positions are indexed on the collection's cached listing, so
+            # that only the neighbouring document is created.
+            _, doc_keys = self.collection._get_sorted_doc_keys(
+                'order', utils.SENTINEL, False, True)
+            positions = doc_keys.get_index(_get_doc_key_pod_path)
+            i = positions.get(self.pod_path)
+            if i is None or not 0 <= i + offset < len(doc_keys):
+                return None
+            return self.collection._create_listed_doc(doc_keys[i + offset])
+        docs, i = self._find_position(docs, usage)
+        if i is None or not 0 <= i + offset < len(docs):
+            return None
+        return docs[i + offset]
+
+    def next(self, docs=None):
+        return self._find_neighbour(docs, 1, 'Usage: {{doc.next(<docs>)}}.')
+
+    def prev(self, docs=None):
+        return self._find_neighbour(docs, -1, 'Usage: {{doc.prev(<docs>)}}.')
 
     def to_message(self):
         message = messages.DocumentMessage()
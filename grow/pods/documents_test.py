@@ -1,3 +1,4 @@
+import mock
 import os
 import textwrap
 import unittest
@@ -99,6 +100,32 @@ class DocumentsTestCase(unittest.TestCase):
         doc.prev(docs)
         self.assertRaises(ValueError, doc.prev, [1, 2, 3])
 
+        # Listings are indexed, and match scanning a list of the documents.
+        for order_by in ('order', 'title'):
+            docs = collection.list_docs(order_by=order_by)
+            docs_list = list(docs)
+            for doc in docs_list:
+                self.assertIs(doc.next(docs_list), doc.next(docs))
+                self.assertIs(doc.prev(docs_list), doc.prev(docs))
+        docs = collection.list_docs()
+        for doc in docs:
+            self.assertEqual(doc.next(list(docs)), doc.next())
+            self.assertEqual(doc.prev(list(docs)), doc.prev())
+        self.assertIsNone(docs[0].prev())
+
+        # Only the neighbouring document is created.
+        created = []
+        init = documents.Document.__init__
+
+        def counting_init(doc, *args, **kwargs):
+            created.append(doc)
+            init(doc, *args, **kwargs)
+
+        with mock.patch.object(documents.Document, '__init__', counting_init):
+            for doc in docs:
+                doc.next()
+        self.assertLessEqual(len(created), len(docs))
+
     def test_default_locale(self):
         doc = self.pod.get_doc('/content/localized/localized.yaml', locale='de')
         self.assertEqual('/views/localized.html', doc.view)
@@ -27,6 +27,21 @@ class BuildError(Error):
     controller = None
 
 
+class ExportWorkerError(BuildError):
+    """Raised when a worker process of a parallel export fails to render a
+    path. Tracebacks cannot cross process boundaries, so the worker's
+    traceback is kept as text."""
+
+    def __init__(self, message, path, formatted_traceback):
+        super(ExportWorkerError, self).__init__(
+            message, path, formatted_traceback)
+        self.path = path
+        self.formatted_traceback = formatted_traceback
+
+    def __str__(self):
+        return self.args[0]
+
+
 class BadNameError(Error, ValueError):
     pass
 
@@ -4,14 +4,12 @@
     (yaml, html, markdown, etc.).
 """
 
-from grow.common import markdown_extensions
 from grow.common import utils
-from markdown.extensions import tables
 import collections
 import logging
-import markdown
 import os
 import re
+import threading
 import yaml
 
 
@@ -31,6 +29,159 @@ class BadLocalesError(BadFormatError):
     pass
 
 
+def _copy_containers(value, memo=None):
+    """Returns a copy of nested dicts and lists, keeping other values (such
+    as documents and static files) as-is and containers that occur more than
+    once shared."""
+    if not isinstance(value, (dict, list)):
+        return value
+    if memo is None:
+        memo = {}
+    if id(value) in memo:
+        return memo[id(value)]
+    if isinstance(value, dict):
+        result = value.__class__()
+        memo[id(value)] = result
+        for key, item in value.iteritems():
+            result[key] = _copy_containers(item, memo)
+    else:
+        result = []
+        memo[id(value)] = result
+        result.extend(_copy_containers(item, memo) for item in value)
+    return result
+
+
+class FormatCache(object):
+    """Caches parsed documents so that they are shared across Format
+    instances.
+
+    Entries are keyed by the document's pod path, its locale, and the
+    modification times of the file and its root file (for localized files),
+    so edited files are parsed again. Documents are also discarded when the
+    files read while parsing them (such as the targets of `!g.yaml` and
+    `!g.csv` tags) are invalidated. The cache's version is incremented
+    whenever documents are discarded, so that values derived from documents
+    (such as sorted listings) can be discarded along with them. Plans to
+    untag the fields of each entry are compiled once and shared by its
+    documents.
+    """
+    ATTRIBUTES = (
+        '_has_front_matter',
+        '_locales_from_base',
+        '_locales_from_parts',
+        'body',
+        'content',
+        'fields',
+        'locale_from_path',
+        'root_pod_path',
+    )
+
+    def __init__(self, pod):
+        self.pod = pod
+        self._keys_to_entries = {}
+        self._keys_to_dependencies = {}
+        self._keys_to_untag_plans = {}
+        self._pod_paths_to_keys = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._keys_to_entries)
+
+    def _get_modified(self, pod_path):
+        try:
+            return self.pod.storage.modified(self.pod.abs_path(pod_path))
+        except (IOError, OSError):
+            return None
+
+    def get_key(self, doc):
+        """Returns the cache key of a document, or None if the document's
+        file does not exist."""
+        modified = self._get_modified(doc.pod_path)
+        if modified is None:
+            return None
+        root_pod_path, locale_from_path = \
+            Format.parse_localized_path(doc.pod_path)
+        root_modified = None
+        if locale_from_path:
+            root_modified = self._get_modified(root_pod_path)
+        # Locales are only set after a document is first parsed.
+        locale_kwarg = doc._locale_kwarg
+        locale = doc.locale
+        return (doc.pod_path,
+                str(locale_kwarg) if locale_kwarg else None,
+                str(locale) if locale else None,
+                modified, root_modified)
+
+    def add(self, key, format, dependencies=()):
+        """Adds a parsed document, along with the pod paths of the files read
+        while parsing it."""
+        if key is None:
+            return
+        # Copy so that modifications to the parsed document do not leak.
+        entry = dict((name, _copy_containers(getattr(format, name)))
+                     for name in FormatCache.ATTRIBUTES)
+        dependencies = set(dependencies)
+        dependencies.update([format.pod_path, format.root_pod_path])
+        with self._lock:
+            self._keys_to_entries[key] = entry
+            self._keys_to_dependencies[key] = dependencies
+            for pod_path in dependencies:
+                self._pod_paths_to_keys[pod_path].add(key)
+
+    def restore(self, key, format):
+        """Populates a format from the cache. Returns whether the document
+        was cached."""
+        entry = self._keys_to_entries.get(key) if key is not None else None
+        if entry is None:
+            return False
+        for name, value in entry.iteritems():
+            # Copy so that modifications to one document do not leak to others.
+            setattr(format, name, _copy_containers(value))
+        # Cached documents are not read, so record them for builds.
+        for pod_path in self._keys_to_dependencies.get(key, ()):
+            self.pod.dependencies.record(pod_path)
+        return True
+
+    def get_untag_plan(self, key, fields, modified=False):
+        """Returns the plan to untag a document's fields, compiled once per
+        cached document unless the document modified its fields."""
+        entry = self._keys_to_entries.get(key) if key is not None else None
+        # Documents that modified their own fields are untagged as they are.
+        if entry is None or modified:
+            return utils.UntagPlan(fields)
+        plan = self._keys_to_untag_plans.get(key)
+        if plan is not None:
+            return plan
+        # Compiled from the cached fields, which documents only receive copies
+        # of, so that modified copies do not leak to other documents.
+        plan = utils.UntagPlan(entry['fields'])
+        with self._lock:
+            if key in self._keys_to_entries:
+                self._keys_to_untag_plans[key] = plan
+        return plan
+
+    def invalidate(self, pod_path):
+        """Removes the documents parsed from, or depending on, a file."""
+        pod_path = '/' + pod_path.lstrip('/')
+        with self._lock:
+            for key in self._pod_paths_to_keys.pop(pod_path, ()):
+                self._keys_to_entries.pop(key, None)
+                self._keys_to_untag_plans.pop(key, None)
+                self._keys_to_dependencies.pop(key, None)
+            # Files written by builds are never parsed into documents.
+            if not pod_path.startswith('/.grow/'):
+                self.version += 1
+
+    def reset(self):
+        with self._lock:
+            self._keys_to_entries = {}
+            self._keys_to_dependencies = {}
+            self._keys_to_untag_plans = {}
+            self._pod_paths_to_keys = collections.defaultdict(set)
+            self.version += 1
+
+
 class Format(object):
 
     def __init__(self, doc):
@@ -40,12 +191,33 @@ class Format(object):
         self.pod_path = self.doc.pod_path
         self.root_pod_path = self.pod_path
         self.locale_from_path = None
-        self.content = self._init_content(self.pod_path)
-        self._has_front_matter = Format.has_front_matter(self.content)
         self._locales_from_base = []
         self._locales_from_parts = []
         self.fields = {}
-        self.load()
+        cache_key = self.pod.format_cache.get_key(doc)
+        self._cache_key = cache_key
+        if self.pod.format_cache.restore(cache_key, self):
+            self._fields_modified = False
+            return
+        # Captures the files read while resolving YAML tags.
+        with self.pod.dependencies.capture() as dependencies:
+            self.content = self._init_content(self.pod_path)
+            self._has_front_matter = Format.has_front_matter(self.content)
+            self.load()
+        self.pod.format_cache.add(cache_key, self, dependencies=dependencies)
+        self._fields_modified = cache_key is None
+
+    @property
+    def fields(self):
+        # Fields handed out may be mutated, so they are no longer known to
+        # match the cached document's fields.
+        self._fields_modified = True
+        return self._fields
+
+    @fields.setter
+    def fields(self, fields):
+        self._fields_modified = True
+        self._fields = fields
 
     @staticmethod
     def _normalize_frontmatter(pod_path, content, locale=None):
@@ -107,6 +279,12 @@ class Format(object):
             return self.pod.read_file(pod_path)
         return ''
 
+    def untag_fields(self, locale=None):
+        """Returns the fields untagged for a locale."""
+        plan = self.pod.format_cache.get_untag_plan(
+            self._cache_key, self._fields, modified=self._fields_modified)
+        return plan.untag(locale)
+
     @classmethod
     def get(cls, doc):
         if doc.ext == '.html':
@@ -282,12 +460,5 @@ class MarkdownFormat(HtmlFormat):
     def html(self):
         val = self.body
         if val is not None:
-            extensions = [
-                tables.TableExtension(),
-                markdown_extensions.TocExtension(pod=self.doc.pod),
-                markdown_extensions.CodeBlockExtension(self.doc.pod),
-                markdown_extensions.IncludeExtension(self.doc.pod),
-                markdown_extensions.UrlExtension(self.doc.pod),
-            ]
-            val = markdown.markdown(val.decode('utf-8'), extensions=extensions)
+            val = self.doc.pod.markdown_cache.convert(val)
         return val
@@ -1,7 +1,9 @@
 from . import formats
+from grow.common import utils
 from grow.pods import pods
 from grow.pods import storage
 from grow.testing import testing
+import mock
 import unittest
 
 
@@ -100,6 +102,70 @@ class FormatsTestCase(unittest.TestCase):
         self.assertEqual(
             expected, formats.Format.localize_path(path, locale=locale))
 
+    def test_format_cache(self):
+        path = '/content/pages/about.yaml'
+        doc = self.pod.get_doc(path, locale='de')
+        self.assertEqual('AboutDE', doc.title)
+
+        # Documents are parsed once and shared across instances.
+        with mock.patch.object(formats.YamlFormat, 'load') as load:
+            doc = self.pod.get_doc(path, locale='de')
+            self.assertEqual('AboutDE', doc.title)
+            self.assertEqual('baz', doc.foo)
+            self.assertFalse(load.called)
+
+        # Cached documents are recorded as dependencies.
+        with self.pod.dependencies.capture() as dependencies:
+            self.pod.get_doc(path, locale='de').fields
+        self.assertIn(path, dependencies)
+
+        # Fields are untagged with a plan compiled once per document.
+        with mock.patch.object(utils, 'UntagPlan',
+                               wraps=utils.UntagPlan) as untag_plan:
+            self.assertEqual('AboutDE', self.pod.get_doc(path, locale='de').title)
+            self.assertFalse(untag_plan.called)
+
+        # Modifying fields does not affect other documents.
+        doc.get_tagged_fields()['foo'] = 'changed'
+        self.assertEqual('baz', self.pod.get_doc(path, locale='de').foo)
+
+        # Documents untag their own modified fields.
+        format = self.pod.get_doc(path, locale='de').format
+        format.fields['added@de'] = 'added-de'
+        self.assertEqual('added-de', format.untag_fields('de')['added'])
+        self.assertNotIn('added', self.pod.get_doc(path, locale='de').fields)
+        format = self.pod.get_doc(path, locale='de').format
+        format.fields = {'title@de': 'Assigned'}
+        self.assertEqual('Assigned', format.untag_fields('de')['title'])
+
+        # Writing a file invalidates its documents.
+        content = self.pod.read_file(path)
+        self.pod.write_file(path, content.replace('AboutDE', 'Changed'))
+        doc = self.pod.get_doc(path, locale='de')
+        self.assertEqual('Changed', doc.title)
+
+        # Nested containers are not shared across documents either.
+        self.pod.write_file('/partials/items.yaml', 'items:\n- a\n- b\n')
+        path = '/content/pages/tagged.yaml'
+        self.pod.write_file(path, 'nested: {items: [1]}\n'
+                                  'partial: !g.yaml /partials/items.yaml\n')
+        fields = self.pod.get_doc(path).get_tagged_fields()
+        fields['nested']['items'].append(2)
+        fields['partial']['items'].append('c')
+        fields = self.pod.get_doc(path).get_tagged_fields()
+        self.assertEqual({'items': [1]}, fields['nested'])
+        self.assertEqual(['a', 'b'], fields['partial']['items'])
+
+        # Writing the target of a tag invalidates the documents using it.
+        self.pod.write_file('/partials/items.yaml', 'items:\n- d\n')
+        self.assertEqual(['d'], self.pod.get_doc(path).partial['items'])
+        with self.pod.dependencies.capture() as dependencies:
+            self.pod.get_doc(path).fields
+        self.assertIn('/partials/items.yaml', dependencies)
+
+        self.pod.format_cache.reset()
+        self.assertEqual(0, len(self.pod.format_cache))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,54 @@
+"""Persistent cache of code blocks highlighted by Pygments.
+
+Highlighted HTML is stored keyed by the SHA-1 of the code along with its
+language and the formatter options, so unchanged code blocks are not
+highlighted again, neither on subsequent renders nor on subsequent runs.
+Lexers and formatters are created once per language and set of options.
+"""
+
+from . import persistent_cache
+from grow.common import utils
+from pygments import lexers
+from pygments.formatters import html
+import hashlib
+import json
+import pygments
+
+
+@utils.memoize
+def _get_lexer(language):
+    try:
+        return lexers.get_lexer_by_name(language)
+    except ValueError:
+        return lexers.TextLexer()
+
+
+@utils.memoize
+def _get_formatter(noclasses):
+    return html.HtmlFormatter(noclasses=noclasses)
+
+
+def _encode(value):
+    return value.encode('utf-8') if isinstance(value, unicode) else value
+
+
+class HighlightCache(persistent_cache.PersistentCache):
+    VERSION = 1
+    path = '/.grow/cache/highlight'
+
+    def _create_key(self, language, content, noclasses):
+        sha = hashlib.sha1()
+        sha.update(json.dumps([HighlightCache.VERSION, pygments.__version__,
+                               language, noclasses]))
+        sha.update(_encode(content))
+        return sha.hexdigest()
+
+    def highlight(self, language, content, noclasses=True):
+        """Returns the HTML of code highlighted for a language."""
+        key = self._create_key(language, content, noclasses)
+        code = self.get(key)
+        if code is None:
+            code = pygments.highlight(
+                content, _get_lexer(language), _get_formatter(noclasses))
+            self.add(key, code)
+        return code
@@ -0,0 +1,45 @@
+from . import highlight_cache
+from . import pods
+from . import storage
+from grow.testing import testing
+import mock
+import pygments
+import unittest
+
+
+class HighlightCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_path = testing.create_test_pod_dir()
+        self.pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+
+    def test_highlight(self):
+        cache = self.pod.highlight_cache
+        code = cache.highlight('python', 'print "foo"')
+        self.assertIn('<div class="highlight"', code)
+        self.assertEqual(
+            code, pygments.highlight('print "foo"',
+                                     highlight_cache._get_lexer('python'),
+                                     highlight_cache._get_formatter(True)))
+        with mock.patch.object(pygments, 'highlight') as highlight:
+            self.assertEqual(code, cache.highlight('python', 'print "foo"'))
+            self.assertFalse(highlight.called)
+        # Formatter options and languages are part of the key.
+        self.assertNotEqual(
+            code, cache.highlight('python', 'print "foo"', noclasses=False))
+        cache.highlight('unknown-language', 'print "foo"')
+        self.assertEqual(3, len(cache))
+        self.assertIs(highlight_cache._get_lexer('python'),
+                      highlight_cache._get_lexer('python'))
+        self.pod.save_caches()
+
+        # Highlighted code is reused across runs.
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(pygments, 'highlight') as highlight:
+            self.assertEqual(code,
+                             pod.highlight_cache.highlight('python', 'print "foo"'))
+            self.assertFalse(highlight.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
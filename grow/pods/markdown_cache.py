@@ -0,0 +1,88 @@
+"""Persistent cache of HTML rendered from Markdown.
+
+Rendered HTML is stored keyed by the SHA-1 of the Markdown, along with
+everything else that affects the output: the podspec's Markdown settings,
+the bodies of documents included via `[include('...')]` and the paths of
+documents linked via `[url('...')]`. Unchanged documents are therefore not
+rendered again, neither on subsequent accesses nor on subsequent runs.
+
+Documents are rendered by a `markdown.Markdown` instance that is configured
+once per thread, and reset between documents.
+"""
+
+from . import persistent_cache
+from grow.common import config
+from grow.common import markdown_extensions
+from markdown.extensions import tables
+import hashlib
+import json
+import markdown
+import threading
+
+
+def _encode(value):
+    return value.encode('utf-8') if isinstance(value, unicode) else value
+
+
+class MarkdownCache(persistent_cache.PersistentCache):
+    VERSION = 1
+    path = '/.grow/cache/markdown'
+
+    def __init__(self, pod):
+        super(MarkdownCache, self).__init__(pod)
+        self._local = threading.local()
+
+    def _get_settings(self):
+        podspec = self.pod.podspec
+        settings = podspec.markdown if 'markdown' in podspec else None
+        return json.dumps(settings, sort_keys=True, default=str)
+
+    def _get_markdown(self, settings):
+        md = getattr(self._local, 'markdown', None)
+        if md is None or self._local.settings != settings:
+            extensions = [
+                tables.TableExtension(),
+                markdown_extensions.TocExtension(pod=self.pod),
+                markdown_extensions.CodeBlockExtension(self.pod),
+                markdown_extensions.IncludeExtension(self.pod),
+                markdown_extensions.UrlExtension(self.pod),
+            ]
+            md = markdown.Markdown(extensions=extensions)
+            self._local.markdown = md
+            self._local.settings = settings
+        return md
+
+    def _create_key(self, content, settings):
+        sha = hashlib.sha1()
+        sha.update(json.dumps([MarkdownCache.VERSION, config.VERSION,
+                               markdown.version, settings]))
+        sha.update(content)
+        include_regex = markdown_extensions.IncludePreprocessor.REGEX
+        url_regex = markdown_extensions.UrlPreprocessor.REGEX
+        for line in content.split('\n'):
+            for pod_path in include_regex.findall(line):
+                sha.update('\ninclude:{}\n'.format(pod_path))
+                sha.update(_encode(self.pod.get_doc(pod_path).body or ''))
+            for pod_path in url_regex.findall(line):
+                sha.update('\nurl:{}\n'.format(pod_path))
+                sha.update(_encode(self.pod.get_url(pod_path).path))
+        return sha.hexdigest()
+
+    def convert(self, content):
+        """Returns the HTML rendered from Markdown content (a UTF-8 string)."""
+        settings = self._get_settings()
+        try:
+            key = self._create_key(content, settings)
+        except Exception:
+            # Errors (e.g. missing documents) are raised upon rendering.
+            key = None
+        if key is not None:
+            html = self.get(key)
+            if html is not None:
+                return html
+        md = self._get_markdown(settings)
+        md.reset()
+        html = md.convert(content.decode('utf-8'))
+        if key is not None:
+            self.add(key, html)
+        return html
@@ -0,0 +1,59 @@
+from . import pods
+from . import storage
+from grow.testing import testing
+import markdown
+import mock
+import textwrap
+import unittest
+
+
+class MarkdownCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_path = testing.create_test_pod_dir()
+        self.pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+
+    def test_convert(self):
+        doc = self.pod.get_doc('/content/pages/intro.md')
+        html = doc.html
+        self.assertEqual(1, len(self.pod.markdown_cache))
+        with mock.patch.object(markdown.Markdown, 'convert') as convert:
+            self.assertEqual(html, doc.html)
+            self.assertFalse(convert.called)
+        self.pod.save_caches()
+
+        # Rendered HTML is reused across runs.
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        doc = pod.get_doc('/content/pages/intro.md')
+        with mock.patch.object(markdown.Markdown, 'convert') as convert:
+            self.assertEqual(html, doc.html)
+            self.assertFalse(convert.called)
+
+    def test_dependencies(self):
+        self.pod.write_file('/content/pages/included.md', 'Included\n')
+        self.pod.write_file('/content/pages/test.md', textwrap.dedent(
+            """\
+            [include('/content/pages/included.md')]
+
+            [Link]([url('/content/pages/about.yaml')])
+            """))
+        html = self.pod.get_doc('/content/pages/test.md').html
+        self.assertIn('<p>Included</p>', html)
+        self.assertIn('href="/about/"', html)
+
+        # Changes to included documents render the document again.
+        self.pod.write_file('/content/pages/included.md', 'Changed\n')
+        html = self.pod.get_doc('/content/pages/test.md').html
+        self.assertIn('<p>Changed</p>', html)
+
+        # Rendering documents one after another with a shared instance gives
+        # the same results as rendering them separately.
+        docs = self.pod.get_collection('pages').docs()
+        results = [doc.html for doc in docs]
+        self.pod.markdown_cache.reset()
+        for doc, result in zip(docs, results):
+            self.assertEqual(result, doc.html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Base class of caches persisted under /.grow/cache/ between runs.
+
+Entries are keyed by hashes of everything that affects their values, so
+they never need to be invalidated. Entries that were not used during a run
+are discarded upon saving once they outnumber the ones in use, bounding
+each cache to twice the size of the pod.
+
+Worker processes of parallel builds pass the entries they added and the keys
+they used back to the parent's caches (see `pop_added_entries`), which save
+them.
+"""
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+import threading
+
+
+class PersistentCache(object):
+    VERSION = 1
+    path = None
+
+    def __init__(self, pod):
+        self.pod = pod
+        self._keys_to_values = None
+        self._used_keys = set()
+        self._added_entries = {}
+        self._added_used_keys = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys_to_values or {})
+
+    @property
+    def persisted(self):
+        return not self.pod.storage.is_cloud_storage
+
+    def _load(self):
+        self._keys_to_values = {}
+        path = self.pod.abs_path(self.path)
+        if not self.persisted or not self.pod.storage.exists(path):
+            return
+        try:
+            data = pickle.loads(self.pod.storage.read(path))
+        except Exception:
+            return  # Ignore corrupt caches, they are rewritten upon saving.
+        if isinstance(data, dict) and data.get('version') == self.VERSION:
+            self._keys_to_values = data['entries']
+
+    def get(self, key, default=None):
+        with self._lock:
+            if self._keys_to_values is None:
+                self._load()
+            value = self._keys_to_values.get(key, default)
+            if value is not default:
+                self._used_keys.add(key)
+                self._added_used_keys.add(key)
+        return value
+
+    def add(self, key, value):
+        with self._lock:
+            if self._keys_to_values is None:
+                self._load()
+            self._keys_to_values[key] = value
+            self._used_keys.add(key)
+            self._added_entries[key] = value
+            self._dirty = True
+
+    def pop_added_entries(self):
+        """Returns a tuple of the entries added and the keys of the existing
+        entries used since the last call, so that processes rendering for
+        another pod can pass them to it (see `add_entries`)."""
+        with self._lock:
+            result = (self._added_entries, self._added_used_keys)
+            self._added_entries = {}
+            self._added_used_keys = set()
+        return result
+
+    def add_entries(self, added_entries):
+        """Adds entries returned by another cache's `pop_added_entries`."""
+        entries, used_keys = added_entries
+        if not entries and not used_keys:
+            return
+        with self._lock:
+            if self._keys_to_values is None:
+                self._load()
+            self._keys_to_values.update(entries)
+            self._used_keys.update(entries)
+            self._used_keys.update(used_keys)
+            if entries:
+                self._dirty = True
+
+    def reset(self):
+        with self._lock:
+            self._keys_to_values = None
+            self._used_keys = set()
+            self._added_entries = {}
+            self._added_used_keys = set()
+            self._dirty = False
+
+    def save(self):
+        """Persists the cache if any entries were added."""
+        with self._lock:
+            if not self._dirty or not self.persisted:
+                return
+            entries = self._keys_to_values
+            if len(entries) > 2 * len(self._used_keys):
+                entries = dict((key, value)
+                               for key, value in entries.iteritems()
+                               if key in self._used_keys)
+                self._keys_to_values = entries
+            data = {'entries': entries, 'version': self.VERSION}
+            content = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+            self._dirty = False
+        self.pod.write_file(self.path, content)
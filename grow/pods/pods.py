@@ -1,21 +1,35 @@
 """A pod encapsulates all files used to build a site."""
 
+from . import bytecode_cache
 from . import catalog_holder
 from . import collection
+from . import dependency
 from . import env as environment
+from . import errors
+from . import formats
+from . import highlight_cache
 from . import locales
+from . import markdown_cache
 from . import messages
 from . import podspec
+from . import profiler
 from . import routes
 from . import static
 from . import storage
 from . import tags
+from . import urls
+from . import yaml_cache
 from ..preprocessors import preprocessors
 from ..translators import translators
 from grow.common import sdk_utils
 from grow.common import utils
 from grow.deployments import deployments
+from protorpc import protojson
 from werkzeug.contrib import cache as werkzeug_cache
+if utils.is_appengine():
+    pool = None
+else:
+    from multiprocessing import pool
 import copy
 import jinja2
 import json
@@ -23,7 +37,10 @@ import logging
 import os
 import progressbar
 import re
+import sys
+import threading
 import time
+import traceback
 
 _handler = logging.StreamHandler()
 _formatter = logging.Formatter('[%(asctime)s] %(message)s', '%H:%M:%S')
@@ -45,10 +62,81 @@ class PodSpecParseError(Error):
     pass
 
 
+# Pod instance used by each worker process of a parallel export, and the
+# keyword arguments passed to `_render_for_export` by the worker.
+_export_worker_pod = None
+_export_worker_kwargs = {}
+
+
+def _init_export_worker(root, storage_cls, env_config, render_kwargs):
+    global _export_worker_pod
+    global _export_worker_kwargs
+    config = protojson.decode_message(environment.EnvConfig, env_config)
+    _export_worker_pod = Pod(root, storage=storage_cls,
+                             env=environment.Env(config))
+    _export_worker_kwargs = render_kwargs
+
+
+def _export_worker(paths):
+    results = []
+    for path in paths:
+        try:
+            controller, params = _export_worker_pod.match(path)
+            content, dependencies, timing = _render_for_export(
+                _export_worker_pod, path, controller, params,
+                **_export_worker_kwargs)
+        except Exception as e:
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            # Report where rendering failed, rather than where it was wrapped.
+            if isinstance(e, errors.BuildError) and e.exception is not None:
+                exc_type, exc_value = type(e.exception), e.exception
+                exc_traceback = getattr(e, 'traceback', exc_traceback)
+            formatted_traceback = ''.join(traceback.format_exception(
+                exc_type, exc_value, exc_traceback))
+            text = 'Error building {}: {}'.format(path, e)
+            raise errors.ExportWorkerError(text, path, formatted_traceback)
+        results.append((path, content, dependencies, timing))
+    # Caches are saved by the parent, along with the entries of other workers.
+    cache_entries = dict(
+        (name, getattr(_export_worker_pod, name).pop_added_entries())
+        for name in Pod.EXPORT_WORKER_CACHES)
+    return results, cache_entries
+
+
+def _render_with_dependencies(pod, controller, params, track_dependencies):
+    if not track_dependencies:
+        return controller.render(params, inject=False), None
+    with pod.dependencies.capture() as dependencies:
+        content = controller.render(params, inject=False)
+    return content, dependencies
+
+
+def _render_for_export(pod, path, controller, params, track_dependencies=False,
+                       profile=False):
+    """Renders a path, returning a tuple of (content, dependencies, timing).
+    Dependencies and timing are None unless tracked or profiled."""
+    if not profile:
+        content, dependencies = _render_with_dependencies(
+            pod, controller, params, track_dependencies)
+        return content, dependencies, None
+    with profiler.timer(path, controller, params) as timing:
+        content, dependencies = _render_with_dependencies(
+            pod, controller, params, track_dependencies)
+    return content, dependencies, timing
+
+
 # TODO(jeremydw): A handful of the properties of "pod" should be moved to the
 # "podspec" class.
 
 class Pod(object):
+    EXPORT_CHUNK_SIZE = 50  # Max paths sent to a worker at once.
+    # Persistent caches filled by workers and passed back to the parent.
+    EXPORT_WORKER_CACHES = (
+        'fingerprints',
+        'highlight_cache',
+        'markdown_cache',
+        'yaml_cache',
+    )
 
     def __init__(self, root, storage=storage.auto, env=None):
         self.storage = storage
@@ -60,6 +148,14 @@ class Pod(object):
         self.catalogs = catalog_holder.Catalogs(pod=self)
         self.logger = _logger
         self.routes = routes.Routes(pod=self)
+        self.dependencies = dependency.DependencyGraph(pod=self)
+        self.fingerprints = static.FingerprintCache(pod=self)
+        self.format_cache = formats.FormatCache(pod=self)
+        self.yaml_cache = yaml_cache.YamlCache(pod=self)
+        self.markdown_cache = markdown_cache.MarkdownCache(pod=self)
+        self.highlight_cache = highlight_cache.HighlightCache(pod=self)
+        self.collection_index = collection.CollectionIndex(pod=self)
+        self._jinja_locale = threading.local()
         try:
             sdk_utils.check_sdk_version(self)
         except PodDoesNotExistError:
@@ -91,7 +187,7 @@ class Pod(object):
     def grow_version(self):
         return self.podspec.grow_version
 
-    @utils.memoize
+    @utils.memoize.bounded(64)
     def _parse_yaml(self):
         try:
             return utils.parse_yaml(self.read_file('/podspec.yaml'))
@@ -134,10 +230,12 @@ class Pod(object):
 
     def list_dir(self, pod_path='/', recursive=True):
         path = self._normalize_path(pod_path)
+        self.dependencies.record_dir(pod_path)
         return self.storage.listdir(path, recursive=recursive)
 
     def open_file(self, pod_path, mode=None):
         path = self._normalize_path(pod_path)
+        self.dependencies.record(pod_path)
         return self.storage.open(path, mode=mode)
 
     def file_modified(self, pod_path):
@@ -146,15 +244,19 @@ class Pod(object):
 
     def read_file(self, pod_path):
         path = self._normalize_path(pod_path)
+        self.dependencies.record(pod_path)
         return self.storage.read(path)
 
     def walk(self, pod_path):
         path = self._normalize_path(pod_path)
+        self.dependencies.record_dir(pod_path)
         return self.storage.walk(path)
 
     def write_file(self, pod_path, content):
         path = self._normalize_path(pod_path)
         self.storage.write(path, content)
+        self.format_cache.invalidate(pod_path)
+        self.collection_index.invalidate(pod_path)
 
     def file_size(self, pod_path):
         path = self._normalize_path(pod_path)
@@ -162,15 +264,20 @@ class Pod(object):
 
     def file_exists(self, pod_path):
         path = self._normalize_path(pod_path)
+        self.dependencies.record(pod_path)
         return self.storage.exists(path)
 
     def delete_file(self, pod_path):
         path = self._normalize_path(pod_path)
+        self.format_cache.invalidate(pod_path)
+        self.collection_index.invalidate(pod_path)
         return self.storage.delete(path)
 
     def move_file_to(self, source_pod_path, destination_pod_path):
         source_path = self._normalize_path(source_pod_path)
         dest_path = self._normalize_path(destination_pod_path)
+        self.collection_index.invalidate(source_pod_path)
+        self.collection_index.invalidate(destination_pod_path)
         return self.storage.move_to(source_path, dest_path)
 
     def list_collections(self, paths=None):
@@ -185,6 +292,12 @@ class Pod(object):
 
     def get_url(self, pod_path, locale=None):
         if pod_path.startswith('/content'):
+            # Uses the routes (once built) to avoid creating the document.
+            serving_path = self.routes.get_serving_path(pod_path, locale=locale)
+            if serving_path is not None:
+                self.dependencies.record_doc_path(pod_path, locale=locale)
+                return urls.Url(path=serving_path, host=self.env.host,
+                                port=self.env.port, scheme=self.env.scheme)
             doc = self.get_doc(pod_path, locale=locale)
             return doc.url
         static = self.get_static(pod_path, locale=locale)
@@ -192,15 +305,12 @@ class Pod(object):
 
     def get_static(self, pod_path, locale=None):
         """Returns a StaticFile, given the static file's pod path."""
-        for route in self.routes.static_routing_map.iter_rules():
-            controller = route.endpoint
-            if controller.KIND == messages.Kind.STATIC:
-                serving_path = controller.match_pod_path(pod_path)
-                if serving_path:
-                    return static.StaticFile(pod_path, serving_path, locale=locale,
-                                             pod=self, controller=controller,
-                                             fingerprinted=controller.fingerprinted,
-                                             localization=controller.localization)
+        controller, serving_path = self.routes.match_static_pod_path(pod_path)
+        if controller is not None:
+            return static.StaticFile(pod_path, serving_path, locale=locale,
+                                     pod=self, controller=controller,
+                                     fingerprinted=controller.fingerprinted,
+                                     localization=controller.localization)
         text = ('Either no file exists at "{}" or the "static_dirs" setting was '
                 'not configured for this path in podspec.yaml.'.format(pod_path))
         raise static.BadStaticFileError(text)
@@ -236,48 +346,185 @@ class Pod(object):
           Collection.
         """
         pod_path = os.path.join(collection.Collection.CONTENT_PATH, collection_path)
-        return collection.Collection.get(pod_path, _pod=self)
+        return self.collection_index.get_collection(pod_path)
+
+    def export(self, workers=None, incremental=False, profile=None,
+               shard=None):
+        """Builds the pod, returning a mapping of paths to content.
+
+        Args:
+          workers: Number of processes used to render the pod. Paths are
+              rendered serially in this process when unset or less than 2.
+          incremental: Whether to only render paths whose dependencies changed
+              since the last incremental build, reusing the previous output
+              of all other paths.
+          profile: A profiler.Profile that, if provided, receives the time and
+              memory spent rendering each path.
+          shard: A shards.Shard that, if provided, limits the build to the
+              paths assigned to the shard.
+        Returns:
+          Dict mapping serving paths to rendered content.
+        """
+        return dict(self.iter_export(workers=workers, incremental=incremental,
+                                     profile=profile, shard=shard))
 
-    def export(self):
-        """Builds the pod, returning a mapping of paths to content."""
-        output = {}
+    def iter_export(self, workers=None, incremental=False, profile=None,
+                    shard=None):
+        """Builds the pod, yielding (path, content) tuples as each path is
+        rendered so that callers can consume the build with bounded memory.
+
+        Args:
+          workers: Number of processes used to render the pod. Paths are
+              rendered serially in this process when unset or less than 2.
+          incremental: Whether to only render paths whose dependencies changed
+              since the last incremental build, reusing the previous output
+              of all other paths.
+          profile: A profiler.Profile that, if provided, receives the time and
+              memory spent rendering each path.
+          shard: A shards.Shard that, if provided, limits the build to the
+              paths assigned to the shard.
+        """
+        graph = self.dependencies
+        if incremental:
+            graph.load()
+            # Unless a fingerprint is configured, keep the previous build's
+            # fingerprint so that reused and re-rendered paths agree.
+            if (not self.env.config.fingerprint and graph.fingerprint
+                    and graph.fingerprint != self.env.fingerprint):
+                self.env.fingerprint = graph.fingerprint
+                self.routes.reset_cache()
         routes = self.get_routes()
         paths = []
         for items in routes.get_locales_to_paths().values():
             paths += items
+        if incremental:
+            graph.retain(paths)
+        if shard is not None:
+            paths = [path for path in paths if shard.contains(path)]
         text = 'Building: %(value)d/{} (in %(elapsed)s)'
         widgets = [progressbar.FormatLabel(text.format(len(paths)))]
         bar = progressbar.ProgressBar(widgets=widgets, maxval=len(paths))
         bar.start()
+        paths_to_render = paths
+        if incremental:
+            paths_to_render = []
+            for path in paths:
+                if graph.is_fresh(path):
+                    yield path, graph.get_output(path)
+                    bar.update(bar.currval + 1)
+                else:
+                    paths_to_render.append(path)
+        render_kwargs = {
+            'profile': profile is not None,
+            'track_dependencies': incremental,
+        }
+        if workers and workers > 1:
+            results = self._iter_export_parallel(
+                paths_to_render, workers, render_kwargs)
+        else:
+            results = self._iter_export_serial(paths_to_render, render_kwargs)
+        for path, content, dependencies, timing in results:
+            if incremental:
+                graph.add(path, content, dependencies)
+            if profile is not None:
+                profile.add(timing)
+            yield path, content
+            bar.update(bar.currval + 1)
+        error_controller = routes.match_error('/404.html')
+        if error_controller and (shard is None or shard.contains('/404.html')):
+            yield '/404.html', error_controller.render({})
+        if incremental:
+            graph.save()
+        bar.finish()
+        if incremental:
+            text = 'Rendered {} of {} paths (others unchanged).'
+            self.logger.info(text.format(len(paths_to_render), len(paths)))
+
+    def _iter_export_serial(self, paths, render_kwargs):
         for path in paths:
             controller, params = self.match(path)
             try:
-              output[path] = controller.render(params, inject=False)
+              content, dependencies, timing = _render_for_export(
+                  self, path, controller, params, **render_kwargs)
             except:
               self.logger.error('Error building: {}'.format(controller))
               raise
-            bar.update(bar.currval + 1)
-        error_controller = routes.match_error('/404.html')
-        if error_controller:
-            output['/404.html'] = error_controller.render({})
-        bar.finish()
-        return output
-
-    def dump(self, suffix='index.html', append_slashes=True):
-        output = self.export()
-        clean_output = {}
+            yield path, content, dependencies, timing
+
+    def _iter_export_parallel(self, paths, workers, render_kwargs):
+        """Renders paths across a pool of worker processes, each with its own
+        pod, yielding results as they are streamed back."""
+        if pool is None:
+            text = 'Parallel builds are unavailable in this environment.'
+            raise utils.UnavailableError(text)
+        if not paths:
+            return
+        # Workers must share the fingerprint so output matches a serial build.
+        env_config = protojson.decode_message(
+            environment.EnvConfig, protojson.encode_message(self.env.config))
+        env_config.fingerprint = self.env.fingerprint
+        chunk_size = max(1, min(Pod.EXPORT_CHUNK_SIZE, len(paths) // workers))
+        chunks = [paths[i:i + chunk_size]
+                  for i in range(0, len(paths), chunk_size)]
+        initargs = (self.root, self.storage,
+                    protojson.encode_message(env_config), render_kwargs)
+        process_pool = pool.Pool(workers, initializer=_init_export_worker,
+                                 initargs=initargs)
+        try:
+            for results, cache_entries in process_pool.imap_unordered(
+                    _export_worker, chunks):
+                for name, entries in cache_entries.iteritems():
+                    getattr(self, name).add_entries(entries)
+                for result in results:
+                    yield result
+        except errors.ExportWorkerError as e:
+            self.logger.error('{}\n{}'.format(e, e.formatted_traceback))
+            raise
+        finally:
+            process_pool.terminate()
+            process_pool.join()
+
+    def dump(self, suffix='index.html', append_slashes=True, workers=None,
+             incremental=False, profile=None, shard=None):
+        return dict(self.iter_dump(suffix=suffix, append_slashes=append_slashes,
+                                   workers=workers, incremental=incremental,
+                                   profile=profile, shard=shard))
+
+    def iter_dump(self, suffix='index.html', append_slashes=True,
+                  workers=None, incremental=False, profile=None, shard=None):
+        """Like `iter_export`, but yields paths suitable for writing to a
+        file system or a file-based web server.
+
+        When sharding, paths are assigned to shards by their dumped path, so
+        that the shard of each file in a destination's index is known.
+        """
+        get_dump_path = lambda path: Pod._get_dump_path(
+            path, suffix=suffix, append_slashes=append_slashes)
+        if shard is not None:
+            shard = shard.with_key(get_dump_path)
+        for path, content in self.iter_export(workers=workers,
+                                              incremental=incremental,
+                                              profile=profile, shard=shard):
+            yield get_dump_path(path), content
+
+    @staticmethod
+    def _get_dump_path(path, suffix='index.html', append_slashes=True):
         if suffix:
-            for path, content in output.iteritems():
-                if (append_slashes
-                    and not path.endswith('/')
-                    and not os.path.splitext(path)[-1]):
-                    path = path.rstrip('/') + '/'
-                if append_slashes and path.endswith('/') and suffix:
-                    path += suffix
-                clean_output[path] = content
-        else:
-            clean_output = output
-        return clean_output
+            if (append_slashes
+                and not path.endswith('/')
+                and not os.path.splitext(path)[-1]):
+                path = path.rstrip('/') + '/'
+            if append_slashes and path.endswith('/') and suffix:
+                path += suffix
+        return path
+
+    def save_caches(self):
+        """Persists caches that are reused across runs."""
+        self.fingerprints.save()
+        self.routes.save_cache()
+        self.yaml_cache.save()
+        self.markdown_cache.save()
+        self.highlight_cache.save()
 
     def to_message(self):
         message = messages.PodMessage()
@@ -324,7 +571,7 @@ class Pod(object):
         codes = self.yaml.get('localization', {}).get('locales', [])
         return locales.Locale.parse_codes(codes)
 
-    @utils.memoize
+    @utils.memoize.bounded(64)
     def get_translator(self, service=utils.SENTINEL):
         if 'translators' not in self.yaml:
             return None
@@ -361,7 +608,7 @@ class Pod(object):
                     instructions=translator_config.get('instructions'))
         raise ValueError('No translator service found: {}'.format(service))
 
-    @utils.memoize
+    @utils.memoize.bounded(64)
     def list_preprocessors(self):
         results = []
         preprocessors.register_extensions(
@@ -415,10 +662,13 @@ class Pod(object):
     def get_podspec(self):
         return self.podspec
 
-    @utils.memoize
+    @utils.memoize.bounded(64)
     def _get_bytecode_cache(self):
-        client = werkzeug_cache.SimpleCache()
-        return jinja2.MemcachedBytecodeCache(client=client)
+        if self.storage.is_cloud_storage:
+            client = werkzeug_cache.SimpleCache()
+            return jinja2.MemcachedBytecodeCache(client=client)
+        return bytecode_cache.FileSystemBytecodeCache(
+            pod=self, max_size=self.flags.get('jinja_cache_max_size'))
 
     def list_jinja_extensions(self):
         extensions = []
@@ -433,8 +683,27 @@ class Pod(object):
             extensions.append(value)
         return extensions
 
-    @utils.memoize
     def get_jinja_env(self, locale='', root=None):
+        """Returns the Jinja environment of a loader root, for rendering
+        templates translated into a locale.
+
+        The environment is shared by all locales, so that each template is
+        compiled and held once. Templates are translated into the locale set
+        by the `_locale` variable of the context they are rendered with or,
+        failing that (e.g. in templates imported without context), into the
+        locale last requested by this thread.
+        """
+        self._jinja_locale.value = locale
+        return self._create_jinja_env(root)
+
+    def _get_jinja_locale(self, context):
+        locale = context.get('_locale', utils.SENTINEL)
+        if locale is utils.SENTINEL:
+            locale = getattr(self._jinja_locale, 'value', '')
+        return locale
+
+    @utils.memoize.bounded(64)
+    def _create_jinja_env(self, root=None):
         kwargs = {
             'autoescape': True,
             'extensions': [
@@ -444,7 +713,8 @@ class Pod(object):
                 'jinja2.ext.loopcontrols',
                 'jinja2.ext.with_',
             ],
-            'loader': self.storage.JinjaLoader(self.root if root is None else root),
+            'loader': self.storage.JinjaLoader(
+                self.root if root is None else root),
             'lstrip_blocks': True,
             'trim_blocks': True,
         }
@@ -455,12 +725,61 @@ class Pod(object):
         env.globals.update({'g': tags.create_builtin_tags(self, use_cache=self.env.cached)})
         env.filters.update(tags.create_builtin_filters())
         get_gettext_func = self.catalogs.get_gettext_translations
-        env.install_gettext_callables(
-            lambda x: get_gettext_func(locale).ugettext(x),
-            lambda s, p, n: get_gettext_func(locale).ungettext(s, p, n),
-            newstyle=True)
+
+        @jinja2.contextfunction
+        def gettext(context, message):
+            locale = self._get_jinja_locale(context)
+            return get_gettext_func(locale).ugettext(message)
+
+        @jinja2.contextfunction
+        def ngettext(context, singular, plural, n):
+            locale = self._get_jinja_locale(context)
+            return get_gettext_func(locale).ungettext(singular, plural, n)
+
+        env.install_gettext_callables(gettext, ngettext, newstyle=True)
         return env
 
+    def warm_up_templates(self, workers=4):
+        """Compiles the templates under /views/ into the Jinja environments
+        used to render each locale and loads the translations of each locale,
+        so that the first render of each view does not pay for compiling the
+        template and loading catalogs.
+
+        Args:
+          workers: Number of threads used to compile templates.
+        Returns:
+          Number of templates loaded.
+        """
+        start = time.time()
+        locales = self.list_locales()
+        envs = []
+        for locale in [None] + list(locales):
+            self.catalogs.get_gettext_translations(locale)
+            env = self.get_jinja_env(locale)
+            if env not in envs:
+                envs.append(env)
+        names = ['views/' + path.lstrip('/') for path in self.list_dir('/views/')]
+        text = 'Warming up {} templates for {} locales...'
+        self.logger.info(text.format(len(names), len(locales)))
+        def load(name):
+            try:
+                for env in envs:
+                    env.get_template(name)
+                return True
+            except (jinja2.TemplateError, UnicodeDecodeError):
+                return False  # Errors are raised upon rendering.
+        if pool is None or workers < 2:
+            num_loaded = sum(load(name) for name in names)
+        else:
+            thread_pool = pool.ThreadPool(workers)
+            try:
+                num_loaded = sum(thread_pool.map(load, names))
+            finally:
+                thread_pool.close()
+        text = 'Warmed up {} templates in {:.3f} seconds.'
+        self.logger.info(text.format(num_loaded, time.time() - start))
+        return num_loaded
+
     def get_root_path(self, locale=None):
         path_format = self.yaml.get('flags', {}).get('root_path', None)
         if locale is None:
@@ -478,7 +797,7 @@ class Pod(object):
         return locale
 
     def load(self):
-        self.routes.routing_map
+        self.routes.load_cache()
 
     def read_yaml(self, path):
         fields = utils.parse_yaml(self.read_file(path), pod=self)
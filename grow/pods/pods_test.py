@@ -1,3 +1,5 @@
+from . import env as environment
+from . import errors
 from . import pods
 from . import static
 from . import storage
@@ -51,6 +53,42 @@ class PodTest(unittest.TestCase):
     def test_export(self):
         self.pod.export()
 
+        # Exporting leaves persistent caches to the build and deploy commands.
+        pod = pods.Pod(testing.create_test_pod_dir(), storage=storage.FileStorage)
+        pod.export()
+        self.assertFalse(pod.file_exists(pod.markdown_cache.path))
+        self.assertFalse(pod.file_exists(pod.yaml_cache.path))
+        self.assertFalse(pod.file_exists(pod.fingerprints.path))
+
+    def test_export_parallel(self):
+        serial_output = self.pod.export()
+        parallel_output = self.pod.export(workers=2)
+        self.assertEqual(serial_output, parallel_output)
+
+        # Caches filled by workers are saved by the parent.
+        dir_path = testing.create_test_pod_dir()
+        pod = pods.Pod(dir_path, storage=storage.FileStorage)
+        pod.export(workers=2)
+        pod.save_caches()
+        self.assertGreater(len(pod.markdown_cache), 0)
+        pod = pods.Pod(dir_path, storage=storage.FileStorage)
+        doc = pod.get_doc('/content/pages/intro.md')
+        with mock.patch('markdown.Markdown.convert') as convert:
+            doc.html
+            self.assertFalse(convert.called)
+
+    def test_export_parallel_error(self):
+        with mock.patch.object(pods.Pod, 'match',
+                               side_effect=ValueError('Bad path')):
+            with self.assertRaises(errors.ExportWorkerError) as context:
+                self.pod.export(workers=2)
+        error = context.exception
+        self.assertTrue(error.path.startswith('/'))
+        self.assertIn(error.path, str(error))
+        self.assertIn('Bad path', str(error))
+        self.assertIn('Traceback', error.formatted_traceback)
+        self.assertIn('ValueError: Bad path', error.formatted_traceback)
+
     def test_dump(self):
         paths = [
             '/about/index.html',
@@ -137,6 +175,86 @@ class PodTest(unittest.TestCase):
             static.BadStaticFileError, self.pod.get_static,
             '/bad-path/bad-file.txt')
 
+    def test_get_url(self):
+        pod_paths = [
+            '/content/localized/localized.yaml',
+            '/content/pages/about.yaml',
+            '/content/pages/contact.yaml',
+            '/content/pages/intro.md',
+            '/content/pages/intro@fr.md',
+        ]
+        locales = [None, 'de', 'en', 'fr', 'it', 'ja', 'de_alias']
+        expected = [[self.pod.get_doc(pod_path, locale=locale).url
+                     for locale in locales] for pod_path in pod_paths]
+        self.pod.routes.routing_map
+        with mock.patch.object(self.pod, 'get_doc',
+                               wraps=self.pod.get_doc) as get_doc:
+            self.assertEqual(expected, [
+                [self.pod.get_url(pod_path, locale=locale)
+                 for locale in locales] for pod_path in pod_paths])
+        # Documents are only created for locales without routes.
+        self.assertLess(get_doc.call_count, len(pod_paths) * len(locales))
+        self.assertEqual(
+            '/fr/intro/',
+            self.pod.get_url('/content/pages/intro.md', locale='fr').path)
+        self.assertEqual(
+            self.pod.get_static('/public/file.txt').url,
+            self.pod.get_url('/public/file.txt'))
+
+    def test_get_jinja_env(self):
+        self.pod.catalogs.compile()
+        self.pod.write_file('/views/test.html', "{{_('Hello World!')}}")
+        env = self.pod.get_jinja_env('de')
+        template = env.get_template('views/test.html')
+        self.assertEqual('Hallo Welt!', template.render())
+        # Templates are compiled once and shared by all locales.
+        en_env = self.pod.get_jinja_env('en')
+        self.assertIs(env, en_env)
+        with mock.patch.object(jinja2.Environment, 'compile') as compile_func:
+            self.assertIs(template, en_env.get_template('views/test.html'))
+            self.assertFalse(compile_func.called)
+        self.assertEqual('Hello World!', template.render())
+        # The locale of the render context takes precedence, so getting the
+        # environment of another locale while rendering does not change the
+        # locale of templates being rendered.
+        self.assertEqual('Hallo Welt!', template.render({'_locale': 'de'}))
+        self.assertEqual('Hallo Welt!', template.render(
+            {'_locale': self.pod.normalize_locale('de')}))
+        self.assertIsNot(env, self.pod.get_jinja_env('de', root='/views/'))
+
+        # Templates imported without context are translated too.
+        self.pod.write_file(
+            '/views/macros.html', "{% macro hello() %}{{_('Hello World!')}}"
+                                  "{% endmacro %}")
+        self.pod.write_file(
+            '/views/import.html',
+            "{% import 'views/macros.html' as macros %}{{macros.hello()}}")
+        template = self.pod.get_jinja_env('de').get_template('views/import.html')
+        self.assertEqual('Hallo Welt!', template.render({'_locale': 'de'}))
+
+    def test_warm_up_templates(self):
+        num_templates = len(self.pod.list_dir('/views/'))
+        self.assertEqual(num_templates, self.pod.warm_up_templates())
+        self.assertEqual(num_templates,
+                         self.pod.warm_up_templates(workers=1))
+        jinja_env = self.pod.get_jinja_env(self.pod.list_locales()[0])
+        with mock.patch.object(jinja2.Environment, 'compile') as compile_func:
+            jinja_env.get_template('views/base.html')
+            self.assertFalse(compile_func.called)
+
+        # Warms up the environments used by renders, without a bytecode cache
+        # (as in the development server).
+        config = environment.EnvConfig(host='localhost', cached=False)
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage,
+                       env=environment.Env(config))
+        pod.warm_up_templates(workers=1)
+        for locale in [None, 'de']:
+            jinja_env = pod.get_jinja_env(locale)
+            self.assertIsNone(jinja_env.bytecode_cache)
+            with mock.patch.object(jinja2.Environment, 'compile') as compile_func:
+                jinja_env.get_template('views/base.html')
+                self.assertFalse(compile_func.called)
+
     def test_list_statics(self):
         items = self.pod.list_statics('/public/')
         expected = [
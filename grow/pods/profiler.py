@@ -0,0 +1,177 @@
+"""Profiles the time and memory spent rendering each path of a build.
+
+Memory is measured as the growth, while a path renders, of the memory
+allocated by Python when tracemalloc is tracing, or else of the process's
+current resident set size (on Linux). Elsewhere, only the growth of the
+peak resident set size is available, which is zero for renders that do not
+exceed the previous peak.
+"""
+
+from grow.common import utils
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+import collections
+import contextlib
+import json
+import os
+import sys
+import texttable
+import time
+
+ROLLUP_KEYS = ('view', 'collection', 'locale')
+
+
+_STATM_PATH = '/proc/self/statm'
+
+
+def _get_traced_memory():
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _get_rss():
+    with open(_STATM_PATH) as fp:
+        resident_pages = int(fp.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def _get_max_rss():
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and in bytes on OS X.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def get_memory_func():
+    """Returns a tuple of (label, func), where func returns the memory used
+    by the process in bytes."""
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        return 'Traced memory', _get_traced_memory
+    if os.path.exists(_STATM_PATH):
+        return 'RSS', _get_rss
+    return 'Peak RSS', _get_max_rss
+
+
+@contextlib.contextmanager
+def timer(path, controller, params=None):
+    """Measures rendering a path with a controller.
+
+    Yields:
+      Dict entry that is filled in with the measurements upon exit.
+    """
+    doc = getattr(controller, 'doc', None)
+    locale = controller.locale or (params or {}).get('locale')
+    entry = {
+        'collection': (doc.collection.collection_path
+                       if doc is not None and doc.collection else None),
+        'kind': str(controller.KIND),
+        'locale': str(locale) if locale else None,
+        'path': path,
+        'view': getattr(controller, 'view', None),
+    }
+    _, get_memory = get_memory_func()
+    start_wall = time.time()
+    start_cpu = time.clock()
+    start_memory = get_memory()
+    try:
+        yield entry
+    finally:
+        entry['wall'] = time.time() - start_wall
+        entry['cpu'] = time.clock() - start_cpu
+        entry['memory'] = get_memory() - start_memory
+
+
+class Profile(object):
+    BASENAME = 'profile.json'
+
+    def __init__(self):
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry):
+        self.entries.append(entry)
+
+    def rollup(self, key):
+        """Returns totals of the entries grouped by a key, slowest first.
+
+        Returns:
+          List of (value, totals) tuples, where totals is a dict containing
+          the number of paths, wall time, CPU time and memory.
+        """
+        values_to_totals = collections.defaultdict(
+            lambda: {'count': 0, 'cpu': 0.0, 'memory': 0, 'wall': 0.0})
+        for entry in self.entries:
+            totals = values_to_totals[entry[key]]
+            totals['count'] += 1
+            totals['cpu'] += entry['cpu']
+            totals['memory'] += entry['memory']
+            totals['wall'] += entry['wall']
+        return sorted(values_to_totals.items(),
+                      key=lambda item: (-item[1]['wall'], item[0]))
+
+    def to_json(self):
+        memory_label, _ = get_memory_func()
+        result = {
+            'memory': memory_label,
+            'paths': sorted(self.entries, key=lambda entry: entry['path']),
+        }
+        for key in ROLLUP_KEYS:
+            result[key + 's'] = dict(
+                (value or '-', totals) for value, totals in self.rollup(key))
+        return json.dumps(result, sort_keys=True, indent=2)
+
+    def _create_table(self, label, rows):
+        table = texttable.Texttable(max_width=0)
+        table.set_deco(texttable.Texttable.HEADER)
+        table.set_cols_align(['l', 'r', 'r', 'r', 'r'])
+        table.set_cols_dtype(['t', 'i', 't', 't', 'i'])
+        memory_label, _ = get_memory_func()
+        table.add_rows([[label, 'Paths', 'Wall (s)', 'CPU (s)',
+                         '{} growth (KB)'.format(memory_label)]] + rows)
+        return table.draw()
+
+    def to_tables(self, num_paths=10):
+        results = []
+        for key in ROLLUP_KEYS:
+            rows = []
+            for value, totals in self.rollup(key):
+                rows.append([value or '-', totals['count'],
+                             '{:.3f}'.format(totals['wall']),
+                             '{:.3f}'.format(totals['cpu']),
+                             totals['memory'] // 1024])
+            results.append(self._create_table(key.capitalize(), rows))
+        slowest_entries = sorted(
+            self.entries, key=lambda entry: -entry['wall'])[:num_paths]
+        rows = [[entry['path'], 1, '{:.3f}'.format(entry['wall']),
+                 '{:.3f}'.format(entry['cpu']), entry['memory'] // 1024]
+                for entry in slowest_entries]
+        results.append(self._create_table('Slowest paths', rows))
+        return results
+
+
+def create_memoize_table():
+    """Returns a table of the hits, misses and evictions of the caches of
+    memoized functions in this process, lowest hit rate first."""
+    rows = []
+    for stats in utils.get_memoize_stats():
+        calls = stats['hits'] + stats['misses']
+        rows.append([stats['name'], calls,
+                     '{:.1f}'.format(100.0 * stats['hits'] / calls),
+                     stats['evictions'], stats['size']])
+    rows.sort(key=lambda row: (float(row[2]), row[0]))
+    table = texttable.Texttable(max_width=0)
+    table.set_deco(texttable.Texttable.HEADER)
+    table.set_cols_align(['l', 'r', 'r', 'r', 'r'])
+    table.set_cols_dtype(['t', 'i', 't', 'i', 'i'])
+    table.add_rows(
+        [['Memoized function', 'Calls', 'Hits (%)', 'Evictions', 'Size']]
+        + rows)
+    return table.draw()
@@ -0,0 +1,51 @@
+from . import pods
+from . import profiler
+from . import storage
+from grow.testing import testing
+import json
+import mock
+import unittest
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        dir_path = testing.create_test_pod_dir()
+        self.pod = pods.Pod(dir_path, storage=storage.FileStorage)
+
+    def test_export(self):
+        profile = profiler.Profile()
+        paths_to_contents = self.pod.export(profile=profile)
+        profiled_paths = set(entry['path'] for entry in profile.entries)
+        self.assertEqual(set(paths_to_contents) - set(['/404.html']),
+                         profiled_paths)
+
+        views = dict(profile.rollup('view'))
+        self.assertIn('/views/base.html', views)
+        self.assertEqual(len(profile), sum(
+            totals['count'] for totals in views.values()))
+        collections = dict(profile.rollup('collection'))
+        self.assertEqual(4, collections['posts']['count'])
+
+        data = json.loads(profile.to_json())
+        self.assertEqual(len(profile), len(data['paths']))
+        self.assertIn('pages', data['collections'])
+        self.assertIn('de', data['locales'])
+        self.assertEqual(4, len(profile.to_tables()))
+
+    def test_get_memory_func(self):
+        label, get_memory = profiler.get_memory_func()
+        self.assertIsInstance(get_memory(), (int, long))
+        profile = profiler.Profile()
+        self.pod.export(profile=profile)
+        self.assertIn('{} growth (KB)'.format(label), profile.to_tables()[0])
+        self.assertEqual(label, json.loads(profile.to_json())['memory'])
+        # The current RSS is used where available, rather than the peak.
+        with mock.patch.object(profiler.os.path, 'exists', return_value=True):
+            self.assertEqual('RSS', profiler.get_memory_func()[0])
+        with mock.patch.object(profiler.os.path, 'exists', return_value=False):
+            self.assertEqual('Peak RSS', profiler.get_memory_func()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
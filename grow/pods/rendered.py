@@ -44,9 +44,11 @@ class RenderedController(controllers.BaseController):
             preprocessor = self.pod.inject_preprocessors(doc=self.doc)
             translator = self.pod.inject_translators(doc=self.doc)
         env = self.pod.get_jinja_env(self.locale)
+        self._record_dependencies(env)
         template = env.get_template(self.view.lstrip('/'))
         try:
             kwargs = {
+                '_locale': self.locale,
                 'doc': self.doc,
                 'env': self.pod.env,
                 'podspec': self.pod.get_podspec(),
@@ -62,6 +64,15 @@ class RenderedController(controllers.BaseController):
             exception.exception = e
             raise exception
 
+    def _record_dependencies(self, jinja_env):
+        dependencies = self.pod.dependencies
+        if not dependencies.capturing:
+            return
+        dependencies.record_template(jinja_env, self.view)
+        dependencies.record_catalog(self.locale)
+        if self.doc:
+            dependencies.record_doc(self.doc)
+
     def _inject_ui(self, content, preprocessor, translator):
         show_ui = (self.pod.env.name == env.Name.DEV
                    and (preprocessor or translator)
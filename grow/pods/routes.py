@@ -1,11 +1,17 @@
+from . import collection
+from . import documents
+from . import formats
 from . import locales
 from . import messages
 from . import rendered
 from . import sitemap
 from . import static
+from grow.common import config
 from grow.common import utils
 from werkzeug import routing
 import collections
+import json
+import os
 import webob
 import werkzeug
 
@@ -22,12 +28,47 @@ class DuplicatePathsError(Error, ValueError):
     pass
 
 
+@utils.memoize
+def _parse_locale(identifier):
+    return locales.Locale.parse(identifier) if identifier else None
+
+
+class CachedRenderedController(rendered.RenderedController):
+    """Controller of a document's route restored from the routes cache. The
+    document is only created (and parsed) once the controller is used."""
+
+    def __init__(self, entry, _pod=None):
+        # Skips RenderedController.__init__, as `doc` is created lazily.
+        super(rendered.RenderedController, self).__init__(_pod=_pod)
+        self.entry = entry
+        self.view = entry['view']
+        self.path = None
+
+    def __repr__(self):
+        return '<Rendered(view=\'{}\', doc=\'{}\')>'.format(
+            self.view, self.entry['pod_path'])
+
+    @utils.cached_property
+    def doc(self):
+        col = self.pod.get_collection(self.entry['collection'])
+        return documents.Document(
+            self.entry['pod_path'], _pod=self.pod,
+            locale=self.entry['locale_kwarg'], _collection=col)
+
+
 class Routes(object):
+    VERSION = 1
     converters = {'grow': GrowConverter}
+    cache_path = '/.grow/routes.cache'
 
     def __init__(self, pod):
         self.pod = pod
-        self._paths_to_locales_to_docs = collections.defaultdict(dict)
+        self._paths_to_locales_to_controllers = collections.defaultdict(dict)
+        self._root_pod_paths_to_rules = collections.defaultdict(list)
+        self._content_mtimes = {}
+        self._paths_to_controllers = {}
+        self._doc_keys_to_paths = {}
+        self._pod_paths_to_static_controllers = {}
         self._routing_map = None
         self._static_routing_map = None
 
@@ -45,28 +86,319 @@ class Routes(object):
     def get_doc(self, path, locale=None):
         if isinstance(locale, basestring):
             locale = locales.Locale(locale)
-        return self._paths_to_locales_to_docs.get(path, {}).get(locale)
+        controller = self._paths_to_locales_to_controllers.get(
+            path, {}).get(locale)
+        return controller.doc if controller is not None else None
+
+    def update(self, pod_path):
+        """Updates the routes of a changed content file in place, without
+        rebuilding the routes of other documents. Changes to blueprints
+        rebuild all routes, as they affect every document in a collection."""
+        if self._routing_map is None:
+            return  # Built upon first use.
+        pod_path = '/' + pod_path.lstrip('/')
+        if os.path.basename(pod_path) == collection.Collection.BLUEPRINT_PATH:
+            self._build_routing_map()
+            return
+        self._update_content_mtime(pod_path)
+        if not collection.Collection._is_doc_path(pod_path):
+            return
+        root_pod_path, _ = formats.Format.parse_localized_path(pod_path)
+        rules = []
+        for col in self._list_collections_containing(root_pod_path):
+            for doc in col.list_servable_documents_for_path(
+                    root_pod_path, include_hidden=True):
+                rules.append(self._create_doc_rule(doc))
+        old_rules = self._root_pod_paths_to_rules.pop(root_pod_path, [])
+        for rule in old_rules:
+            self._remove_locale_controller(rule.endpoint)
+        for rule in rules:
+            self._add_locale_controller(rule.endpoint)
+            self._root_pod_paths_to_rules[root_pod_path].append(rule)
+        self._replace_rules(old_rules, rules)
+        for key in self._doc_keys_to_paths.keys():
+            if formats.Format.parse_localized_path(key[0])[0] == root_pod_path:
+                del self._doc_keys_to_paths[key]
+
+    @staticmethod
+    def _get_doc_key(controller):
+        if isinstance(controller, CachedRenderedController):
+            # Avoids creating the document.
+            entry = controller.entry
+            return entry['pod_path'], _parse_locale(entry['locale'])
+        return controller.doc.pod_path, controller.doc.locale
+
+    def _add_locale_controller(self, controller, paths_to_locales_to_controllers=None):
+        if paths_to_locales_to_controllers is None:
+            paths_to_locales_to_controllers = \
+                self._paths_to_locales_to_controllers
+        pod_path, locale = Routes._get_doc_key(controller)
+        paths_to_locales_to_controllers[pod_path][locale] = controller
+
+    def _remove_locale_controller(self, controller):
+        pod_path, locale = Routes._get_doc_key(controller)
+        locales_to_controllers = \
+            self._paths_to_locales_to_controllers.get(pod_path, {})
+        if locales_to_controllers.get(locale) is controller:
+            del locales_to_controllers[locale]
+            if not locales_to_controllers:
+                del self._paths_to_locales_to_controllers[pod_path]
+
+    def _replace_rules(self, old_rules, new_rules):
+        # Werkzeug does not support removing rules from a map, so a new map is
+        # built from the remaining rules (rather than modifying the map, as
+        # requests may be matching). Rules are bound to a single map, so the
+        # remaining rules are copied, and matched by their controllers.
+        old_controller_ids = set(id(rule.endpoint) for rule in old_rules)
+        rules = [rule.empty() for rule in self._routing_map.iter_rules()
+                 if id(rule.endpoint) not in old_controller_ids]
+        routing_map = routing.Map(rules + new_rules, converters=Routes.converters)
+        routing_map.update()  # Sorts rules by priority.
+        self._routing_map = routing_map
+        for rule in old_rules:
+            if (not rule.arguments and self._paths_to_controllers.get(
+                    rule.rule) is rule.endpoint):
+                del self._paths_to_controllers[rule.rule]
+        self._index_rules(new_rules)
+
+    def get_serving_path(self, pod_path, locale=None):
+        """Returns the serving path of a document from its route, without
+        creating the document. Returns None when the routes have not been
+        built, or when the document (in the given locale) has no route."""
+        if self._routing_map is None:
+            return None
+        key = (pod_path, str(locale) if locale else None)
+        if key not in self._doc_keys_to_paths:
+            self._doc_keys_to_paths[key] = self._find_serving_path(*key)
+        return self._doc_keys_to_paths[key]
+
+    def _find_serving_path(self, pod_path, locale):
+        # Mirrors `Pod.get_doc`: the document is retrieved from the collection
+        # of its directory, and from its localized file if there is one.
+        root_pod_path, _ = formats.Format.parse_localized_path(pod_path)
+        collection_path = os.path.dirname(pod_path)
+        localized_path = (formats.Format.localize_path(pod_path, locale)
+                          if locale else None)
+        for rule in self._root_pod_paths_to_rules.get(root_pod_path, []):
+            entry = self._create_cache_entry(rule)
+            if (entry['collection'] == collection_path
+                    and entry['locale_kwarg'] == locale
+                    and entry['pod_path'] in (pod_path, localized_path)):
+                return entry['path']
+        return None
+
+    def match_static_pod_path(self, pod_path):
+        """Returns the controller and serving path of a static file, or
+        (None, None) if no static route serves the file."""
+        static_routing_map = self.static_routing_map
+        if pod_path in self._pod_paths_to_static_controllers:
+            controller = self._pod_paths_to_static_controllers[pod_path]
+            if controller is None:
+                return None, None
+            # Serving paths are not stored, as they may be fingerprinted.
+            return controller, controller.match_pod_path(pod_path)
+        for route in static_routing_map.iter_rules():
+            controller = route.endpoint
+            if controller.KIND == messages.Kind.STATIC:
+                serving_path = controller.match_pod_path(pod_path)
+                if serving_path:
+                    self._pod_paths_to_static_controllers[pod_path] = controller
+                    return controller, serving_path
+        self._pod_paths_to_static_controllers[pod_path] = None
+        return None, None
+
+    def _index_rules(self, rules):
+        # Rules without converters (e.g. documents) are matched by path, and
+        # take priority over rules with converters, as they do in werkzeug.
+        for rule in rules:
+            if not rule.arguments:
+                self._paths_to_controllers.setdefault(rule.rule, rule.endpoint)
+
+    def _set_routing_map(self, rules):
+        routing_map = routing.Map(rules, converters=Routes.converters)
+        routing_map.update()  # Sorts rules by priority.
+        self._routing_map = routing_map
+        self._paths_to_controllers = {}
+        self._doc_keys_to_paths = {}
+        self._index_rules(routing_map.iter_rules())
+        return routing_map
+
+    def _list_collections_containing(self, pod_path):
+        """Returns the collections listing a document, i.e. those with
+        blueprints in any of the document's parent directories."""
+        cols = []
+        dir_path = os.path.dirname(pod_path)
+        content_path = collection.Collection.CONTENT_PATH
+        while dir_path.startswith(content_path + '/'):
+            blueprint_path = os.path.join(
+                dir_path, collection.Collection.BLUEPRINT_PATH)
+            if self.pod.file_exists(blueprint_path):
+                cols.append(self.pod.get_collection(dir_path))
+            dir_path = os.path.dirname(dir_path)
+        return cols
+
+    def _create_doc_rule(self, doc):
+        controller = rendered.RenderedController(
+            view=doc.view, doc=doc, _pod=self.pod)
+        return routing.Rule(doc.get_serving_path(), endpoint=controller)
 
     def _build_routing_map(self, inject=False):
-        new_paths_to_locales_to_docs = collections.defaultdict(dict)
+        content_mtimes = self._get_content_mtimes()
+        new_paths_to_locales_to_controllers = collections.defaultdict(dict)
+        new_root_pod_paths_to_rules = collections.defaultdict(list)
         rules = []
         # Content documents.
-        for collection in self.pod.list_collections():
-            for doc in collection.list_servable_documents(include_hidden=True, inject=inject):
-                controller = rendered.RenderedController(
-                    view=doc.view, doc=doc, _pod=self.pod)
-                rule = routing.Rule(doc.get_serving_path(), endpoint=controller)
+        for col in self.pod.list_collections():
+            for doc in col.list_servable_documents(include_hidden=True, inject=inject):
+                rule = self._create_doc_rule(doc)
                 rules.append(rule)
-                new_paths_to_locales_to_docs[doc.pod_path][doc.locale] = doc
+                self._add_locale_controller(
+                    rule.endpoint, new_paths_to_locales_to_controllers)
+                new_root_pod_paths_to_rules[doc.root_pod_path].append(rule)
         # Static routes.
         rules += self._build_static_routing_map_and_return_rules()
-        self._routing_map = routing.Map(rules, converters=Routes.converters)
-        self._paths_to_locales_to_docs = new_paths_to_locales_to_docs
+        self._set_routing_map(rules)
+        self._paths_to_locales_to_controllers = \
+            new_paths_to_locales_to_controllers
+        self._root_pod_paths_to_rules = new_root_pod_paths_to_rules
+        self._content_mtimes = content_mtimes
+        return self._routing_map
+
+    @property
+    def _cache_persisted(self):
+        return not self.pod.storage.is_cloud_storage
+
+    def _get_modified(self, pod_path):
+        try:
+            return self.pod.storage.modified(self.pod.abs_path(pod_path))
+        except (IOError, OSError):
+            return None
+
+    def _get_content_mtimes(self):
+        if not self._cache_persisted:
+            return {}
+        content_path = collection.Collection.CONTENT_PATH
+        content_mtimes = {}
+        for path in self.pod.list_dir(content_path + '/'):
+            pod_path = content_path + '/' + path.lstrip('/')
+            content_mtimes[pod_path] = self._get_modified(pod_path)
+        return content_mtimes
+
+    def _update_content_mtime(self, pod_path):
+        modified = self._get_modified(pod_path)
+        if modified is None:
+            self._content_mtimes.pop(pod_path, None)
+        else:
+            self._content_mtimes[pod_path] = modified
+
+    def _create_cache_key(self):
+        return {
+            'podspec': self._get_modified('/podspec.yaml'),
+            'version': Routes.VERSION,
+            'grow_version': config.VERSION,
+        }
+
+    def _create_cache_entry(self, rule):
+        controller = rule.endpoint
+        if isinstance(controller, CachedRenderedController):
+            return controller.entry
+        doc = controller.doc
+        locale_kwarg = doc._locale_kwarg
+        return {
+            'collection': doc.collection.pod_path,
+            'locale': str(doc.locale) if doc.locale else None,
+            'locale_kwarg': str(locale_kwarg) if locale_kwarg else None,
+            'path': rule.rule,
+            'pod_path': doc.pod_path,
+            'view': controller.view,
+        }
+
+    def save_cache(self):
+        """Saves the routes of documents (along with the modification times
+        of content files) so that the next run can start without listing
+        every document. See `load_cache`."""
+        if self._routing_map is None or not self._cache_persisted:
+            return
+        entries = {}
+        for root_pod_path, rules in self._root_pod_paths_to_rules.iteritems():
+            if rules:
+                entries[root_pod_path] = [
+                    self._create_cache_entry(rule) for rule in rules]
+        data = {
+            'entries': entries,
+            'fingerprint': self.pod.env.fingerprint,
+            'key': self._create_cache_key(),
+            'mtimes': self._content_mtimes,
+        }
+        self.pod.write_file(Routes.cache_path, json.dumps(data, sort_keys=True))
+
+    def _read_cache(self):
+        if not self._cache_persisted:
+            return None
+        try:
+            data = json.loads(self.pod.read_file(Routes.cache_path))
+        except (IOError, OSError, ValueError):
+            return None
+        if data.get('key') != self._create_cache_key():
+            return None
+        return data
+
+    def load_cache(self):
+        """Builds the routing map from the routes saved by a previous run,
+        listing only the documents whose files have changed since. Builds
+        all routes when no saved routes can be used, or when a blueprint has
+        changed."""
+        data = self._read_cache()
+        if data is None:
+            return self._build_routing_map()
+        saved_mtimes = data['mtimes']
+        content_mtimes = self._get_content_mtimes()
+        changed_pod_paths = set(
+            pod_path for pod_path in set(saved_mtimes) | set(content_mtimes)
+            if saved_mtimes.get(pod_path) != content_mtimes.get(pod_path))
+        blueprint = collection.Collection.BLUEPRINT_PATH
+        if any(os.path.basename(pod_path) == blueprint
+               for pod_path in changed_pod_paths):
+            return self._build_routing_map()
+        # Paths formatted with the environment's fingerprint are refreshed.
+        fingerprint = data['fingerprint']
+        if fingerprint != self.pod.env.fingerprint:
+            for root_pod_path, entries in data['entries'].iteritems():
+                if any(fingerprint in entry['path'] for entry in entries):
+                    changed_pod_paths.add(root_pod_path)
+        changed_root_pod_paths = set(
+            formats.Format.parse_localized_path(pod_path)[0]
+            for pod_path in changed_pod_paths)
+        new_paths_to_locales_to_controllers = collections.defaultdict(dict)
+        new_root_pod_paths_to_rules = collections.defaultdict(list)
+        rules = []
+        for root_pod_path, entries in data['entries'].iteritems():
+            if root_pod_path in changed_root_pod_paths:
+                continue
+            for entry in entries:
+                controller = CachedRenderedController(entry, _pod=self.pod)
+                rule = routing.Rule(entry['path'], endpoint=controller)
+                rules.append(rule)
+                self._add_locale_controller(
+                    controller, new_paths_to_locales_to_controllers)
+                new_root_pod_paths_to_rules[root_pod_path].append(rule)
+        rules += self._build_static_routing_map_and_return_rules()
+        self._set_routing_map(rules)
+        self._paths_to_locales_to_controllers = \
+            new_paths_to_locales_to_controllers
+        self._root_pod_paths_to_rules = new_root_pod_paths_to_rules
+        self._content_mtimes = dict(
+            (pod_path, modified)
+            for pod_path, modified in saved_mtimes.iteritems()
+            if pod_path not in changed_pod_paths)
+        for pod_path in sorted(changed_pod_paths):
+            self.update(pod_path)
         return self._routing_map
 
     def _build_static_routing_map_and_return_rules(self):
         rules = self.list_static_routes()
         self._static_routing_map = routing.Map(rules, converters=Routes.converters)
+        self._pod_paths_to_static_controllers = {}
         return [rule.empty() for rule in rules]
 
     @property
@@ -150,7 +482,11 @@ class Routes(object):
         """
         if '/..' in path:
             raise webob.exc.HTTPBadRequest('Invalid path.')
-        urls = self.routing_map.bind_to_environ(env)
+        routing_map = self.routing_map
+        controller = self._paths_to_controllers.get(path)
+        if controller is not None:
+            return controller, {}
+        urls = routing_map.bind_to_environ(env)
         try:
             controller, params = urls.match(path)
             return controller, params
@@ -181,7 +517,7 @@ class Routes(object):
             controllers_to_paths[name].sort()
         return controllers_to_paths
 
-    @utils.memoize
+    @utils.memoize.bounded(64)
     def list_concrete_paths(self):
         paths = set()
         for route in self:
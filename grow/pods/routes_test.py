@@ -1,6 +1,10 @@
+from grow.pods import collection
 from grow.pods import pods
 from grow.pods import storage
 from grow.testing import testing
+from werkzeug import routing
+import mock
+import os
 import unittest
 import webob.exc
 
@@ -22,6 +26,18 @@ class RoutesTest(unittest.TestCase):
         self.assertRaises(webob.exc.HTTPNotFound, self.pod.match, '/dummy/')
         controller, params = self.pod.match('/app/static/file with spaces.txt')
 
+    def test_match_exact_paths(self):
+        self.pod.routes.routing_map
+        with mock.patch.object(routing.Map, 'bind_to_environ') as bind:
+            controller, params = self.pod.match('/about/')
+            self.assertFalse(bind.called)
+        self.assertEqual('/content/pages/about.yaml', controller.doc.pod_path)
+        self.assertEqual({}, params)
+        # Rules with converters and redirects are matched by werkzeug.
+        controller, params = self.pod.match('/app/static/test.txt')
+        self.assertEqual({'filename': 'test.txt'}, params)
+        self.assertRaises(routing.RequestRedirect, self.pod.match, '/about')
+
     def test_list_concrete_paths(self):
         expected = [
             '/',
@@ -89,6 +105,108 @@ class RoutesTest(unittest.TestCase):
         result = self.pod.routes.list_concrete_paths()
         self.assertItemsEqual(expected, result)
 
+    def _get_rules(self, routes):
+        return sorted((rule.rule, str(rule.endpoint)) for rule in routes)
+
+    def test_update(self):
+        routes = self.pod.routes
+        routing_map = routes.routing_map
+
+        # Changing a document only updates that document's routes.
+        path = '/content/pages/about.yaml'
+        self.assertEqual('/about/', self.pod.get_url(path).path)
+        content = self.pod.read_file(path)
+        self.pod.write_file(path, content.replace(
+            '$order: 1.1', '$order: 1.1\n$path: /about-us/'))
+        routes.update(path)
+        controller, _ = self.pod.match('/about-us/')
+        self.assertEqual(path, controller.doc.pod_path)
+        self.assertRaises(webob.exc.HTTPNotFound, self.pod.match, '/about/')
+        self.assertEqual('/about-us/', self.pod.get_url(path).path)
+        # The map used by requests that are matching is not modified.
+        self.assertIsNot(routing_map, routes.routing_map)
+        adapter = routing_map.bind('localhost')
+        self.assertEqual(path, adapter.match('/about/')[0].doc.pod_path)
+
+        # Localized files are added and removed with their root document.
+        self.pod.write_file('/content/pages/about@it.yaml', 'foo: it\n')
+        routes.update('/content/pages/about@it.yaml')
+        controller, _ = self.pod.match('/it/about/')
+        self.assertEqual(
+            '/content/pages/about@it.yaml', controller.doc.pod_path)
+        self.assertEqual(
+            controller.doc, routes.get_doc(
+                '/content/pages/about@it.yaml', locale='it'))
+        self.pod.delete_file('/content/pages/about@it.yaml')
+        routes.update('/content/pages/about@it.yaml')
+        controller, _ = self.pod.match('/it/about/')
+        self.assertEqual(path, controller.doc.pod_path)
+        self.assertIsNone(routes.get_doc(
+            '/content/pages/about@it.yaml', locale='it'))
+
+        # New and deleted documents.
+        self.pod.write_file('/content/pages/new.yaml', '$title: New\n')
+        routes.update('/content/pages/new.yaml')
+        self.pod.match('/new/')
+        self.pod.delete_file('/content/pages/contact.yaml')
+        routes.update('/content/pages/contact.yaml')
+
+        # Results are the same as rebuilding all routes.
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        self.assertEqual(self._get_rules(pod.routes), self._get_rules(routes))
+
+    def _render(self, pod, paths):
+        results = []
+        for path in paths:
+            controller, params = pod.match(path)
+            results.append(controller.render(params))
+        return results
+
+    def test_load_cache(self):
+        expected_rules = self._get_rules(self.pod.routes)
+        expected_content = self._render(
+            self.pod, ['/about/', '/de_alias/about/'])
+        self.pod.save_caches()
+
+        # Routes are loaded without listing documents.
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(collection.Collection,
+                               'list_servable_documents') as list_docs:
+            pod.load()
+            self.assertFalse(list_docs.called)
+        self.assertEqual(expected_rules, self._get_rules(pod.routes))
+        self.assertEqual(
+            expected_content,
+            self._render(pod, ['/about/', '/de_alias/about/']))
+
+        # Only changed documents are listed again.
+        path = '/content/pages/about.yaml'
+        content = pod.read_file(path)
+        pod.write_file(path, content.replace(
+            '$order: 1.1', '$order: 1.1\n$path: /about-us/'))
+        abs_path = pod.abs_path(path)
+        os.utime(abs_path, (0, os.path.getmtime(abs_path) + 10))
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(collection.Collection,
+                               'list_servable_documents') as list_docs:
+            pod.load()
+            self.assertFalse(list_docs.called)
+        pod.match('/about-us/')
+        expected_pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        self.assertEqual(
+            self._get_rules(expected_pod.routes), self._get_rules(pod.routes))
+
+        # Blueprint changes rebuild all routes.
+        pod.save_caches()
+        blueprint_path = pod.abs_path('/content/pages/_blueprint.yaml')
+        os.utime(blueprint_path, (0, os.path.getmtime(blueprint_path) + 10))
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(collection.Collection,
+                               'list_servable_documents',
+                               return_value=[]) as list_docs:
+            pod.load()
+            self.assertTrue(list_docs.called)
+
 
 if __name__ == '__main__':
     unittest.main()
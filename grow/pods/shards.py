@@ -0,0 +1,49 @@
+"""Deterministic partitioning of a build's paths across machines."""
+
+import hashlib
+
+
+class Shard(object):
+    """One of `count` disjoint subsets of a build's paths.
+
+    A path is assigned to a shard using a stable hash of the path, so every
+    machine assigns paths to the same shards regardless of the order in which
+    routes are listed. Shards are numbered from 1 to `count`.
+    """
+
+    def __init__(self, index, count, key=None):
+        if count < 1 or not 1 <= index <= count:
+            text = 'Invalid shard {}/{}: must be between 1/{} and {}/{}.'
+            raise ValueError(text.format(index, count, count, count, count))
+        self.index = index
+        self.count = count
+        self.key = key
+
+    def __repr__(self):
+        return '<Shard: {}>'.format(self)
+
+    def __str__(self):
+        return '{}/{}'.format(self.index, self.count)
+
+    @classmethod
+    def parse(cls, value):
+        """Parses a shard from a string formatted as "<index>/<count>"."""
+        try:
+            index, count = [int(part) for part in value.split('/')]
+        except ValueError:
+            text = 'Invalid shard "{}": must be formatted as <index>/<count>.'
+            raise ValueError(text.format(value))
+        return cls(index, count)
+
+    def with_key(self, key):
+        """Returns the same shard, assigning paths using the result of a
+        function applied to each path."""
+        return Shard(self.index, self.count, key=key)
+
+    def contains(self, path):
+        if self.key is not None:
+            path = self.key(path)
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        value = int(hashlib.md5(path).hexdigest(), 16)
+        return value % self.count == self.index - 1
@@ -0,0 +1,46 @@
+from . import pods
+from . import shards
+from . import storage
+from grow.testing import testing
+import unittest
+
+
+class ShardTest(unittest.TestCase):
+
+    def setUp(self):
+        dir_path = testing.create_test_pod_dir()
+        self.pod = pods.Pod(dir_path, storage=storage.FileStorage)
+
+    def test_parse(self):
+        shard = shards.Shard.parse('2/4')
+        self.assertEqual(2, shard.index)
+        self.assertEqual(4, shard.count)
+        self.assertEqual('2/4', str(shard))
+        self.assertRaises(ValueError, shards.Shard.parse, '2')
+        self.assertRaises(ValueError, shards.Shard.parse, 'a/b')
+        self.assertRaises(ValueError, shards.Shard.parse, '0/4')
+        self.assertRaises(ValueError, shards.Shard.parse, '5/4')
+
+    def test_contains(self):
+        paths = ['/foo/{}/'.format(i) for i in range(100)]
+        all_shards = [shards.Shard(i, 3) for i in range(1, 4)]
+        for path in paths:
+            owners = [shard for shard in all_shards if shard.contains(path)]
+            self.assertEqual(1, len(owners))
+        # Assignment is stable.
+        self.assertEqual(
+            [path for path in paths if all_shards[0].contains(path)],
+            [path for path in paths if shards.Shard(1, 3).contains(path)])
+
+    def test_dump(self):
+        expected = self.pod.dump()
+        results = {}
+        for i in range(1, 4):
+            shard_results = self.pod.dump(shard=shards.Shard(i, 3))
+            self.assertFalse(set(results).intersection(shard_results))
+            results.update(shard_results)
+        self.assertEqual(expected, results)
+
+
+if __name__ == '__main__':
+    unittest.main()
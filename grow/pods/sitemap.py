@@ -1,3 +1,4 @@
+from . import collection
 from . import controllers
 from . import messages
 from grow.common import utils
@@ -39,6 +40,8 @@ class SitemapController(controllers.BaseController):
         root = os.path.join(utils.get_grow_dir(), 'pods', 'templates')
         env = self.pod.get_jinja_env(root=root)
         template = env.get_template('sitemap.xml')
+        # Sitemaps depend on the existence and fields of all documents.
+        self.pod.dependencies.record_dir(collection.Collection.CONTENT_PATH)
         docs = self._list_docs()
         return template.render({
             'docs': docs,
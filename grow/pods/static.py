@@ -5,9 +5,11 @@ from grow.pods import urls
 from datetime import datetime
 import fnmatch
 import hashlib
+import json
 import mimetypes
 import os
 import re
+import threading
 import time
 import webob
 
@@ -76,11 +78,7 @@ class StaticFile(object):
 
     @staticmethod
     def _create_fingerprint(pod, pod_path):
-        md5 = hashlib.md5()
-        with pod.open_file(pod_path, 'rb') as fp:
-            content = fp.read()
-            md5.update(content)
-        return md5.hexdigest()
+        return pod.fingerprints.get(pod_path)
 
     @staticmethod
     def remove_fingerprint(path):
@@ -139,6 +137,104 @@ class StaticFile(object):
                 scheme=self.pod.env.scheme)
 
 
+class FingerprintCache(object):
+    """Caches the fingerprints of static files.
+
+    Fingerprints are reused until a file's modification time or size changes,
+    and are persisted across runs for pods using local file storage.
+    """
+    path = '/.grow/fingerprints'
+
+    def __init__(self, pod):
+        self.pod = pod
+        self._pod_paths_to_entries = None
+        self._added_entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @property
+    def persisted(self):
+        return not self.pod.storage.is_cloud_storage
+
+    def _load(self):
+        self._pod_paths_to_entries = {}
+        path = self.pod.abs_path(self.path)
+        if not self.persisted or not self.pod.storage.exists(path):
+            return
+        try:
+            self._pod_paths_to_entries = json.loads(self.pod.storage.read(path))
+        except ValueError:
+            pass  # Ignore corrupt caches, they are rewritten upon saving.
+
+    @staticmethod
+    def _hash(pod, pod_path):
+        md5 = hashlib.md5()
+        with pod.open_file(pod_path, 'rb') as fp:
+            content = fp.read()
+            md5.update(content)
+        return md5.hexdigest()
+
+    def get(self, pod_path):
+        """Returns the fingerprint (MD5 hex digest) of a file."""
+        if not self.persisted:
+            return FingerprintCache._hash(self.pod, pod_path)
+        with self._lock:
+            if self._pod_paths_to_entries is None:
+                self._load()
+        # Cached fingerprints do not read the file, so record it for builds.
+        self.pod.dependencies.record(pod_path)
+        try:
+            stat = self.pod.storage.stat(self.pod.abs_path(pod_path))
+        except OSError:
+            # Raises the same error as uncached fingerprints.
+            return FingerprintCache._hash(self.pod, pod_path)
+        with self._lock:
+            entry = self._pod_paths_to_entries.get(pod_path)
+        if (entry is not None and entry[0] == stat.st_mtime
+                and entry[1] == stat.st_size):
+            return entry[2]
+        fingerprint = FingerprintCache._hash(self.pod, pod_path)
+        entry = [stat.st_mtime, stat.st_size, fingerprint]
+        with self._lock:
+            self._pod_paths_to_entries[pod_path] = entry
+            self._added_entries[pod_path] = entry
+            self._dirty = True
+        return fingerprint
+
+    def pop_added_entries(self):
+        """Returns the entries added since the last call, so that processes
+        rendering for another pod can pass them to it (see `add_entries`)."""
+        with self._lock:
+            entries = self._added_entries
+            self._added_entries = {}
+        return entries
+
+    def add_entries(self, entries):
+        """Adds entries returned by another cache's `pop_added_entries`."""
+        if not entries or not self.persisted:
+            return
+        with self._lock:
+            if self._pod_paths_to_entries is None:
+                self._load()
+            self._pod_paths_to_entries.update(entries)
+            self._dirty = True
+
+    def reset(self):
+        with self._lock:
+            self._pod_paths_to_entries = None
+            self._added_entries = {}
+            self._dirty = False
+
+    def save(self):
+        """Persists the cache if any fingerprints were added."""
+        with self._lock:
+            if not self._dirty or not self.persisted:
+                return
+            content = json.dumps(self._pod_paths_to_entries)
+            self._dirty = False
+        self.pod.write_file(self.path, content)
+
+
 class StaticController(controllers.BaseController):
     KIND = messages.Kind.STATIC
 
@@ -2,6 +2,8 @@ from . import static
 from grow.pods import pods
 from grow.pods import storage
 from grow.testing import testing
+import mock
+import os
 import unittest
 
 
@@ -59,6 +61,40 @@ class StaticTest(unittest.TestCase):
         expected = '/path-path/file.min.js'
         self.assertEqual(expected, static.StaticFile.remove_fingerprint(path))
 
+    def test_fingerprint_cache(self):
+        cache = self.pod.fingerprints
+        fingerprint = cache.get('/static/test.txt')
+        self.assertEqual('db3f6eaa28bac5ae1180257da33115d8', fingerprint)
+        with mock.patch.object(static.FingerprintCache, '_hash') as mock_hash:
+            self.assertEqual(fingerprint, cache.get('/static/test.txt'))
+            self.assertFalse(mock_hash.called)
+
+        # Persisted fingerprints are reused by other pods.
+        self.pod.save_caches()
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(static.FingerprintCache, '_hash') as mock_hash:
+            self.assertEqual(fingerprint, pod.fingerprints.get('/static/test.txt'))
+            self.assertFalse(mock_hash.called)
+
+        # Modified files are fingerprinted again.
+        self.pod.write_file('/static/test.txt', 'changed')
+        stat = os.stat(self.pod.abs_path('/static/test.txt'))
+        os.utime(self.pod.abs_path('/static/test.txt'),
+                 (stat.st_atime, stat.st_mtime + 10))
+        self.assertNotEqual(fingerprint, pod.fingerprints.get('/static/test.txt'))
+
+        # Entries added by other caches (e.g. of build workers) are saved.
+        entries = pod.fingerprints.pop_added_entries()
+        self.assertEqual(['/static/test.txt'], entries.keys())
+        self.assertEqual({}, pod.fingerprints.pop_added_entries())
+        self.pod.fingerprints.add_entries(entries)
+        self.pod.save_caches()
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(static.FingerprintCache, '_hash') as mock_hash:
+            self.assertNotEqual(
+                fingerprint, pod.fingerprints.get('/static/test.txt'))
+            self.assertFalse(mock_hash.called)
+
 
 if __name__ == '__main__':
     unittest.main()
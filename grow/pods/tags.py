@@ -4,11 +4,12 @@ from datetime import datetime
 from grow.common import utils
 from grow.pods import locales as locales_lib
 from grow.pods import urls
-import collections
+import collections as collections_lib
 import itertools
 import jinja2
 import json as json_lib
 import markdown
+import os
 import re
 import sys
 
@@ -44,8 +45,13 @@ def collection(collection, _pod=None):
 
 
 @utils.memoize_tag
-def docs(collection, locale=None, order_by=None, hidden=False, recursive=True, _pod=None):
+def docs(collection, locale=None, order_by=None, hidden=False, recursive=True,
+         where=None, limit=None, offset=None, _pod=None):
     collection = _pod.get_collection(collection)
+    if where is not None or limit is not None or offset is not None:
+        return collection.query(where=where, locale=locale, order_by=order_by,
+                                include_hidden=hidden, recursive=recursive,
+                                limit=limit, offset=offset)
     return collection.docs(locale=locale, order_by=order_by, include_hidden=hidden,
                            recursive=recursive)
 
@@ -57,7 +63,7 @@ def collections(collection_paths=None, _pod=None):
 
 @utils.memoize_tag
 def statics(pod_path, locale=None, _pod=None):
-    return _pod.list_statics(pod_path, locale=locale)
+    return list(_pod.list_statics(pod_path, locale=locale))
 
 
 def markdown_filter(value):
@@ -88,28 +94,68 @@ def static(path, locale=None, _pod=None):
 
 class Menu(object):
 
-    def __init__(self):
-        self.items = collections.OrderedDict()
+    def __init__(self, doc_key_tree=None, create_doc=None):
+        self._doc_key_tree = doc_key_tree
+        self._create_doc = create_doc
+        self._items = (collections_lib.OrderedDict()
+                       if doc_key_tree is None else None)
+
+    @property
+    def items(self):
+        # Menus created from the keys of documents create the documents when
+        # first accessed.
+        if self._items is None:
+            self._items = Menu._map_tree(self._doc_key_tree, self._create_doc)
+        return self._items
+
+    @staticmethod
+    def _map_tree(tree, func):
+        result = collections_lib.OrderedDict()
+        for node, children in tree.iteritems():
+            result[func(node)] = Menu._map_tree(children, func)
+        return result
+
+    def get_doc_key_tree(self):
+        """Returns the menu's tree with the documents replaced by their keys
+        (see `Collection._create_listed_doc`)."""
+        return Menu._map_tree(
+            self.items, lambda doc: (doc.pod_path, doc._locale_kwarg))
 
     def build(self, nodes):
-        self._recursive_build(self.items, None, nodes)
+        # Maps the pod path of each parent (compared as documents are) to its
+        # children, so that each node's parent is only resolved once.
+        parent_paths_to_children = collections_lib.defaultdict(list)
+        for node in nodes:
+            parent = node.parent
+            parent_path = parent.pod_path if parent is not None else None
+            parent_paths_to_children[parent_path].append(node)
+        self._recursive_build(self.items, None, parent_paths_to_children)
 
     def iteritems(self):
         return self.items.iteritems()
 
-    def _recursive_build(self, tree, parent, nodes):
-        children = [n for n in nodes if n.parent == parent]
-        for child in children:
-            tree[child] = collections.OrderedDict()
-            self._recursive_build(tree[child], child, nodes)
+    def _recursive_build(self, tree, parent_path, parent_paths_to_children):
+        for child in parent_paths_to_children.get(parent_path, []):
+            tree[child] = collections_lib.OrderedDict()
+            self._recursive_build(
+                tree[child], child.pod_path, parent_paths_to_children)
 
 
 @utils.memoize_tag
 def nav(collection=None, locale=None, _pod=None):
     collection_obj = _pod.get_collection('/content/' + collection)
+    # Menus are cached as the keys of their documents until the collection's
+    # documents change, so that each menu is made of new documents, as
+    # listings are (see `Collection.list_docs`).
+    key = ('nav', type(locale), locale)
+    doc_key_tree = _pod.collection_index.get_view(collection_obj.pod_path, key)
+    if doc_key_tree is not None:
+        return Menu(doc_key_tree, collection_obj._create_listed_doc)
     results = collection_obj.docs(order_by='order', locale=locale)
     menu = Menu()
     menu.build(results)
+    _pod.collection_index.add_view(
+        collection_obj.pod_path, key, menu.get_doc_key_tree())
     return menu
 
 
@@ -217,28 +263,62 @@ def relative_filter(ctx, path):
         path, relative_to=doc.url.path)
 
 
+def _record_collection(dependencies, collection, *args, **kwargs):
+    if isinstance(collection, basestring):
+        dependencies.record_dir(os.path.join(
+            collection_lib.Collection.CONTENT_PATH, collection))
+
+
+def _record_collections(dependencies, *args, **kwargs):
+    dependencies.record_dir(collection_lib.Collection.CONTENT_PATH)
+
+
+def _record_doc(dependencies, pod_path, locale=None, **kwargs):
+    dependencies.record_doc_path(pod_path, locale=locale)
+
+
+def _record_file(dependencies, path, *args, **kwargs):
+    dependencies.record(path)
+
+
+def _record_dir(dependencies, path, *args, **kwargs):
+    dependencies.record_dir(path)
+
+
+def _record_url(dependencies, pod_path, locale=None, **kwargs):
+    if pod_path.startswith(collection_lib.Collection.CONTENT_PATH):
+        dependencies.record_doc_path(pod_path, locale=locale)
+    else:
+        dependencies.record(pod_path)
+
+
 @utils.memoize
 def create_builtin_tags(pod, use_cache=False):
-    def wrap(func):
-        return lambda *args, **kwargs: func(
-            *args, _pod=pod, use_cache=use_cache, **kwargs)
+    # Cached tags do not read files on subsequent calls, so the files they
+    # depend on are recorded on every call instead.
+    def wrap(func, record_dependencies=None):
+        def wrapped_func(*args, **kwargs):
+            if record_dependencies and pod.dependencies.capturing:
+                record_dependencies(pod.dependencies, *args, **kwargs)
+            return func(*args, _pod=pod, use_cache=use_cache, **kwargs)
+        return wrapped_func
     return {
         'breadcrumb': wrap(breadcrumb),
-        'collection': wrap(collection),
-        'collections': wrap(collections),
-        'categories': wrap(categories),
-        'csv': wrap(csv),
+        'collection': wrap(collection, _record_collection),
+        'collections': wrap(collections, _record_collections),
+        'categories': wrap(categories, _record_collection),
+        'csv': wrap(csv, _record_file),
         'date': wrap(date),
-        'doc': wrap(get_doc),
-        'docs': wrap(docs),
-        'json': wrap(json),
+        'doc': wrap(get_doc, _record_doc),
+        'docs': wrap(docs, _record_collection),
+        'json': wrap(json, _record_file),
         'locale': wrap(locale),
         'locales': wrap(locales),
-        'nav': wrap(nav),
-        'static': wrap(static),
-        'statics': wrap(statics),
-        'url': wrap(url),
-        'yaml': wrap(yaml),
+        'nav': wrap(nav, _record_collection),
+        'static': wrap(static, _record_file),
+        'statics': wrap(statics, _record_dir),
+        'url': wrap(url, _record_url),
+        'yaml': wrap(yaml, _record_file),
     }
 
 
@@ -1,8 +1,10 @@
+from . import documents
 from . import tags
 from grow.pods import locales
 from grow.pods import pods
 from grow.pods import storage
 from grow.testing import testing
+import mock
 import unittest
 
 
@@ -41,6 +43,53 @@ class BuiltinsTestCase(unittest.TestCase):
             self.assertIn(collection.collection_path, paths)
         self.assertEqual(len(paths), len(collections))
 
+    def test_docs(self):
+        docs = tags.docs('pages', _pod=self.pod)
+        self.assertEqual(len(docs), len(tags.docs('pages', offset=0, _pod=self.pod)))
+        expected = [doc for doc in docs if doc.order is not None and doc.order >= 1]
+        self.assertEqual(expected[:2], tags.docs(
+            'pages', where={'$order__gte': 1}, limit=2, _pod=self.pod))
+
+    def test_nav(self):
+        pod = testing.create_pod()
+        pod.write_yaml('/podspec.yaml', {})
+        pod.write_yaml('/content/pages/_blueprint.yaml', {
+            '$path': '/{base}/',
+            '$view': '/views/base.html',
+        })
+        pod.write_yaml('/content/pages/a.yaml', {'$order': 1})
+        pod.write_yaml('/content/pages/b.yaml', {
+            '$order': 2, '$parent': '/content/pages/a.yaml'})
+        pod.write_yaml('/content/pages/c.yaml', {
+            '$order': 3, '$parent': '/content/pages/b.yaml'})
+        pod.write_yaml('/content/pages/d.yaml', {
+            '$order': 4, '$parent': '/content/pages/a.yaml'})
+        pod.write_yaml('/content/pages/e.yaml', {'$order': 5})
+
+        def to_bases(tree):
+            return [(doc.base, to_bases(children))
+                    for doc, children in tree.iteritems()]
+
+        menu = tags.nav('pages', _pod=pod)
+        self.assertEqual([
+            ('a', [('b', [('c', [])]), ('d', [])]),
+            ('e', []),
+        ], to_bases(menu))
+        # Cached menus are made of new documents, created when accessed.
+        with mock.patch.object(documents.Document, 'parent',
+                               new_callable=mock.PropertyMock) as parent:
+            cached_menu = tags.nav('pages', _pod=pod)
+            self.assertEqual(to_bases(menu), to_bases(cached_menu))
+            self.assertFalse(parent.called)
+        self.assertIsNot(menu.items.keys()[0], cached_menu.items.keys()[0])
+
+        # Menus are built again when documents change.
+        pod.write_yaml('/content/pages/e.yaml', {
+            '$order': 5, '$parent': '/content/pages/c.yaml'})
+        self.assertEqual([
+            ('a', [('b', [('c', [('e', [])])]), ('d', [])]),
+        ], to_bases(tags.nav('pages', _pod=pod)))
+
     def test_categories(self):
         pod = testing.create_pod()
         pod.write_yaml('/podspec.yaml', {})
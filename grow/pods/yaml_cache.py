@@ -0,0 +1,55 @@
+"""Persistent cache of parsed YAML.
+
+Parsed YAML is stored keyed by the SHA-1 of its content, so unchanged front
+matter and blueprints are not parsed again on subsequent runs. Custom tags
+(such as `!g.doc` and `!_`) are stored as unresolved references and resolved
+each time YAML is loaded, so values stay correct when the files and
+documents that tags refer to change.
+"""
+
+from . import persistent_cache
+from grow.common import utils
+import datetime
+import hashlib
+import yaml
+
+# Types that can be stored in the cache. YAML containing other types (such as
+# objects created by Python-specific tags) is parsed every time.
+_CACHEABLE_TYPES = (
+    basestring, bool, datetime.date, float, int, long, type(None),
+    utils.YamlReference)
+
+
+def _is_cacheable(value):
+    if isinstance(value, dict):
+        return all(_is_cacheable(key) and _is_cacheable(item)
+                   for key, item in value.iteritems())
+    if isinstance(value, list):
+        return all(_is_cacheable(item) for item in value)
+    return isinstance(value, _CACHEABLE_TYPES)
+
+
+class YamlCache(persistent_cache.PersistentCache):
+    VERSION = 1
+    path = '/.grow/cache/yaml'
+
+    def _parse(self, content):
+        try:
+            data = utils.load_yaml_references(content)
+        except utils.UnreferenceableYamlError:
+            return utils.SENTINEL
+        return data if _is_cacheable(data) else utils.SENTINEL
+
+    def load(self, content, doc=None):
+        """Parses YAML content, resolving custom tags for a document."""
+        raw_content = content.encode('utf-8') if isinstance(content, unicode) \
+            else content
+        sha = hashlib.sha1(raw_content).hexdigest()
+        data = self.get(sha, utils.SENTINEL)
+        if data is utils.SENTINEL:
+            data = self._parse(content)
+            if data is utils.SENTINEL:
+                loader = utils.make_yaml_loader(self.pod, doc=doc)
+                return yaml.load(content, Loader=loader)
+            self.add(sha, data)
+        return utils.resolve_yaml(data, pod=self.pod, doc=doc)
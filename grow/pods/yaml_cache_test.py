@@ -0,0 +1,55 @@
+from . import pods
+from . import storage
+from grow.common import utils
+from grow.testing import testing
+import mock
+import unittest
+
+
+class YamlCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_path = testing.create_test_pod_dir()
+        self.pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+
+    def test_load(self):
+        content = self.pod.read_file('/data/constructors.yaml')
+        result = utils.load_yaml(content, pod=self.pod)
+        self.pod.save_caches()
+
+        # Parsed YAML is reused across runs, and tags are resolved on load.
+        pod = pods.Pod(self.dir_path, storage=storage.FileStorage)
+        with mock.patch.object(utils, 'load_yaml_references') as load:
+            self.assertEqual(result, utils.load_yaml(content, pod=pod))
+            self.assertFalse(load.called)
+        self.assertEqual(
+            pod.get_doc('/content/pages/home.yaml'), result['doc'])
+        self.assertEqual(3, len(result['docs']))
+
+    def test_references(self):
+        content = (
+            'title: !_ Title\n'
+            'docs: !g.doc\n'
+            '- /content/pages/home.yaml\n'
+        )
+        data = utils.load_yaml_references(content)
+        self.assertEqual(utils.YamlReference('!_', 'Title'), data['title'])
+        self.assertEqual(
+            utils.YamlReference('!g.doc', ['/content/pages/home.yaml']),
+            data['docs'])
+        resolved = utils.resolve_yaml(data, pod=self.pod)
+        self.assertEqual('Title', resolved['title'])
+        self.assertEqual(
+            [self.pod.get_doc('/content/pages/home.yaml')], resolved['docs'])
+        # Resolving does not modify the cached data.
+        self.assertIsInstance(data['title'], utils.YamlReference)
+
+    def test_uncacheable(self):
+        content = 'items: !!set {a, b}\n'
+        result = utils.load_yaml(content, pod=self.pod)
+        self.assertEqual(set(['a', 'b']), result['items'])
+        self.assertEqual(0, len(self.pod.yaml_cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from . import translation
 from watchdog import events
 from watchdog import observers
 from xtermcolor import colorize
+import os
 
 
 class PodspecFileEventHandler(events.PatternMatchingEventHandler):
@@ -16,6 +17,8 @@ class PodspecFileEventHandler(events.PatternMatchingEventHandler):
 
     def handle(self, event=None):
         self.pod.reset_yaml()
+        self.pod.format_cache.reset()
+        self.pod.collection_index.reset()
         self.pod.routes.reset_cache(rebuild=True)
         self.managed_observer.reschedule_children()
 
@@ -26,6 +29,33 @@ class PodspecFileEventHandler(events.PatternMatchingEventHandler):
         self.handle(event)
 
 
+class FormatCacheEventHandler(events.FileSystemEventHandler):
+    """Discards parsed documents when content or data changes, as documents
+    embed other documents, data files and URLs via YAML tags. Changes to
+    other files only discard the documents that read them while parsed."""
+
+    def __init__(self, pod, *args, **kwargs):
+        self.pod = pod
+        super(FormatCacheEventHandler, self).__init__(*args, **kwargs)
+
+    def handle(self, event=None):
+        if event is None:
+            self.pod.format_cache.reset()
+            return
+        paths = [event.src_path]
+        if event.event_type == events.EVENT_TYPE_MOVED:
+            paths.append(event.dest_path)
+        for path in paths:
+            pod_path = '/' + os.path.relpath(path, self.pod.root)
+            if pod_path.startswith(('/content/', '/data/')):
+                self.pod.format_cache.reset()
+            elif not pod_path.startswith('/.') and not event.is_directory:
+                self.pod.format_cache.invalidate(pod_path)
+
+    def on_any_event(self, event):
+        self.handle(event)
+
+
 class PreprocessorEventHandler(events.PatternMatchingEventHandler):
     num_runs = 0
 
@@ -55,6 +85,32 @@ class PreprocessorEventHandler(events.PatternMatchingEventHandler):
         self.handle(event)
 
 
+class RoutesCacheEventHandler(PreprocessorEventHandler):
+    """Updates the routes of the documents affected by a change, after
+    discarding the listings of the changed directories."""
+
+    def handle(self, event=None):
+        if event is None:
+            return super(RoutesCacheEventHandler, self).handle(event)
+        pod = self.preprocessor.pod
+        paths = [event.src_path]
+        if event.event_type == events.EVENT_TYPE_MOVED:
+            paths.append(event.dest_path)
+        pod_paths = ['/' + os.path.relpath(path, pod.root) for path in paths]
+        if event.is_directory:
+            if event.event_type != events.EVENT_TYPE_MODIFIED:
+                # Added or removed directories may contain collections.
+                pod.collection_index.reset()
+            return
+        for pod_path in pod_paths:
+            pod.collection_index.invalidate(pod_path)
+        try:
+            self.preprocessor.update(pod_paths)
+        except Exception:
+            text = colorize('Error updating routes.', ansi=197)
+            pod.logger.exception(text)
+
+
 class ManagedObserver(observers.Observer):
 
     def __init__(self, pod):
@@ -69,9 +125,11 @@ class ManagedObserver(observers.Observer):
 
     def schedule_builtins(self):
         preprocessor = routes_cache.RoutesCachePreprocessor(pod=self.pod)
-        self._schedule_preprocessor('/content/', preprocessor, patterns=['*'])
+        handler = RoutesCacheEventHandler(preprocessor, patterns=['*'])
+        self._schedule_handler('/content/', handler)
         preprocessor = translation.TranslationPreprocessor(pod=self.pod)
         self._schedule_preprocessor('/translations/', preprocessor, patterns=['*.po'])
+        self._schedule_handler('/', FormatCacheEventHandler(self.pod))
 
     def schedule_preprocessors(self):
         self._preprocessor_watches = []
@@ -82,12 +140,15 @@ class ManagedObserver(observers.Observer):
                     self._preprocessor_watches.append(watch)
 
     def _schedule_preprocessor(self, path, preprocessor, **kwargs):
+        if 'ignore_directories' in kwargs:
+            kwargs['ignore_directories'] = [self.pod.abs_path(p)
+                                            for p in kwargs['ignore_directories']]
+        handler = PreprocessorEventHandler(preprocessor, **kwargs)
+        return self._schedule_handler(path, handler)
+
+    def _schedule_handler(self, path, handler):
         try:
-            if 'ignore_directories' in kwargs:
-                kwargs['ignore_directories'] = [self.pod.abs_path(p)
-                                                for p in kwargs['ignore_directories']]
             path = self.pod.abs_path(path)
-            handler = PreprocessorEventHandler(preprocessor, **kwargs)
             return self.schedule(handler, path=path, recursive=True)
         except OSError:
             # No directory found.
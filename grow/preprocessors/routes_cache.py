@@ -18,5 +18,11 @@ class RoutesCachePreprocessor(base.BasePreprocessor):
             self.pod.routes.reset_cache(rebuild=True, inject=False)
             self._last_run = now
 
+    def update(self, pod_paths):
+        """Updates the routes of changed content files, rather than
+        rebuilding the routes of all documents."""
+        for pod_path in pod_paths:
+            self.pod.routes.update(pod_path)
+
     def list_watched_dirs(self):
         return ['/content/']
@@ -16,10 +16,11 @@ import webbrowser
 
 def shutdown(pod):
     pod.logger.info('Goodbye. Shutting down.')
+    pod.save_caches()
 
 
 def start(pod, host=None, port=None, open_browser=False, debug=False,
-          preprocess=True, update_check=False):
+          preprocess=True, update_check=False, warm_up=True):
     observer, podspec_observer = file_watchers.create_dev_server_observers(pod)
     if preprocess:
         # Run preprocessors for the first time in a thread.
@@ -29,6 +30,9 @@ def start(pod, host=None, port=None, open_browser=False, debug=False,
     port = find_port_and_start_server(pod, host, port, debug)
     pod.env.port = port
     pod.load()
+    if warm_up:
+        # Compile templates ahead of the first requests in a thread.
+        reactor.callInThread(pod.warm_up_templates)
     url = print_server_ready_message(pod, host, port)
     if open_browser:
         start_browser(url)